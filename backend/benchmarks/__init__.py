@@ -0,0 +1,15 @@
+"""
+Purpose:
+    - Reproducible offline performance benchmarks for the search path
+    - Suites: preprocessing, single and batched ONNX inference, end-to-end
+      /api/search-doodle through an ASGI client, and ingestion throughput
+    - Synthetic fixtures only (seeded doodles and photos, in-memory Qdrant);
+      no network access is needed
+    - JSON results with throughput and latency percentiles, compared against a
+      saved baseline to catch regressions
+
+Usage:
+    poetry run python -m benchmarks.run
+    poetry run python -m benchmarks.run --suites preprocess,inference --rounds 100
+    poetry run python -m benchmarks.run --update-baseline
+"""
@@ -0,0 +1,123 @@
+"""
+Purpose:
+    - Local stand-in for the Unsplash API and image CDN, so the streaming
+      ingestion path (services.unsplash_service.stream_photo_images) can be
+      exercised and benchmarked without an API key or network access
+    - GET /search/photos answers paginated search results shaped like the real
+      API (with X-Ratelimit-Remaining); GET /photos/{id}.jpg serves synthetic
+      JPEGs from benchmarks.fixtures.photo_jpeg
+    - Optional faults: every Nth image returns 404, every Nth API call is
+      rate limited with 429 and Retry-After: 0
+
+Usage:
+    # In process, no sockets: route every URL to the app through ASGI
+    app = create_app(photos_per_query=500)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+    async for photo, image in stream_photo_images(animals, 100, client=client):
+        ...
+
+    # As a server, for populate_qdrant or manual testing
+    poetry run python -m benchmarks.fake_unsplash --port 8765
+    UNSPLASH_API_URL=http://127.0.0.1:8765 UNSPLASH_API_KEY=fake \
+        poetry run python -m scripts.populate_qdrant --stream
+"""
+
+import argparse
+import zlib
+from functools import lru_cache
+from fastapi import FastAPI, HTTPException, Query, Response
+from benchmarks.fixtures import photo_jpeg
+
+DEFAULT_BASE_URL = "http://fake-unsplash.local"
+# Distinct synthetic photos; ids beyond this reuse their bytes
+DISTINCT_PHOTOS = 64
+# Size of the "small" rendition Unsplash serves (400px wide)
+SMALL_SIZE = (400, 267)
+
+
+@lru_cache(maxsize=DISTINCT_PHOTOS)
+def _jpeg(seed: int) -> bytes:
+    return photo_jpeg(seed, size=SMALL_SIZE)
+
+
+def create_app(
+    base_url: str = DEFAULT_BASE_URL,
+    photos_per_query: int = 1000,
+    fail_every: int = 0,
+    rate_limit_every: int = 0,
+) -> FastAPI:
+    """
+    Build the fake API.
+
+    Args:
+        base_url: Prefix of the image URLs returned in search results
+        photos_per_query: Results available for any query before pages run dry
+        fail_every: Serve 404 for every Nth image (0 = never)
+        rate_limit_every: Answer every Nth search call with 429 (0 = never)
+    """
+    app = FastAPI()
+    app.state.search_calls = 0
+    app.state.image_requests = 0
+
+    @app.get("/search/photos")
+    async def search_photos(
+        response: Response,
+        query: str,
+        page: int = Query(default=1, ge=1),
+        per_page: int = Query(default=10, ge=1, le=30),
+        client_id: str = "",
+    ):
+        app.state.search_calls += 1
+        if rate_limit_every and app.state.search_calls % rate_limit_every == 0:
+            return Response(status_code=429, headers={"Retry-After": "0"})
+        slug = query.split()[0]
+        start = (page - 1) * per_page
+        stop = min(start + per_page, photos_per_query)
+        results = [
+            {
+                "id": f"{slug}-{i}",
+                "urls": {"small": f"{base_url}/photos/{slug}-{i}.jpg"},
+                "user": {"name": f"Photographer {i % 7}"},
+            }
+            for i in range(start, stop)
+        ]
+        response.headers["X-Ratelimit-Remaining"] = "5000"
+        return {
+            "total": photos_per_query,
+            "total_pages": -(-photos_per_query // per_page),
+            "results": results,
+        }
+
+    @app.get("/photos/{photo_id}.jpg")
+    async def photo(photo_id: str):
+        app.state.image_requests += 1
+        if fail_every and app.state.image_requests % fail_every == 0:
+            raise HTTPException(status_code=404, detail="Photo not found")
+        seed = zlib.crc32(photo_id.encode()) % DISTINCT_PHOTOS
+        return Response(content=_jpeg(seed), media_type="image/jpeg")
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--photos-per-query", type=int, default=1000)
+    parser.add_argument("--fail-every", type=int, default=0)
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    args = parser.parse_args()
+
+    app = create_app(
+        base_url=f"http://{args.host}:{args.port}",
+        photos_per_query=args.photos_per_query,
+        fail_every=args.fail_every,
+        rate_limit_every=args.rate_limit_every,
+    )
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Purpose:
+    - Deterministic synthetic inputs for the benchmark suites: doodle canvases
+      like the mobile app sends, Unsplash-sized photos, and unit vectors
+    - An in-memory Qdrant collection standing in for the real server, and the
+      app running against it behind an in-process ASGI client
+
+Usage:
+    from benchmarks.fixtures import make_doodle, doodle_base64
+    image = make_doodle(seed=0)
+"""
+
+import asyncio
+import base64
+import io
+from contextlib import asynccontextmanager
+import numpy as np
+from PIL import Image, ImageDraw
+from constants.animals_list import ANIMALS
+from services.qdrant_collection import vectors_config
+from services import lifecycle, qdrant_service
+from services.qdrant_service import COLLECTION_NAME
+
+VECTOR_SIZE = 512
+# The mobile canvas size
+DOODLE_SIZE = (720, 1080)
+# Unsplash "regular" photos are 1080 px wide
+PHOTO_SIZE = (1080, 720)
+# Give up if the in-process app is not ready after this long
+READY_TIMEOUT_SECONDS = 120
+
+
+def make_doodle(
+    seed: int, mode: str = "RGBA", size: tuple[int, int] = DOODLE_SIZE
+) -> Image.Image:
+    """Draw a random black-stroke doodle on a white canvas in the given mode."""
+    rng = np.random.default_rng(seed)
+    image = Image.new("RGBA", size, (255, 255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        points = [tuple(p) for p in rng.integers(0, min(size), size=(6, 2))]
+        draw.line(points, fill=(0, 0, 0, 255), width=6)
+    return image.convert(mode)
+
+
+def doodle_png(seed: int) -> bytes:
+    buffer = io.BytesIO()
+    make_doodle(seed).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def doodle_base64(seed: int) -> str:
+    return base64.b64encode(doodle_png(seed)).decode()
+
+
+def photo_jpeg(seed: int, size: tuple[int, int] = PHOTO_SIZE) -> bytes:
+    """A smooth gradient with noise, encoded like a downloaded Unsplash photo."""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    pixels = gradient + rng.normal(0, 24, (height, width, 3)).astype(np.float32)
+    pixels += rng.integers(0, 128, 3).astype(np.float32)
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), "RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def photo_record(seed: int) -> dict:
+    """Photo metadata shaped like get_unsplash_photos() output."""
+    return {
+        "id": f"bench-{seed}",
+        "url": f"https://images.example.invalid/bench-{seed}.jpg",
+        "animal_type": ANIMALS[seed % len(ANIMALS)],
+        "photographer": "benchmark",
+    }
+
+
+def unit_vectors(count: int, seed: int) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((count, VECTOR_SIZE))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+async def in_memory_collection(points: int, seed: int = 0):
+    """
+    Return an AsyncQdrantClient in local in-memory mode holding `points`
+    random vectors with search payloads, in the production collection layout.
+    """
+    from qdrant_client import AsyncQdrantClient
+
+    client = AsyncQdrantClient(location=":memory:")
+    await client.create_collection(
+        collection_name=COLLECTION_NAME, vectors_config=vectors_config()
+    )
+    client.upload_collection(
+        collection_name=COLLECTION_NAME,
+        vectors=unit_vectors(points, seed),
+        ids=list(range(points)),
+        payload=[
+            {
+                "photo_url": f"https://images.example.invalid/{i}.jpg",
+                "animal_type": ANIMALS[i % len(ANIMALS)],
+                "photographer": "benchmark",
+            }
+            for i in range(points)
+        ],
+        batch_size=points,
+        wait=True,
+    )
+    return client
+
+
+@asynccontextmanager
+async def in_process_client(gallery: int):
+    """
+    Run the app's real lifespan against an in-memory collection of `gallery`
+    points and yield an httpx client talking to it over ASGI, once it is ready.
+    """
+    import httpx
+    import main
+
+    # Installed before the lifespan starts, so warm-up reuses it
+    qdrant_service._async_client = await in_memory_collection(gallery)
+
+    async with main.app.router.lifespan_context(main.app):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + READY_TIMEOUT_SECONDS
+        while not lifecycle.is_ready():
+            if loop.time() > deadline:
+                raise RuntimeError(f"App not ready: {lifecycle.get_readiness()}")
+            await asyncio.sleep(0.05)
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://in-process"
+        ) as client:
+            yield client
@@ -0,0 +1,32 @@
+"""
+Purpose:
+    - Benchmark CLIP embedding generation with the configured model variant:
+        single  one image per ONNX call (the unbatched request path)
+        batch   --batch-size images in one ONNX call (micro-batcher, ingestion)
+    - Both include preprocessing and normalization, as get_image_embeddings does
+
+Usage:
+    poetry run python -m benchmarks.run --suites inference --batch-size 32
+    CLIP_MODEL_VARIANT=int8 poetry run python -m benchmarks.run --suites inference
+"""
+
+from benchmarks.fixtures import make_doodle
+from benchmarks.timing import measure
+from services.clip_service import get_image_embeddings
+
+
+def run(args) -> dict:
+    images = [make_doodle(seed) for seed in range(args.batch_size)]
+    return {
+        "inference.single": measure(
+            lambda: get_image_embeddings(images[:1]),
+            rounds=args.rounds,
+            warmup=args.warmup,
+        ),
+        "inference.batch": measure(
+            lambda: get_image_embeddings(images),
+            rounds=max(1, args.rounds // 4),
+            warmup=args.warmup,
+            items=len(images),
+        ),
+    }
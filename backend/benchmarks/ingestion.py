@@ -0,0 +1,95 @@
+"""
+Purpose:
+    - Benchmark the ingestion stages of scripts/populate_qdrant.py on synthetic
+      JPEG photos, without Unsplash or a Qdrant server:
+        decode  JPEG bytes -> PIL image (what download_image does after the fetch)
+        embed   embed_photos on one --batch-size chunk
+        upsert  upsert_points of the whole set into an in-memory collection
+        total   all three in sequence, reported as photos per second
+        stream  stream_photo_images against the in-process fake Unsplash
+                (benchmarks/fake_unsplash.py): paged metadata, pooled async
+                downloads and reduced-size decoding, in photos per second
+
+Usage:
+    poetry run python -m benchmarks.run --suites ingestion --photos 128
+"""
+
+import asyncio
+import io
+from PIL import Image
+from benchmarks.fake_unsplash import create_app
+from benchmarks.fixtures import photo_jpeg, photo_record
+from benchmarks.timing import measure
+from scripts.populate_qdrant import embed_photos, upsert_points
+from services import qdrant_service, unsplash_service
+from services.qdrant_collection import provision_collection
+
+
+def _decode(jpegs: list[bytes]) -> list[Image.Image]:
+    images = []
+    for data in jpegs:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        images.append(image)
+    return images
+
+
+async def _stream(count: int) -> int:
+    import httpx
+
+    transport = httpx.ASGITransport(app=create_app())
+    received = 0
+    async with httpx.AsyncClient(transport=transport) as client:
+        async for _, image in unsplash_service.stream_photo_images(
+            ["cats", "dogs"], count // 2, client=client
+        ):
+            received += not isinstance(image, Exception)
+    return received
+
+
+def run(args) -> dict:
+    from qdrant_client import QdrantClient
+
+    client = QdrantClient(location=":memory:")
+    provision_collection(client, qdrant_service.COLLECTION_NAME)
+    qdrant_service._client = client
+    # The fake server accepts any key
+    unsplash_service.UNSPLASH_API_KEY = unsplash_service.UNSPLASH_API_KEY or "fake"
+
+    photos = [photo_record(seed) for seed in range(args.photos)]
+    jpegs = [photo_jpeg(seed) for seed in range(args.photos)]
+    batch = list(zip(photos, _decode(jpegs)))
+    embedded = embed_photos(batch)
+
+    def ingest():
+        decoded = list(zip(photos, _decode(jpegs)))
+        stored = []
+        for start in range(0, len(decoded), args.batch_size):
+            stored.extend(embed_photos(decoded[start : start + args.batch_size]))
+        upsert_points(stored)
+
+    rounds = max(1, args.rounds // 10)
+    return {
+        "ingestion.decode": measure(
+            lambda: _decode(jpegs), rounds=rounds, warmup=1, items=len(jpegs)
+        ),
+        "ingestion.embed": measure(
+            lambda: embed_photos(batch[: args.batch_size]),
+            rounds=rounds,
+            warmup=1,
+            items=min(args.batch_size, len(batch)),
+        ),
+        "ingestion.upsert": measure(
+            lambda: upsert_points(embedded),
+            rounds=rounds,
+            warmup=1,
+            items=len(embedded),
+        ),
+        "ingestion.total": measure(ingest, rounds=rounds, warmup=1, items=len(photos)),
+        "ingestion.stream": measure(
+            lambda: asyncio.run(_stream(args.photos)),
+            rounds=rounds,
+            warmup=1,
+            items=args.photos // 2 * 2,
+        ),
+    }
@@ -0,0 +1,267 @@
+"""
+Purpose:
+    - Find where the deployment saturates: replay a corpus of doodle PNGs
+      against POST /api/search-doodle at increasing load with an async client
+        closed loop  --concurrency 1,2,4,...  N clients sending back to back
+        open loop    --rates 5,10,20,...     requests started on a fixed schedule
+                     (latency counted from the scheduled start, so queueing
+                     is not hidden by a slow client)
+    - Report per step: throughput, p50/p95/p99 latency, error rate, statuses
+    - Report the saturation knee: the last step that still added throughput
+      (closed loop) or kept up with the offered rate (open loop) within the
+      error budget
+    - Targets a running server (--url) or, by default, the app in-process with
+      an in-memory Qdrant collection, so it runs on a laptop with no services
+
+Usage:
+    poetry run python -m benchmarks.loadtest
+    poetry run python -m benchmarks.loadtest --concurrency 1,2,4,8,16,32 --duration 20
+    poetry run python -m benchmarks.loadtest --rates 5,10,20,40 --duration 30
+    poetry run python -m benchmarks.loadtest --url http://localhost:8000 --corpus pngs/
+
+Notes:
+    In-process, the client shares the event loop and CPU with the app, so the
+    absolute numbers are a lower bound; use --url against uvicorn for capacity
+    planning of a real deployment. Corpus images repeat once every image has
+    been sent, and repeats hit the embedding and search caches: size --doodles
+    or the corpus larger than the requests per step to measure cold searches.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from itertools import count
+from pathlib import Path
+import numpy as np
+from benchmarks.fixtures import doodle_base64, in_process_client
+from utils.logger import logger
+
+DEFAULT_OUTPUT = Path(__file__).resolve().parent / "results" / "loadtest.json"
+SEARCH_PATH = "/api/search-doodle"
+
+
+class Step:
+    """Outcomes of one load level."""
+
+    def __init__(self):
+        self.latencies_ns: list[int] = []
+        self.statuses: Counter = Counter()
+        self.started = time.perf_counter_ns()
+        self.finished = self.started
+
+    def record(self, latency_ns: int, status: str):
+        self.latencies_ns.append(latency_ns)
+        self.statuses[status] += 1
+
+    def summary(self) -> dict:
+        requests = sum(self.statuses.values())
+        ok = self.statuses.get("200", 0)
+        elapsed_s = max(self.finished - self.started, 1) / 1e9
+        result = {
+            "requests": requests,
+            "errors": requests - ok,
+            "error_rate": round((requests - ok) / requests, 4) if requests else 0.0,
+            "throughput_per_s": round(ok / elapsed_s, 2),
+            "statuses": dict(self.statuses),
+        }
+        if self.latencies_ns:
+            latencies_ms = np.asarray(self.latencies_ns, dtype=np.float64) / 1e6
+            p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+            result.update(
+                p50_ms=round(float(p50), 2),
+                p95_ms=round(float(p95), 2),
+                p99_ms=round(float(p99), 2),
+            )
+        return result
+
+
+def load_corpus(corpus: Path | None, doodles: int) -> list[str]:
+    """Base64 PNG payloads from a directory of PNGs, or synthetic doodles."""
+    if corpus is None:
+        logger.info(f"Rendering {doodles} synthetic doodles")
+        return [doodle_base64(seed) for seed in range(doodles)]
+    paths = sorted(corpus.glob("*.png"))
+    if not paths:
+        raise SystemExit(f"No .png files in {corpus}")
+    return [base64.b64encode(path.read_bytes()).decode() for path in paths]
+
+
+async def _send(client, payload: str, step: Step, scheduled_ns: int):
+    try:
+        response = await client.post(SEARCH_PATH, json={"image_data": payload})
+        status = str(response.status_code)
+    except Exception as e:
+        status = type(e).__name__
+    step.record(time.perf_counter_ns() - scheduled_ns, status)
+
+
+async def closed_loop(client, payloads, next_index, concurrency, duration) -> Step:
+    """`concurrency` clients each send the next request as soon as one returns."""
+    step = Step()
+    deadline = step.started + int(duration * 1e9)
+
+    async def user():
+        while time.perf_counter_ns() < deadline:
+            payload = payloads[next(next_index) % len(payloads)]
+            await _send(client, payload, step, time.perf_counter_ns())
+
+    await asyncio.gather(*[user() for _ in range(concurrency)])
+    step.finished = time.perf_counter_ns()
+    return step
+
+
+async def open_loop(client, payloads, next_index, rate, duration, max_in_flight):
+    """
+    Start one request every 1/rate seconds regardless of how many are pending.
+    Arrivals beyond max_in_flight are counted as "dropped" errors, not sent.
+    """
+    step = Step()
+    interval_ns = int(1e9 / rate)
+    in_flight: set[asyncio.Task] = set()
+    for i in range(int(rate * duration)):
+        scheduled = step.started + i * interval_ns
+        delay = (scheduled - time.perf_counter_ns()) / 1e9
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            step.statuses["dropped"] += 1
+            continue
+        payload = payloads[next(next_index) % len(payloads)]
+        task = asyncio.create_task(_send(client, payload, step, scheduled))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    step.finished = time.perf_counter_ns()
+    return step
+
+
+def find_knee(steps: list[dict], key: str, min_gain: float, max_error_rate: float):
+    """
+    Return the load level where the service saturates.
+
+    Closed loop: the last step whose throughput grew by at least min_gain over
+    the previous one. Open loop: the last rate served at >= (1 - min_gain) of
+    the offered rate. Steps over the error budget end the search.
+    """
+    knee = None
+    previous = None
+    for step in steps:
+        if step["error_rate"] > max_error_rate:
+            break
+        throughput = step["throughput_per_s"]
+        if key == "rate":
+            if throughput < step["rate"] * (1 - min_gain):
+                break
+        elif previous is not None and throughput < previous * (1 + min_gain):
+            break
+        knee, previous = step[key], throughput
+    return knee
+
+
+@asynccontextmanager
+async def http_client(args):
+    if args.url is None:
+        async with in_process_client(args.gallery) as client:
+            yield client
+        return
+
+    import httpx
+
+    limit = max(args.concurrency or [1]) if args.rates is None else args.max_in_flight
+    async with httpx.AsyncClient(
+        base_url=args.url,
+        timeout=args.timeout,
+        limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit),
+    ) as client:
+        yield client
+
+
+async def run(args) -> dict:
+    payloads = load_corpus(args.corpus, args.doodles)
+    next_index = count()
+    key = "rate" if args.rates else "concurrency"
+    levels = args.rates or args.concurrency
+    steps = []
+
+    async with http_client(args) as client:
+        # Warm-up: first requests pay for lazy session and cache setup
+        for _ in range(args.warmup):
+            await _send(client, payloads[next(next_index) % len(payloads)], Step(), 0)
+
+        for level in levels:
+            if key == "rate":
+                step = await open_loop(
+                    client,
+                    payloads,
+                    next_index,
+                    level,
+                    args.duration,
+                    args.max_in_flight,
+                )
+            else:
+                step = await closed_loop(
+                    client, payloads, next_index, level, args.duration
+                )
+            summary = {key: level, **step.summary()}
+            steps.append(summary)
+            logger.info(
+                f"{key}={level:<6} {summary['throughput_per_s']:>8.1f} req/s  "
+                f"p50 {summary.get('p50_ms', 0):.1f} ms  "
+                f"p95 {summary.get('p95_ms', 0):.1f} ms  "
+                f"p99 {summary.get('p99_ms', 0):.1f} ms  "
+                f"errors {summary['error_rate']:.1%}"
+            )
+
+    knee = find_knee(steps, key, args.knee_gain, args.max_error_rate)
+    logger.info(f"Saturation knee: {key}={knee}")
+    return {
+        "target": args.url or "in-process",
+        "mode": "open" if args.rates else "closed",
+        "duration_s": args.duration,
+        "corpus_size": len(payloads),
+        "steps": steps,
+        "knee": {key: knee},
+    }
+
+
+def parse_levels(kind):
+    return lambda value: [kind(v) for v in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--url", help="Running server (default: in-process app)")
+    parser.add_argument("--corpus", type=Path, help="Directory of doodle PNGs")
+    parser.add_argument("--doodles", type=int, default=512, help="Synthetic corpus")
+    parser.add_argument(
+        "--concurrency", type=parse_levels(int), default=[1, 2, 4, 8, 16, 32]
+    )
+    parser.add_argument("--rates", type=parse_levels(float), help="Open loop, req/s")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per step")
+    parser.add_argument("--warmup", type=int, default=5, help="Requests before step 1")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--gallery", type=int, default=2000, help="In-process points")
+    parser.add_argument("--knee-gain", type=float, default=0.1)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    # Per-batch debug lines would drown the summary
+    logger.setLevel(logging.INFO)
+    report = asyncio.run(run(args))
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2) + "\n")
+    logger.info(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Purpose:
+    - Benchmark doodle decoding and CLIP preprocessing:
+        decode     base64 PNG -> canonical image (what the request path runs first)
+        per_image  preprocess_image on each image of a batch
+        batch      preprocess_batch into the reusable input buffer
+
+Usage:
+    poetry run python -m benchmarks.run --suites preprocess
+"""
+
+from benchmarks.fixtures import doodle_base64, make_doodle
+from benchmarks.timing import measure
+from services.clip_service import (
+    canonicalize_image,
+    preprocess_batch,
+    preprocess_image,
+)
+from utils.images import decode_base64_image
+
+
+def run(args) -> dict:
+    payload = doodle_base64(seed=0)
+    images = [make_doodle(seed) for seed in range(args.batch_size)]
+    for image in images:
+        image.load()
+
+    return {
+        "preprocess.decode": measure(
+            lambda: canonicalize_image(decode_base64_image(payload)),
+            rounds=args.rounds,
+            warmup=args.warmup,
+        ),
+        "preprocess.per_image": measure(
+            lambda: [preprocess_image(image) for image in images],
+            rounds=args.rounds,
+            warmup=args.warmup,
+            items=len(images),
+        ),
+        "preprocess.batch": measure(
+            lambda: preprocess_batch(images),
+            rounds=args.rounds,
+            warmup=args.warmup,
+            items=len(images),
+        ),
+    }
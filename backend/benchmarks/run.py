@@ -0,0 +1,144 @@
+"""
+Purpose:
+    - Run the benchmark suites and write one JSON document with the environment
+      and, per case, throughput and p50/p95/p99 latency
+    - Compare the run against a saved baseline and exit with status 1 when a
+      case regressed by more than --tolerance (throughput, p50 or p95)
+    - Suites that need the ONNX model are recorded as skipped when it is missing
+
+Usage:
+    poetry run python -m benchmarks.run
+    poetry run python -m benchmarks.run --suites preprocess,search_api --rounds 100
+    poetry run python -m benchmarks.run --update-baseline   # save as the new baseline
+    poetry run python -m benchmarks.run --baseline old.json --tolerance 0.10
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+import numpy as np
+from benchmarks.timing import compare
+from services.clip_service import resolve_model_path
+from utils.logger import logger
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+DEFAULT_OUTPUT = BENCHMARKS_DIR / "results" / "latest.json"
+DEFAULT_BASELINE = BENCHMARKS_DIR / "baseline.json"
+
+# Run order: the search_api lifespan shuts the inference executor down, so it goes last
+SUITES = ("preprocess", "inference", "ingestion", "search_api")
+NEEDS_MODEL = {"inference", "ingestion", "search_api"}
+
+# Settings that change the numbers, recorded with every run
+RECORDED_ENV = (
+    "CLIP_MODEL_VARIANT",
+    "CLIP_MODEL_OPTIMIZED",
+    "ONNX_INTRA_OP_THREADS",
+    "ONNX_INTER_OP_THREADS",
+    "INFERENCE_WORKERS",
+    "INFERENCE_WORKER_TYPE",
+    "CLIP_MAX_BATCH_SIZE",
+    "CLIP_MAX_BATCH_WAIT_MS",
+    "SEARCH_BACKEND",
+)
+
+
+def environment(args) -> dict:
+    import onnxruntime
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "onnxruntime": onnxruntime.__version__,
+        "model": resolve_model_path().name,
+        "env": {name: os.environ[name] for name in RECORDED_ENV if name in os.environ},
+        "args": {k: v for k, v in vars(args).items() if not isinstance(v, Path)},
+    }
+
+
+def run_suites(args) -> dict:
+    results = {}
+    model_available = resolve_model_path().exists()
+    for name in args.suites:
+        if name in NEEDS_MODEL and not model_available:
+            logger.warning(f"Skipping {name}: {resolve_model_path()} not found")
+            results[name] = {"skipped": "model not found"}
+            continue
+        logger.info(f"== {name} ==")
+        suite = importlib.import_module(f"benchmarks.{name}")
+        for case, result in suite.run(args).items():
+            results[case] = result
+            logger.info(
+                f"{case:<24} {result['throughput_per_s']:>10.1f}/s  "
+                f"p50 {result['p50_ms']:.2f} ms  p95 {result['p95_ms']:.2f} ms  "
+                f"p99 {result['p99_ms']:.2f} ms"
+            )
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--suites",
+        type=lambda value: value.split(","),
+        default=list(SUITES),
+        help=f"Comma-separated subset of {','.join(SUITES)}",
+    )
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--gallery", type=int, default=2000, help="Points in Qdrant")
+    parser.add_argument("--photos", type=int, default=64, help="Ingested photos")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        parser.error(f"Unknown suites: {', '.join(sorted(unknown))}")
+    args.suites = [name for name in SUITES if name in args.suites]
+    return args
+
+
+def main():
+    args = parse_args()
+    # Per-batch debug lines would drown the summary
+    logger.setLevel(logging.INFO)
+    report = {"environment": environment(args), "results": run_suites(args)}
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2) + "\n")
+    logger.info(f"Wrote {args.output}")
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        logger.info(f"Saved baseline {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        logger.info(f"No baseline at {args.baseline}, nothing to compare")
+        return
+    baseline = json.loads(args.baseline.read_text())
+    regressions = compare(report["results"], baseline["results"], args.tolerance)
+    if regressions:
+        logger.error(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for line in regressions:
+            logger.error(f"  {line}")
+        sys.exit(1)
+    logger.info(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Purpose:
+    - Benchmark POST /api/search-doodle end to end (routing, validation, decode,
+      micro-batched embedding, classification, vector search, serialization)
+      through an in-process ASGI client
+    - The app runs its real lifespan against an in-memory Qdrant collection,
+      so no server or network is needed:
+        cold        a new doodle per request (embedding and search cache misses)
+        warm        the same doodle every time (both caches hit)
+        concurrent  new doodles, --concurrency requests in flight
+        tta         a new doodle per request with test-time augmentation (all
+                    views in one batched inference, fused results)
+        burst       --concurrency identical requests in flight per new doodle
+                    (a retry storm; duplicates join one in-flight search)
+    - The semantic (near-duplicate) cache is switched off for the suite, so the
+      cold cases measure full searches whatever the fixtures' similarity
+
+Usage:
+    poetry run python -m benchmarks.run --suites search_api --concurrency 16
+"""
+
+import asyncio
+from benchmarks.fixtures import doodle_base64, in_process_client
+from benchmarks.timing import measure_async
+from services.semantic_cache import semantic_cache
+from utils.logger import logger
+
+
+async def _run(args) -> dict:
+    calls = args.warmup + args.rounds
+    logger.info(f"Rendering {4 * calls} doodle fixtures")
+    cold_payloads = [doodle_base64(seed) for seed in range(calls)]
+    concurrent_payloads = [doodle_base64(seed) for seed in range(calls, 2 * calls)]
+    tta_payloads = [doodle_base64(seed) for seed in range(2 * calls, 3 * calls)]
+    # Timed calls i..i+concurrency-1 share a doodle; warmup calls get their own
+    burst_payloads = [
+        doodle_base64(3 * calls + args.warmup + (i - args.warmup) // args.concurrency)
+        for i in range(calls)
+    ]
+
+    async with in_process_client(args.gallery) as http:
+
+        def search(payloads: list[str], **options):
+            async def call(i: int):
+                response = await http.post(
+                    "/api/search-doodle", json={"image_data": payloads[i], **options}
+                )
+                response.raise_for_status()
+
+            return call
+
+        return {
+            "search_api.cold": await measure_async(
+                search(cold_payloads), rounds=args.rounds, warmup=args.warmup
+            ),
+            "search_api.warm": await measure_async(
+                search(cold_payloads[:1] * calls),
+                rounds=args.rounds,
+                warmup=args.warmup,
+            ),
+            "search_api.concurrent": await measure_async(
+                search(concurrent_payloads),
+                rounds=args.rounds,
+                warmup=args.warmup,
+                concurrency=args.concurrency,
+            ),
+            "search_api.tta": await measure_async(
+                search(tta_payloads, tta=True), rounds=args.rounds, warmup=args.warmup
+            ),
+            "search_api.burst": await measure_async(
+                search(burst_payloads),
+                rounds=args.rounds,
+                warmup=args.warmup,
+                concurrency=args.concurrency,
+            ),
+        }
+
+
+def run(args) -> dict:
+    threshold = semantic_cache.threshold
+    semantic_cache.threshold = float("inf")
+    try:
+        return asyncio.run(_run(args))
+    finally:
+        semantic_cache.threshold = threshold
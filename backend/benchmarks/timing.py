@@ -0,0 +1,105 @@
+"""
+Purpose:
+    - Time benchmark cases (sync, or async with bounded concurrency) with
+      perf_counter_ns and summarize them as throughput and latency percentiles
+    - Compare a run against a saved baseline and list the regressions
+
+Usage:
+    from benchmarks.timing import measure
+    result = measure(lambda: preprocess_batch(images), rounds=50, items=len(images))
+"""
+
+import asyncio
+import gc
+import time
+from typing import Awaitable, Callable
+import numpy as np
+
+# Metrics compared against the baseline, and whether higher is better
+COMPARED_METRICS = {"throughput_per_s": True, "p50_ms": False, "p95_ms": False}
+
+
+def summarize(samples_ns: list[int], wall_ns: int, items: int) -> dict:
+    """
+    Args:
+        samples_ns: Latency of each call
+        wall_ns: Wall time of the timed phase (shorter than the sum under concurrency)
+        items: Items processed per call (images in a batch, photos in a chunk)
+    """
+    samples_ms = np.asarray(samples_ns, dtype=np.float64) / 1e6
+    p50, p95, p99 = np.percentile(samples_ms, [50, 95, 99])
+    return {
+        "rounds": len(samples_ns),
+        "items_per_call": items,
+        "throughput_per_s": round(len(samples_ns) * items / (wall_ns / 1e9), 2),
+        "mean_ms": round(float(samples_ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(samples_ms.max()), 3),
+    }
+
+
+def measure(fn: Callable[[], object], rounds: int, warmup: int = 3, items: int = 1):
+    """Call fn warmup + rounds times and summarize the timed rounds."""
+    for _ in range(warmup):
+        fn()
+    gc.collect()
+
+    samples = []
+    started = time.perf_counter_ns()
+    for _ in range(rounds):
+        start = time.perf_counter_ns()
+        fn()
+        samples.append(time.perf_counter_ns() - start)
+    return summarize(samples, time.perf_counter_ns() - started, items)
+
+
+async def measure_async(
+    make_call: Callable[[int], Awaitable[object]],
+    rounds: int,
+    warmup: int = 3,
+    concurrency: int = 1,
+    items: int = 1,
+) -> dict:
+    """
+    Await make_call(i) for i in range(warmup + rounds), at most `concurrency`
+    at a time, and summarize the timed calls. The index lets callers send a
+    distinct input per call (to defeat the caches).
+    """
+    for i in range(warmup):
+        await make_call(i)
+    gc.collect()
+
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def timed(i: int):
+        async with semaphore:
+            start = time.perf_counter_ns()
+            await make_call(i)
+            samples.append(time.perf_counter_ns() - start)
+
+    started = time.perf_counter_ns()
+    await asyncio.gather(*[timed(warmup + i) for i in range(rounds)])
+    return summarize(samples, time.perf_counter_ns() - started, items)
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Return one line per metric that is worse than the baseline by more than
+    `tolerance` (a fraction, 0.15 = 15%). Cases missing from either run are skipped.
+    """
+    regressions = []
+    for case, result in sorted(current.items()):
+        reference = baseline.get(case)
+        if not reference or "skipped" in result or "skipped" in reference:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            new, old = result.get(metric), reference.get(metric)
+            if not new or not old:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(f"{case} {metric}: {old} -> {new} ({change:+.1%})")
+    return regressions
@@ -1,12 +1,43 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from routes import health, search
+from routes import health, metrics, search, stats
 from fastapi.middleware.cors import CORSMiddleware
+from services.cache_service import search_cache
+from services.inference_executor import shutdown_inference_executor
+from services.qdrant_service import close_async_client
+from services.lifecycle import warm_up
+from services.metrics import timing_middleware
+from services.search_service import get_collection_version_async
+from services.semantic_cache import semantic_cache
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so liveness (/api/health) answers right away;
+    # readiness (/api/ready) stays 503 until the model and search backend are loaded
+    warm_up_task = asyncio.create_task(warm_up())
+    # Drop cached results (semantic and exact) when the collection is repopulated
+    cache_watch_task = asyncio.create_task(
+        semantic_cache.watch(get_collection_version_async, on_change=search_cache.clear)
+    )
+    yield
+    warm_up_task.cancel()
+    cache_watch_task.cancel()
+    await close_async_client()
+    shutdown_inference_executor()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(health.router, prefix="/api", tags=["Health"])
 app.include_router(search.router, prefix="/api", tags=["Search"])
+app.include_router(stats.router, prefix="/api", tags=["Stats"])
+# Prometheus scrapes /metrics at the root by convention
+app.include_router(metrics.router, tags=["Metrics"])
+
+# Per-request latency histogram and Server-Timing header
+app.middleware("http")(timing_middleware)
 
 
 app.add_middleware(
@@ -1,4 +1,6 @@
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Response, status
+
+from services.lifecycle import get_readiness
 
 router = APIRouter()
 
@@ -6,3 +8,11 @@ router = APIRouter()
 @router.get("/health", status_code=status.HTTP_200_OK, summary="Health check")
 async def health_check():
     return {"status": "healthy"}
+
+
+@router.get("/ready", status_code=status.HTTP_200_OK, summary="Readiness check")
+async def readiness_check(response: Response):
+    readiness = get_readiness()
+    if not readiness["ready"]:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return readiness
@@ -0,0 +1,100 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from services.admission import admission
+from services.cache_service import embedding_cache, search_cache
+from services.clip_service import batcher
+from services.inference_executor import get_queue_metrics
+from services.metrics import register_gauge, render_metrics
+from services.semantic_cache import semantic_cache
+from services.single_flight import search_flights
+
+router = APIRouter()
+
+# Saturation signals, read at scrape time
+register_gauge(
+    "doodlematcher_inference_in_flight",
+    "Jobs submitted to the inference executor and not finished",
+    lambda: get_queue_metrics()["in_flight"],
+)
+register_gauge(
+    "doodlematcher_inference_queued",
+    "Inference jobs waiting for a free worker",
+    lambda: get_queue_metrics()["queued"],
+)
+register_gauge(
+    "doodlematcher_inference_rejected",
+    "Inference jobs rejected because the queue was full (since start)",
+    lambda: get_queue_metrics()["rejected"],
+)
+register_gauge(
+    "doodlematcher_clip_batch_queue_depth",
+    "Images waiting for the embedding micro-batcher",
+    lambda: batcher.get_stats()["queue_depth"],
+)
+register_gauge(
+    "doodlematcher_clip_avg_batch_size",
+    "Average micro-batch size since start",
+    lambda: batcher.get_stats()["avg_batch_size"],
+)
+register_gauge(
+    "doodlematcher_embedding_cache_hit_rate",
+    "Embedding cache hit rate since start",
+    lambda: embedding_cache.get_stats()["hit_rate"],
+)
+register_gauge(
+    "doodlematcher_search_cache_hit_rate",
+    "Search result cache hit rate since start",
+    lambda: search_cache.get_stats()["hit_rate"],
+)
+
+register_gauge(
+    "doodlematcher_semantic_cache_hit_rate",
+    "Semantic (near-duplicate) search cache hit rate since start",
+    lambda: semantic_cache.get_stats()["hit_rate"],
+)
+register_gauge(
+    "doodlematcher_semantic_cache_entries",
+    "Query embeddings held by the semantic cache",
+    lambda: semantic_cache.get_stats()["entries"],
+)
+register_gauge(
+    "doodlematcher_semantic_cache_oldest_entry_age_seconds",
+    "Age of the oldest semantic cache entry",
+    lambda: semantic_cache.get_stats()["oldest_entry_age_seconds"],
+)
+register_gauge(
+    "doodlematcher_semantic_cache_seconds_since_invalidation",
+    "Time since the semantic cache was last invalidated",
+    lambda: semantic_cache.get_stats()["seconds_since_invalidation"],
+)
+register_gauge(
+    "doodlematcher_search_flights_in_flight",
+    "Searches in flight that identical requests can join",
+    lambda: search_flights.get_stats()["in_flight"],
+)
+register_gauge(
+    "doodlematcher_admission_limit",
+    "Adaptive cap on concurrently running searches",
+    lambda: admission.get_stats()["limit"],
+)
+register_gauge(
+    "doodlematcher_admission_in_flight",
+    "Searches holding an admission slot",
+    lambda: admission.get_stats()["in_flight"],
+)
+register_gauge(
+    "doodlematcher_admission_queued",
+    "Searches waiting for an admission slot",
+    lambda: admission.get_stats()["queued"],
+)
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    summary="Prometheus metrics",
+    include_in_schema=False,
+)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
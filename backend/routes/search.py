@@ -1,73 +1,660 @@
-from fastapi import HTTPException, APIRouter
-import base64
-import binascii
-import io
+from fastapi import HTTPException, APIRouter, Header, Query, Request
+import asyncio
 import time
+from typing import Any, Callable, List, Optional
+import numpy as np
 from PIL import Image
+from pydantic import ValidationError
 
-from schemas.search import SearchRequest, SearchResponse, MatchResult
-from services.clip_service import get_image_embedding
-from services.qdrant_service import search_similar_images
-from utils.exceptions import SearchRequestError, QdrantServiceError, ClipServiceError
+from schemas.search import (
+    AnimalPrediction,
+    SearchFilters,
+    SearchRequest,
+    SearchResponse,
+    MatchResult,
+    BatchSearchRequest,
+    BatchSearchItem,
+    BatchSearchResponse,
+)
+from services.admission import (
+    ADMISSION_DEGRADED,
+    ADMISSION_TIMEOUT_MS,
+    Ticket,
+    admission,
+)
+from services.augmentation import (
+    TTA_CANDIDATES,
+    TTA_FUSION,
+    best_per_animal,
+    doodle_views,
+    fuse_results,
+)
+from services.cache_service import (
+    content_key,
+    embedding_cache,
+    payload_keys,
+    search_cache,
+)
+from services.clip_service import (
+    canonicalize_image,
+    get_image_embedding_batched,
+    get_image_embeddings_async,
+    get_image_embeddings_timed,
+    record_embedding_stages,
+)
+from services.inference_executor import run_in_inference_executor
+from services.label_classifier import (
+    CLASSIFIER_MAX_TYPES,
+    animal_types_for_filter,
+    predict_animal_types,
+)
+from services.metrics import (
+    current_timings_ms,
+    degraded_responses,
+    observe_stage,
+    record_error,
+    stage,
+)
+from services.search_service import (
+    refresh_search_index,
+    search_similar_images_async,
+    search_similar_images_batch_async,
+)
+from services.semantic_cache import semantic_cache
+from services.single_flight import payload_key, search_flights
+from utils.exceptions import (
+    AdmissionRejectedError,
+    SearchRequestError,
+    QdrantServiceError,
+    ClipServiceError,
+    InferenceQueueFullError,
+)
+from utils.images import (
+    decode_base64_image,
+    decode_image_bytes,
+    extract_multipart_image,
+)
 from utils.logger import logger
 
 router = APIRouter()
 
+# Largest raw upload accepted by /search-doodle/upload
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
 
-@router.post("/search-doodle", response_model=SearchResponse)
-async def search_doodle(request: SearchRequest):
-    start_time = time.time()
-    try:
-        # 1. Decode base64 image
-        image_data = request.image_data
-        if image_data.startswith("data:image/png;base64,"):
-            image_data = image_data.replace("data:image/png;base64,", "")
 
-        try:
-            image_bytes = base64.b64decode(image_data)
-            image = Image.open(io.BytesIO(image_bytes))
-        except binascii.Error as e:
-            raise SearchRequestError("Invalid base64 image data") from e
-        except Exception as e:
-            raise SearchRequestError("Failed to open image") from e
-
-        # 2. Generate embedding
-        try:
-            embedding = get_image_embedding(image)
-            if embedding is None:
-                raise ClipServiceError("Embedding returned None")
-        except ClipServiceError as e:
-            logger.error(f"Embedding error: {e}", exc_info=True)
-            raise HTTPException(status_code=500, detail="Failed to generate embedding")
-
-        # 3. Search Qdrant
-        try:
-            search_results = search_similar_images(embedding, limit=3)
-        except QdrantServiceError as e:
-            logger.error(f"Qdrant search error: {e}", exc_info=True)
-            raise HTTPException(status_code=500, detail="Search failed")
-
-        # 4. Convert to response
-        matches = []
-        for photo_url, similarity, animal_type, photographer in search_results:
-            confidence = max(0, min(100, (similarity + 1) * 50))
-            matches.append(
-                MatchResult(
-                    photo_url=photo_url,
-                    confidence=round(confidence, 1),
-                    animal_type=animal_type,
-                    photographer=photographer,
+def _decode_search_image(image_data: str) -> tuple[Image.Image, str]:
+    """Decode a base64 doodle into its canonical form and content cache key."""
+    image = canonicalize_image(decode_base64_image(image_data))
+    return image, content_key(image)
+
+
+def _decode_search_bytes(image_bytes: bytes | memoryview) -> tuple[Image.Image, str]:
+    """Decode raw image bytes into their canonical form and content cache key."""
+    image = canonicalize_image(decode_image_bytes(image_bytes))
+    return image, content_key(image)
+
+
+def _decode_search_image_views(image_data: str) -> tuple[list, list[str]]:
+    """Decode a base64 doodle into its TTA views and their content cache keys."""
+    views = doodle_views(decode_base64_image(image_data))
+    return views, [content_key(view) for view in views]
+
+
+def _decode_search_bytes_views(
+    image_bytes: bytes | memoryview,
+) -> tuple[list, list[str]]:
+    """Decode raw image bytes into their TTA views and content cache keys."""
+    views = doodle_views(decode_image_bytes(image_bytes))
+    return views, [content_key(view) for view in views]
+
+
+# (single image, TTA views) decode functions per request payload format
+BASE64_DECODERS = (_decode_search_image, _decode_search_image_views)
+BYTES_DECODERS = (_decode_search_bytes, _decode_search_bytes_views)
+
+
+def _to_matches(search_results: list[tuple[str, float, str, str]]) -> list[MatchResult]:
+    """Convert raw similarity scores into MatchResults with 0-100 confidence."""
+    matches = []
+    for photo_url, similarity, animal_type, photographer in search_results:
+        confidence = max(0, min(100, (similarity + 1) * 50))
+        matches.append(
+            MatchResult(
+                photo_url=photo_url,
+                confidence=round(confidence, 1),
+                animal_type=animal_type,
+                photographer=photographer,
+            )
+        )
+    return matches
+
+
+async def _embed_views(
+    views: list[Image.Image], keys: list[str]
+) -> tuple[np.ndarray, bool]:
+    """
+    Embed TTA views, reusing cached embeddings per view; every miss goes
+    through a single batched ONNX call.
+
+    Returns:
+        (np.ndarray of shape (len(views), 512), whether inference ran)
+    """
+    embeddings = [await embedding_cache.aget(key) for key in keys]
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        fresh = await get_image_embeddings_async([views[i] for i in missing])
+        for i, embedding in zip(missing, fresh):
+            embeddings[i] = embedding
+            await embedding_cache.aput(keys[i], embedding)
+    return np.stack(embeddings), bool(missing)
+
+
+async def _search_views(
+    embeddings: np.ndarray,
+    filters: SearchFilters,
+    animal_types: list[str] | None,
+) -> list[tuple[str, float, str, str]]:
+    """One similarity query per view (batched when flat), fused into one ranking."""
+    fusion = filters.fusion or TTA_FUSION
+    if filters.grouped:
+        # A grouped query per view: flat candidates can be dominated by a few
+        # animal types and yield fewer than limit groups. Every view's winners
+        # are kept, so the fused list has as many animal types as any one view
+        per_view = await asyncio.gather(
+            *(
+                search_similar_images_async(
+                    embedding,
+                    limit=filters.limit,
+                    animal_types=animal_types,
+                    grouped=True,
                 )
+                for embedding in embeddings
             )
+        )
+        depth = sum(len(results) for results in per_view)
+        fused = fuse_results(per_view, limit=depth, fusion=fusion)
+        return best_per_animal(fused, filters.limit)
+    per_view = await search_similar_images_batch_async(
+        embeddings,
+        limit=max(TTA_CANDIDATES, filters.limit),
+        animal_types=animal_types,
+    )
+    return fuse_results(per_view, limit=filters.limit, fusion=fusion)
 
-        search_time_ms = int((time.time() - start_time) * 1000)
-        return SearchResponse(matches=matches, search_time_ms=search_time_ms)
+
+async def _search(
+    decoders: tuple[Callable[[Any], tuple[Any, Any]], ...],
+    payload: Any,
+    filters: SearchFilters,
+    cache_only: bool = False,
+    digest: str | None = None,
+    ticket: Ticket | None = None,
+):
+    """
+    Shared search pipeline: decode -> embed -> search -> build SearchResponse.
+
+    With filters.tta, the views decoder returns (views, cache keys) instead:
+    the views are embedded in one batch, searched in one batched query and
+    their results fused; classification uses the mean of the view embeddings.
+
+    Args:
+        decoders: (single image, TTA views) executor-safe functions turning
+            payload into (canonical image, cache key) / (views, cache keys)
+        payload: Request image data in the format the decoders expect
+        filters: animal_type filter, grouped mode, result limit and TTA options
+        cache_only: Degraded mode: answer only from cached embeddings and
+            results, without decoding, inference or a vector search (raises
+            AdmissionRejectedError on a miss); needs digest
+        digest: payload_key(payload); recorded after a single-image decode so
+            a later cache-only answer can find the content key
+        ticket: Admission slot; marked measured when the request ran both
+            inference and a vector search (cache hits are not load samples)
+    """
+    start_ns = time.perf_counter_ns()
+    try:
+        # 1. Decode image (off the event loop). Cache-only answers skip it: the
+        # content key comes from the payload hash of an earlier decode
+        if cache_only:
+            image, cache_key = None, payload_keys.get(digest)
+            if cache_key is None:
+                raise _not_cached()
+        else:
+            decode = decoders[1] if filters.tta else decoders[0]
+            with stage("decode"):
+                image, cache_key = await run_in_inference_executor(decode, payload)
+            if digest is not None and not filters.tta:
+                payload_keys.put(digest, cache_key)
+
+        # 2. Generate embedding (cached by content, batched with concurrent requests)
+        view_embeddings = None
+        inferred = False
+        if filters.tta:
+            views, view_keys = image, cache_key
+            cache_key = ":".join(view_keys)
+        with stage("embed"):
+            try:
+                if filters.tta:
+                    view_embeddings, inferred = await _embed_views(views, view_keys)
+                    embedding = view_embeddings.mean(axis=0)
+                    embedding /= np.linalg.norm(embedding) or 1.0
+                else:
+                    embedding = await embedding_cache.aget(cache_key)
+                    if embedding is None and cache_only:
+                        raise _not_cached()
+                    if embedding is None:
+                        inferred = True
+                        embedding = await get_image_embedding_batched(image)
+                        await embedding_cache.aput(cache_key, embedding)
+            except ClipServiceError as e:
+                record_error(e)
+                logger.error(f"Embedding error: {e}", exc_info=True)
+                raise HTTPException(
+                    status_code=500, detail="Failed to generate embedding"
+                )
+
+        # 3. Zero-shot animal prediction against the precomputed label matrix
+        with stage("classify"):
+            predictions = predict_animal_types(embedding, top_k=CLASSIFIER_MAX_TYPES)
+        animal_types = filters.animal_types
+        predicted_types = None
+        if animal_types is None and filters.auto_filter:
+            predicted_types = animal_types_for_filter(predictions)
+
+        # 4. Search Qdrant (cached by content and search options, then by
+        # near-duplicate embedding)
+        options = (
+            filters.limit,
+            tuple(animal_types) if animal_types else None,
+            filters.grouped,
+            filters.auto_filter,
+            (filters.fusion or TTA_FUSION) if filters.tta else None,
+        )
+        search_key = (cache_key, *options)
+        with stage("search"):
+            search_results = await search_cache.aget(search_key)
+            if search_results is None:
+                hit = semantic_cache.lookup(embedding, options)
+                if hit is not None:
+                    # Keep the entry's age: the copy expires with the original
+                    search_results, age = hit
+                    await search_cache.aput(search_key, search_results, age=age)
+            if search_results is None and cache_only:
+                raise _not_cached()
+            if search_results is None:
+                try:
+                    if view_embeddings is not None:
+                        search_results = await _search_views(
+                            view_embeddings, filters, animal_types or predicted_types
+                        )
+                    else:
+                        search_results = await search_similar_images_async(
+                            embedding,
+                            limit=filters.limit,
+                            animal_types=animal_types or predicted_types,
+                            grouped=filters.grouped,
+                        )
+                    # An over-narrow prediction must not hide results: fall back
+                    # to the whole collection
+                    if predicted_types and len(search_results) < filters.limit:
+                        if view_embeddings is not None:
+                            search_results = await _search_views(
+                                view_embeddings, filters, None
+                            )
+                        else:
+                            search_results = await search_similar_images_async(
+                                embedding, limit=filters.limit, grouped=filters.grouped
+                            )
+                except QdrantServiceError as e:
+                    record_error(e)
+                    logger.error(f"Qdrant search error: {e}", exc_info=True)
+                    raise HTTPException(status_code=500, detail="Search failed")
+                await search_cache.aput(search_key, search_results)
+                semantic_cache.put(embedding, options, search_results)
+                if ticket is not None and inferred:
+                    ticket.measured = True
+
+        # 5. Convert to response
+        matches = _to_matches(search_results)
+
+        search_time_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
+        return SearchResponse(
+            matches=matches,
+            search_time_ms=search_time_ms,
+            predicted_animals=[
+                AnimalPrediction(animal_type=label, probability=round(p, 4))
+                for label, p in predictions[:3]
+            ],
+            timings_ms=current_timings_ms(),
+        )
 
     except SearchRequestError as e:
+        record_error(e)
         logger.warning(f"Bad search request: {e}", exc_info=True)
         raise HTTPException(status_code=400, detail=str(e))
-    except HTTPException:
+    except InferenceQueueFullError as e:
+        record_error(e)
+        logger.warning(f"Rejecting search, inference queue saturated: {e}")
+        raise HTTPException(
+            status_code=503, detail="Server is busy, please try again shortly"
+        )
+    except (HTTPException, AdmissionRejectedError):
         raise
     except Exception as e:
+        record_error(e)
         logger.error(f"Unexpected search error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Search failed")
+
+
+def _not_cached() -> AdmissionRejectedError:
+    return AdmissionRejectedError(
+        "No cached answer", reason="not_cached", status_code=503, retry_after=1
+    )
+
+
+def _deadline(timeout_ms: Optional[float]) -> float:
+    """Monotonic deadline of a request; clients may shorten the default."""
+    timeout_ms = min(timeout_ms or ADMISSION_TIMEOUT_MS, ADMISSION_TIMEOUT_MS)
+    return time.monotonic() + timeout_ms / 1000
+
+
+def _degraded(response: SearchResponse, mode: str) -> SearchResponse:
+    degraded_responses.inc(mode=mode)
+    response.degraded = mode
+    return response
+
+
+async def _admitted_search(
+    decoders: tuple[Callable[[Any], tuple[Any, Any]], ...],
+    payload: Any,
+    filters: SearchFilters,
+    deadline: float,
+    digest: str,
+) -> SearchResponse:
+    """
+    Run _search under admission control (digest: payload_key(payload)).
+
+    With ADMISSION_DEGRADED, a request that had to wait for a slot skips
+    test-time augmentation (one view to embed instead of five), and a
+    rejected request is still answered when its embedding and results are
+    cached. Otherwise rejections become 429/503 with Retry-After.
+    """
+    try:
+        async with admission.admit(deadline) as ticket:
+            if ticket.queued and filters.tta and ADMISSION_DEGRADED:
+                single_view = filters.model_copy(update={"tta": False})
+                response = await _search(
+                    decoders, payload, single_view, digest=digest, ticket=ticket
+                )
+                return _degraded(response, "single_view")
+            return await _search(
+                decoders, payload, filters, digest=digest, ticket=ticket
+            )
+    except AdmissionRejectedError as rejection:
+        if ADMISSION_DEGRADED:
+            try:
+                response = await _search(
+                    decoders,
+                    payload,
+                    filters.model_copy(update={"tta": False}),
+                    cache_only=True,
+                    digest=digest,
+                )
+            except AdmissionRejectedError:
+                pass
+            else:
+                return _degraded(response, "cache_only")
+        logger.warning(f"Shedding search: {rejection}")
+        raise HTTPException(
+            status_code=rejection.status_code,
+            detail="Server is busy, please try again shortly",
+            headers={"Retry-After": str(rejection.retry_after)},
+        )
+
+
+async def _coalesced_search(
+    decoders: tuple[Callable[[Any], tuple[Any, Any]], ...],
+    payload: Any,
+    filters: SearchFilters,
+    deadline: float,
+) -> SearchResponse:
+    """
+    Run the search once for identical concurrent requests (same payload bytes
+    and search options); the others await it and share its response. Only
+    that one run goes through admission control, under its own deadline; a
+    joining request stops waiting at its own deadline with the same 503.
+
+    A joining request reports its own wall time and a single "coalesced"
+    stage instead of the pipeline breakdown of the request it joined.
+    """
+    start_ns = time.perf_counter_ns()
+    digest = payload_key(payload)
+    key = (digest, filters.model_dump_json(include=set(SearchFilters.model_fields)))
+    try:
+        response, shared = await search_flights.do(
+            key,
+            lambda: _admitted_search(decoders, payload, filters, deadline, digest),
+            timeout=max(0.0, deadline - time.monotonic()),
+        )
+    except asyncio.TimeoutError:
+        # Only a joining request times out here: the run it joined outlasted
+        # this request's own deadline
+        logger.warning("Shedding search: coalesced run outlasted the deadline")
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    if not shared:
+        return response
+    elapsed_ns = time.perf_counter_ns() - start_ns
+    observe_stage("coalesced", elapsed_ns)
+    return response.model_copy(
+        update={
+            "search_time_ms": elapsed_ns // 1_000_000,
+            "timings_ms": current_timings_ms(),
+        }
+    )
+
+
+@router.post("/search-doodle", response_model=SearchResponse)
+async def search_doodle(
+    request: SearchRequest,
+    timeout_ms: Optional[float] = Header(
+        default=None, alias="X-Request-Timeout-Ms", gt=0
+    ),
+):
+    deadline = _deadline(timeout_ms)
+    return await _coalesced_search(
+        BASE64_DECODERS, request.image_data, request, deadline
+    )
+
+
+@router.post(
+    "/search-doodle/upload",
+    response_model=SearchResponse,
+    summary="Search with a raw image/png or multipart/form-data body",
+)
+async def search_doodle_upload(
+    request: Request,
+    animal_type: Optional[List[str]] = Query(default=None),
+    grouped: bool = False,
+    limit: int = 3,
+    auto_filter: bool = False,
+    tta: bool = False,
+    fusion: Optional[str] = None,
+    timeout_ms: Optional[float] = Header(
+        default=None, alias="X-Request-Timeout-Ms", gt=0
+    ),
+):
+    deadline = _deadline(timeout_ms)
+    try:
+        filters = SearchFilters(
+            animal_types=animal_type,
+            grouped=grouped,
+            limit=limit,
+            auto_filter=auto_filter,
+            tta=tta,
+            fusion=fusion,
+        )
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=422, detail=e.errors(include_url=False, include_context=False)
+        )
+
+    content_type = request.headers.get("content-type", "")
+    body = await request.body()
+    if len(body) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image upload too large")
+    if not body:
+        raise HTTPException(status_code=400, detail="Empty request body")
+
+    if content_type.startswith("multipart/form-data"):
+        try:
+            image_bytes = extract_multipart_image(body, content_type)
+        except SearchRequestError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    elif content_type.startswith(("image/", "application/octet-stream")):
+        image_bytes = body
+    else:
+        raise HTTPException(
+            status_code=415,
+            detail="Send an image/png body or multipart/form-data with an image file",
+        )
+
+    return await _coalesced_search(BYTES_DECODERS, image_bytes, filters, deadline)
+
+
+def _embed_isolated(images: list[Image.Image]) -> tuple[list, dict[str, int]]:
+    """
+    Embed a batch in one ONNX call; if that fails, embed one by one so a bad
+    image only fails its own item. Failed items are returned as exceptions,
+    along with the summed preprocess/inference durations (ns).
+    """
+    try:
+        embeddings, timings = get_image_embeddings_timed(images)
+        return list(embeddings), timings
+    except ClipServiceError:
+        results, timings = [], {}
+        for image in images:
+            try:
+                embedding, single = get_image_embeddings_timed([image])
+            except ClipServiceError as e:
+                results.append(e)
+                continue
+            results.append(embedding[0])
+            for name, elapsed_ns in single.items():
+                timings[name] = timings.get(name, 0) + elapsed_ns
+        return results, timings
+
+
+async def _timed_decode(image_data: str) -> tuple[Any, float]:
+    start = time.perf_counter_ns()
+    try:
+        decoded = await run_in_inference_executor(_decode_search_image, image_data)
+    except SearchRequestError as e:
+        record_error(e)
+        decoded = e
+    return decoded, (time.perf_counter_ns() - start) / 1e6
+
+
+@router.post("/search-doodles", response_model=BatchSearchResponse)
+async def search_doodles(request: BatchSearchRequest):
+    """
+    Search several doodles at once: decode each image, embed all of them in
+    one batched ONNX call and run one batched similarity query. Errors are
+    reported per item instead of failing the whole request.
+    """
+    start_ns = time.perf_counter_ns()
+    items = [
+        BatchSearchItem(index=i, decode_ms=0.0) for i in range(len(request.images))
+    ]
+
+    try:
+        # 1. Decode every image in parallel on the inference executor
+        with stage("decode"):
+            decoded = await asyncio.gather(
+                *[_timed_decode(image_data) for image_data in request.images]
+            )
+
+        embeddings: dict[int, Any] = {}
+        keys: dict[int, str] = {}
+        to_embed: list[tuple[int, Image.Image]] = []
+        for item, (result, decode_ms) in zip(items, decoded):
+            item.decode_ms = round(decode_ms, 2)
+            if isinstance(result, Exception):
+                item.error = str(result)
+                continue
+            image, keys[item.index] = result
+            cached = await embedding_cache.aget(keys[item.index])
+            if cached is not None:
+                embeddings[item.index] = cached
+                item.cached = True
+            else:
+                to_embed.append((item.index, image))
+
+        # 2. Embed all cache misses in a single batched inference
+        with stage("embed"):
+            if to_embed:
+                results, timings = await run_in_inference_executor(
+                    _embed_isolated, [image for _, image in to_embed]
+                )
+                record_embedding_stages(timings)
+                for (index, _), result in zip(to_embed, results):
+                    if isinstance(result, Exception):
+                        record_error(result)
+                        logger.error(f"Embedding error for item {index}: {result}")
+                        items[index].error = "Failed to generate embedding"
+                        continue
+                    embeddings[index] = result
+                    await embedding_cache.aput(keys[index], result)
+
+        # 3. One batched similarity query for every item with an embedding
+        indices = sorted(embeddings)
+        with stage("search"):
+            if indices:
+                try:
+                    batch_results = await search_similar_images_batch_async(
+                        np.stack([embeddings[i] for i in indices]),
+                        limit=request.limit,
+                        animal_types=request.animal_types,
+                    )
+                except QdrantServiceError as e:
+                    record_error(e)
+                    logger.error(f"Qdrant batch search error: {e}", exc_info=True)
+                    raise HTTPException(status_code=500, detail="Search failed")
+                for index, search_results in zip(indices, batch_results):
+                    items[index].matches = _to_matches(search_results)
+
+    except InferenceQueueFullError as e:
+        record_error(e)
+        logger.warning(f"Rejecting batch search, inference queue saturated: {e}")
+        raise HTTPException(
+            status_code=503, detail="Server is busy, please try again shortly"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        record_error(e)
+        logger.error(f"Unexpected batch search error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Search failed")
+
+    search_time_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
+    return BatchSearchResponse(
+        results=items,
+        timings_ms=current_timings_ms(),
+        search_time_ms=search_time_ms,
+    )
+
+
+@router.post("/search-index/refresh", summary="Resync the local search index")
+async def refresh_index():
+    try:
+        count = await asyncio.to_thread(refresh_search_index)
+    except QdrantServiceError as e:
+        logger.error(f"Search index refresh failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Search index refresh failed")
+    # Cached results may point at a stale view of the collection; clearing
+    # also empties the disk tier, and other workers drop their memory copies
+    await asyncio.to_thread(search_cache.clear)
+    semantic_cache.invalidate("index_refresh")
+    return {"points": count}
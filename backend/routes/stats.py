@@ -0,0 +1,25 @@
+from fastapi import APIRouter, status
+
+from services.admission import admission
+from services.cache_service import embedding_cache, search_cache
+from services.clip_service import batcher
+from services.inference_executor import get_queue_metrics
+from services.search_service import get_search_backend_stats
+from services.semantic_cache import semantic_cache
+from services.single_flight import search_flights
+
+router = APIRouter()
+
+
+@router.get("/stats", status_code=status.HTTP_200_OK, summary="Runtime statistics")
+async def get_stats():
+    return {
+        "clip_batching": batcher.get_stats(),
+        "inference_queue": get_queue_metrics(),
+        "embedding_cache": embedding_cache.get_stats(),
+        "search_cache": search_cache.get_stats(),
+        "semantic_cache": semantic_cache.get_stats(),
+        "request_coalescing": search_flights.get_stats(),
+        "admission": admission.get_stats(),
+        "search_backend": get_search_backend_stats(),
+    }
@@ -1,8 +1,41 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, List, Literal, Optional
+from constants.animals_list import ANIMALS
 
+# Upper bound on images per /search-doodles request
+MAX_BATCH_IMAGES = 32
+# Upper bound on matches per query; grouped mode can return every animal type
+MAX_SEARCH_LIMIT = len(ANIMALS)
 
-class SearchRequest(BaseModel):
+
+def _check_animal_types(animal_types: Optional[List[str]]) -> Optional[List[str]]:
+    if animal_types is None:
+        return None
+    unknown = sorted(set(animal_types) - set(ANIMALS))
+    if unknown:
+        raise ValueError(f"Unknown animal types: {', '.join(unknown)}")
+    return sorted(set(animal_types))
+
+
+class SearchFilters(BaseModel):
+    # Only match photos of these animal types (indexed payload filter)
+    animal_types: Optional[List[str]] = Field(default=None, min_length=1)
+    # Return the best match per animal type instead of the overall top matches
+    grouped: bool = False
+    limit: int = Field(default=3, ge=1, le=MAX_SEARCH_LIMIT)
+    # Without animal_types, filter on the animals the label classifier predicts
+    auto_filter: bool = False
+    # Test-time augmentation: search several views of the doodle (crop, padded
+    # square, dilated strokes, flip) embedded in one batch and fuse the results
+    tta: bool = False
+    # How TTA results are fused: reciprocal rank or mean score (server default
+    # TTA_FUSION when unset)
+    fusion: Optional[Literal["rrf", "score"]] = None
+
+    _validate_animal_types = field_validator("animal_types")(_check_animal_types)
+
+
+class SearchRequest(SearchFilters):
     image_data: str  # Base64 encoded PNG
 
 
@@ -13,6 +46,42 @@ class MatchResult(BaseModel):
     photographer: str
 
 
+class AnimalPrediction(BaseModel):
+    animal_type: str
+    probability: float
+
+
 class SearchResponse(BaseModel):
     matches: List[MatchResult]
     search_time_ms: int
+    # Zero-shot animal prediction (empty when the label classifier is not set up)
+    predicted_animals: List[AnimalPrediction] = []
+    # Per-stage breakdown (decode, embed, classify, search), also sent as Server-Timing
+    timings_ms: Dict[str, float] = {}
+    # Set when the answer was degraded under load: "single_view" (TTA skipped)
+    # or "cache_only" (served from cached results instead of being shed)
+    degraded: Optional[Literal["single_view", "cache_only"]] = None
+
+
+class BatchSearchRequest(BaseModel):
+    images: List[str] = Field(
+        min_length=1, max_length=MAX_BATCH_IMAGES
+    )  # Base64 encoded PNGs
+    animal_types: Optional[List[str]] = Field(default=None, min_length=1)
+    limit: int = Field(default=3, ge=1, le=MAX_SEARCH_LIMIT)
+
+    _validate_animal_types = field_validator("animal_types")(_check_animal_types)
+
+
+class BatchSearchItem(BaseModel):
+    index: int
+    matches: List[MatchResult] = []
+    error: Optional[str] = None
+    decode_ms: float
+    cached: bool = False
+
+
+class BatchSearchResponse(BaseModel):
+    results: List[BatchSearchItem]
+    timings_ms: Dict[str, float]
+    search_time_ms: int
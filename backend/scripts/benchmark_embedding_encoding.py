@@ -0,0 +1,197 @@
+"""
+Purpose:
+    - Measure what keeping embeddings in float32 (instead of float64 Python lists)
+      and the optional float16/int8 encodings save, per query and per ingested point:
+        memory per embedding, cache entry size (disk tier pickles),
+        executor transport (pickled batch), Qdrant request size and serialization
+        time for REST (JSON) vs gRPC (packed floats)
+    - Check the accuracy cost of float16/int8 as top-k agreement with float32
+    - Uses random unit vectors, so no model, Qdrant or network access is needed
+
+Usage:
+    poetry run python -m scripts.benchmark_embedding_encoding
+    poetry run python -m scripts.benchmark_embedding_encoding --points 256 --gallery 20000
+"""
+
+import argparse
+import json
+import pickle
+import time
+import tracemalloc
+import uuid
+import numpy as np
+from services.local_index import LocalVectorIndex
+from utils.logger import logger
+from utils.vectors import EMBEDDING_DTYPES, decode_embedding, encode_embedding
+
+DIM = 512
+
+
+def unit_vectors(count: int, seed: int, dtype=np.float32) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((count, DIM))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(dtype)
+
+
+def time_us(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def peak_kb(fn) -> float:
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def report_per_query(repeat: int):
+    logger.info("== Per query ==")
+    embedding64 = unit_vectors(1, seed=0, dtype=np.float64)[0]
+    embedding32 = embedding64.astype(np.float32)
+
+    for dtype in EMBEDDING_DTYPES:
+        encoded = encode_embedding(embedding32, dtype)
+        arrays = encoded if isinstance(encoded, tuple) else (encoded,)
+        nbytes = sum(a.nbytes for a in arrays if isinstance(a, np.ndarray))
+        pickled = len(pickle.dumps(encoded, protocol=pickle.HIGHEST_PROTOCOL))
+        error = np.abs(decode_embedding(encoded) - embedding32).max()
+        logger.info(
+            f"cache {dtype:<8} {nbytes:5d} B in memory, {pickled:5d} B pickled, "
+            f"max abs error {error:.1e}"
+        )
+    logger.info(
+        f"cache float64  {embedding64.nbytes:5d} B in memory (previous behaviour)"
+    )
+
+    batch64 = unit_vectors(16, seed=1, dtype=np.float64)
+    batch32 = batch64.astype(np.float32)
+    for name, batch in (("float64", batch64), ("float32", batch32)):
+        size = len(pickle.dumps(batch, protocol=pickle.HIGHEST_PROTOCOL))
+        cost = time_us(lambda: pickle.loads(pickle.dumps(batch)), repeat)
+        logger.info(
+            f"executor batch of 16 {name}: {size} B pickled, {cost:.1f} us round trip"
+        )
+
+    # REST: the client turns the vector into a list and JSON-encodes it
+    for name, vector in (("float64", embedding64), ("float32", embedding32)):
+
+        def build_body():
+            return json.dumps({"vector": vector.tolist(), "limit": 3})
+
+        body = build_body()
+        cost = time_us(build_body, repeat)
+        memory = peak_kb(build_body)
+        logger.info(
+            f"REST search body {name}: {len(body)} B, {cost:.1f} us to build, "
+            f"{memory:.1f} KB peak"
+        )
+
+    try:
+        from qdrant_client import grpc
+    except ImportError:
+        logger.warning("qdrant_client not installed, skipping gRPC sizes")
+        return
+    message = grpc.SearchPoints(
+        collection_name="animal_photos", vector=embedding32.tolist(), limit=3
+    )
+    cost = time_us(
+        lambda: grpc.SearchPoints(
+            collection_name="animal_photos", vector=embedding32.tolist(), limit=3
+        ).SerializeToString(),
+        repeat,
+    )
+    logger.info(
+        f"gRPC search body float32: {len(message.SerializeToString())} B, "
+        f"{cost:.1f} us to build"
+    )
+
+
+def report_per_point(points: int):
+    logger.info(f"== Per ingested point (batch of {points}) ==")
+    vectors = unit_vectors(points, seed=2)
+    ids = [str(uuid.uuid4()) for _ in range(points)]
+
+    def old_path():
+        # float64 embeddings, one Python list per point, JSON body
+        rows = [row.astype(np.float64).tolist() for row in vectors]
+        return json.dumps([{"id": i, "vector": row} for i, row in zip(ids, rows)])
+
+    def new_rest_path():
+        rows = vectors.tolist()
+        return json.dumps({"ids": ids, "vectors": rows})
+
+    old_cost = time_us(old_path, 5) / points
+    new_cost = time_us(new_rest_path, 5) / points
+    logger.info(
+        f"REST float64 lists:  {len(old_path()) / points:7.0f} B/point, "
+        f"{old_cost:6.1f} us/point, "
+        f"{peak_kb(old_path) / points:5.1f} KB/point peak"
+    )
+    logger.info(
+        f"REST float32 batch:  {len(new_rest_path()) / points:7.0f} B/point, "
+        f"{new_cost:6.1f} us/point, "
+        f"{peak_kb(new_rest_path) / points:5.1f} KB/point peak"
+    )
+
+    try:
+        from qdrant_client import grpc
+    except ImportError:
+        return
+
+    def grpc_path():
+        return [
+            grpc.PointStruct(
+                id=grpc.PointId(uuid=i),
+                vectors=grpc.Vectors(vector=grpc.Vector(data=row)),
+            ).SerializeToString()
+            for i, row in zip(ids, vectors.tolist())
+        ]
+
+    size = sum(len(m) for m in grpc_path()) / points
+    cost = time_us(grpc_path, 5) / points
+    logger.info(
+        f"gRPC float32 packed: {size:7.0f} B/point, {cost:6.1f} us/point, "
+        f"{peak_kb(grpc_path) / points:5.1f} KB/point peak"
+    )
+
+
+def report_accuracy(gallery_size: int, queries: int):
+    logger.info(f"== Local index accuracy ({gallery_size} points, top-3) ==")
+    gallery = unit_vectors(gallery_size, seed=3)
+    query_vectors = unit_vectors(queries, seed=4)
+    ids = [str(i) for i in range(gallery_size)]
+    payloads = [{"photo_url": i} for i in ids]
+
+    reference = LocalVectorIndex(dtype="float32")
+    reference.build(ids, gallery, payloads)
+    expected = [[r[0] for r in reference.search(q, 3)] for q in query_vectors]
+    for dtype in EMBEDDING_DTYPES[1:]:
+        index = LocalVectorIndex(dtype=dtype)
+        index.build(ids, gallery, payloads)
+        got = [[r[0] for r in index.search(q, 3)] for q in query_vectors]
+        agreement = np.mean([len(set(a) & set(b)) / 3 for a, b in zip(expected, got)])
+        logger.info(
+            f"{dtype:<8} {index.matrix.nbytes / 1024 / 1024:6.1f} MB "
+            f"(float32: {reference.matrix.nbytes / 1024 / 1024:.1f} MB), "
+            f"top-3 agreement {agreement:.3f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--points", type=int, default=256)
+    parser.add_argument("--gallery", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    report_per_query(args.repeat)
+    report_per_point(args.points)
+    report_accuracy(args.gallery, args.queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Purpose:
+    - Compare per-image preprocess_image against the batched preprocess_batch pipeline
+    - Report throughput (images/sec) and traced allocations per image for both
+    - Use synthetic doodle canvases (RGBA like the mobile app, plus single-channel)
+
+Usage:
+    poetry run python -m scripts.benchmark_preprocess
+    poetry run python -m scripts.benchmark_preprocess --batch-size 32 --rounds 20
+"""
+
+import argparse
+import time
+import tracemalloc
+import numpy as np
+from PIL import Image, ImageDraw
+from services.clip_service import preprocess_batch, preprocess_image
+from utils.logger import logger
+
+
+def make_doodle(
+    mode: str, seed: int, size: tuple[int, int] = (720, 1080)
+) -> Image.Image:
+    """Draw a random black-stroke doodle on a white canvas in the given mode."""
+    rng = np.random.default_rng(seed)
+    image = Image.new("RGBA", size, (255, 255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        points = [tuple(p) for p in rng.integers(0, min(size), size=(6, 2))]
+        draw.line(points, fill=(0, 0, 0, 255), width=6)
+    return image.convert(mode)
+
+
+def run_per_image(images: list[Image.Image]) -> np.ndarray:
+    return np.concatenate([preprocess_image(image) for image in images])
+
+
+def run_batched(images: list[Image.Image]) -> np.ndarray:
+    return preprocess_batch(images)
+
+
+def measure(fn, images: list[Image.Image], rounds: int) -> dict:
+    """Time fn over several rounds and trace peak allocations on one extra round."""
+    fn(images)  # warm up (allocates the reusable buffer for the batched path)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(images)
+    elapsed = time.perf_counter() - start
+
+    # numpy reports its array buffers to tracemalloc, so the peak covers
+    # every temporary created during the call
+    tracemalloc.start()
+    fn(images)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "images_per_sec": round(rounds * len(images) / elapsed, 1),
+        "alloc_kib_per_image": round(peak / 1024 / len(images), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    for mode in ("RGBA", "L"):
+        images = [make_doodle(mode, seed) for seed in range(args.batch_size)]
+        for image in images:
+            image.load()
+
+        assert np.allclose(run_per_image(images), run_batched(images))
+
+        baseline = measure(run_per_image, images, args.rounds)
+        batched = measure(run_batched, images, args.rounds)
+        speedup = batched["images_per_sec"] / baseline["images_per_sec"]
+
+        logger.info(f"== {mode} canvases, batch of {args.batch_size} ==")
+        logger.info(f"preprocess_image: {baseline}")
+        logger.info(f"preprocess_batch: {batched}")
+        logger.info(f"speedup: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Purpose:
+    - Compare request-path Qdrant access patterns under concurrent load:
+        sync-inline  blocking QdrantClient called inside async handlers (the old route code)
+        sync-thread  blocking QdrantClient pushed to a worker thread
+        async        pooled AsyncQdrantClient with per-call deadline, retries and hedging
+    - Report throughput and p50/p99 latency for each mode
+    - Run against a temporary collection of random unit vectors, dropped afterwards
+
+Usage:
+    poetry run python -m scripts.benchmark_qdrant_client --url http://localhost:6333
+    poetry run python -m scripts.benchmark_qdrant_client --url :memory: --concurrency 32
+    poetry run python -m scripts.benchmark_qdrant_client --hedge-after-ms 20
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+import numpy as np
+from services import qdrant_service
+from utils.logger import logger
+
+VECTOR_SIZE = 512
+
+
+def random_vectors(count: int, seed: int) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((count, VECTOR_SIZE))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def create_collection(client, name: str, vectors: np.ndarray):
+    from qdrant_client import models
+
+    client.create_collection(
+        collection_name=name,
+        vectors_config=models.VectorParams(
+            size=VECTOR_SIZE, distance=models.Distance.COSINE
+        ),
+    )
+    for start in range(0, len(vectors), 256):
+        chunk = vectors[start : start + 256]
+        client.upsert(
+            collection_name=name,
+            points=[
+                models.PointStruct(
+                    id=start + i,
+                    vector=vector.tolist(),
+                    payload={"photo_url": f"https://example.com/{start + i}.jpg"},
+                )
+                for i, vector in enumerate(chunk)
+            ],
+        )
+
+
+async def create_collection_async(client, name: str, vectors: np.ndarray):
+    from qdrant_client import models
+
+    await client.create_collection(
+        collection_name=name,
+        vectors_config=models.VectorParams(
+            size=VECTOR_SIZE, distance=models.Distance.COSINE
+        ),
+    )
+    await client.upsert(
+        collection_name=name,
+        points=[
+            models.PointStruct(id=i, vector=vector.tolist(), payload={})
+            for i, vector in enumerate(vectors)
+        ],
+    )
+
+
+async def run_load(search, queries: np.ndarray, concurrency: int) -> dict:
+    """Fire every query with at most `concurrency` in flight; time each one."""
+    latencies = []
+    errors = 0
+    next_query = 0
+
+    async def worker():
+        nonlocal next_query, errors
+        while next_query < len(queries):
+            query = queries[next_query]
+            next_query += 1
+            start = time.perf_counter()
+            try:
+                await search(query.tolist())
+            except Exception:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    latencies_ms = np.array(latencies) if latencies else np.zeros(1)
+    return {
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "errors": errors,
+    }
+
+
+async def benchmark(args):
+    from qdrant_client import AsyncQdrantClient, QdrantClient
+
+    in_memory = args.url == ":memory:"
+    collection = f"benchmark_{uuid.uuid4().hex[:8]}"
+    points = random_vectors(args.points, seed=0)
+    queries = random_vectors(args.queries, seed=1)
+
+    sync_client = (
+        QdrantClient(location=args.url)
+        if in_memory
+        else QdrantClient(url=args.url, timeout=60)
+    )
+    async_client = (
+        AsyncQdrantClient(location=args.url)
+        if in_memory
+        else AsyncQdrantClient(
+            url=args.url,
+            prefer_grpc=qdrant_service.QDRANT_PREFER_GRPC,
+            grpc_port=qdrant_service.QDRANT_GRPC_PORT,
+            check_compatibility=False,
+        )
+    )
+    qdrant_service.QDRANT_HEDGE_AFTER_MS = args.hedge_after_ms
+
+    create_collection(sync_client, collection, points)
+    if in_memory:
+        # Local-mode clients do not share storage
+        await create_collection_async(async_client, collection, points)
+
+    async def sync_inline(vector):
+        return sync_client.search(
+            collection_name=collection, query_vector=vector, limit=3
+        )
+
+    async def sync_thread(vector):
+        return await asyncio.to_thread(
+            sync_client.search, collection_name=collection, query_vector=vector, limit=3
+        )
+
+    async def async_resilient(vector):
+        return await qdrant_service._call_with_retries(
+            lambda: async_client.search(
+                collection_name=collection, query_vector=vector, limit=3
+            )
+        )
+
+    modes = {
+        "sync-inline": sync_inline,
+        "sync-thread": sync_thread,
+        "async": async_resilient,
+    }
+    try:
+        for name, search in modes.items():
+            # Warm-up pass so connection setup is not counted
+            await run_load(search, queries[: args.concurrency], args.concurrency)
+            result = await run_load(search, queries, args.concurrency)
+            logger.info(
+                f"{name:<12} {result['throughput_rps']:8.1f} req/s  "
+                f"p50 {result['p50_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms  "
+                f"errors {result['errors']}"
+            )
+        stats = qdrant_service.get_client_stats()
+        logger.info(
+            f"hedged requests: {stats['hedged_requests']}, "
+            f"retried requests: {stats['retried_requests']}"
+        )
+    finally:
+        sync_client.delete_collection(collection)
+        sync_client.close()
+        await async_client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://localhost:6333")
+    parser.add_argument("--points", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--hedge-after-ms", type=float, default=0)
+    args = parser.parse_args()
+    asyncio.run(benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Purpose:
+    - Compare the request overhead of /api/search-doodle (base64 JSON) and /api/search-doodle/upload (raw PNG)
+    - Report bytes on the wire, plus CPU time and memory spent per request before PIL sees the PNG
+    - Use a synthetic doodle so no model, Qdrant or network access is needed
+
+Usage:
+    poetry run python -m scripts.benchmark_upload
+    poetry run python -m scripts.benchmark_upload --requests 2000
+"""
+
+import argparse
+import base64
+import io
+import json
+import time
+import tracemalloc
+from PIL import Image, ImageDraw
+from schemas.search import SearchRequest
+from utils.images import DATA_URL_PREFIX, decode_image_bytes
+from utils.logger import logger
+
+
+def make_doodle_png(size: tuple[int, int] = (1080, 1440)) -> bytes:
+    """Render a stroke doodle on a transparent canvas, like the mobile snapshot."""
+    image = Image.new("RGBA", size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    for i in range(10):
+        draw.line((i * 90, 0, size[0] - i * 60, size[1]), fill=(0, 0, 0, 255), width=8)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def base64_prep(body: bytes) -> bytes:
+    """What /search-doodle does before PIL: parse JSON, validate, strip prefix, b64decode."""
+    request = SearchRequest.model_validate(json.loads(body))
+    image_data = request.image_data
+    if image_data.startswith(DATA_URL_PREFIX):
+        image_data = image_data[len(DATA_URL_PREFIX) :]
+    return base64.b64decode(image_data)
+
+
+def binary_prep(body: bytes) -> bytes:
+    """What /search-doodle/upload does before PIL: nothing, the body is the PNG."""
+    return body
+
+
+def cpu_ms_per_request(fn, body: bytes, requests: int, repeats: int = 3) -> float:
+    """Best-of-N CPU milliseconds per call."""
+    fn(body)  # warm up
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.process_time()
+        for _ in range(requests):
+            fn(body)
+        best = min(best, time.process_time() - start)
+    return best * 1000 / requests
+
+
+def peak_bytes_allocated(fn, body: bytes) -> int:
+    tracemalloc.start()
+    fn(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    png = make_doodle_png()
+    data_url = DATA_URL_PREFIX + base64.b64encode(png).decode()
+    json_body = json.dumps({"image_data": data_url}).encode()
+    assert base64_prep(json_body) == binary_prep(png)
+
+    json_ms = cpu_ms_per_request(base64_prep, json_body, args.requests)
+    binary_ms = cpu_ms_per_request(binary_prep, png, args.requests)
+    decode_ms = cpu_ms_per_request(decode_image_bytes, png, max(1, args.requests // 10))
+
+    logger.info(f"== {args.requests} requests, {len(png)} byte PNG doodle ==")
+    logger.info(
+        f"bytes on wire: base64 JSON={len(json_body)} raw PNG={len(png)} "
+        f"saved={len(json_body) - len(png)} ({1 - len(png) / len(json_body):.1%})"
+    )
+    logger.info(
+        f"CPU before PIL: /search-doodle={json_ms:.3f} ms "
+        f"/search-doodle/upload={binary_ms:.3f} ms saved={json_ms - binary_ms:.3f} ms"
+    )
+    logger.info(
+        f"bytes allocated before PIL: /search-doodle={peak_bytes_allocated(base64_prep, json_body)} "
+        f"/search-doodle/upload={peak_bytes_allocated(binary_prep, png)}"
+    )
+    logger.info(f"shared PNG decode (both endpoints): {decode_ms:.3f} ms CPU")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Purpose:
+    - Precompute CLIP text embeddings for every animal in constants/animals_list.ANIMALS
+    - Average several prompt templates per animal (prompt ensembling) and L2-normalize
+    - Save the (len(ANIMALS), 512) label matrix used by services/label_classifier.py,
+      so the server never needs the text encoder
+
+Requirements:
+    The CLIP ViT-B/32 text encoder exported to ONNX, with its tokenizer:
+        cd backend/models/clip
+        wget https://huggingface.co/Qdrant/clip-ViT-B-32-text/resolve/main/model.onnx -O clip-vit-base-patch32-text.onnx
+        wget https://huggingface.co/Qdrant/clip-ViT-B-32-text/resolve/main/tokenizer.json
+    The tokenizers package (offline only, not a server dependency), from the
+    optional "tooling" dependency group:
+        poetry install --with tooling
+
+Usage:
+    poetry run python -m scripts.build_label_embeddings
+    poetry run python -m scripts.build_label_embeddings --text-model path/to/text.onnx
+"""
+
+import argparse
+import sys
+from pathlib import Path
+import numpy as np
+import onnxruntime as ort
+from constants.animals_list import ANIMALS
+from services.clip_service import MODEL_DIR
+from services.label_classifier import LABEL_EMBEDDINGS_PATH
+from utils.logger import logger
+
+# CLIP's text context length
+CONTEXT_LENGTH = 77
+# Labels are plural ("cats"), so the templates read naturally with them
+PROMPT_TEMPLATES = [
+    "a drawing of {}.",
+    "a doodle of {}.",
+    "a sketch of {}.",
+    "a photo of {}.",
+]
+
+
+def tokenize(tokenizer, prompts: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Encode prompts into fixed-length (N, 77) input_ids and attention_mask."""
+    # CLIP pads with its end-of-text token
+    pad_token = "<|endoftext|>"
+    pad_id = tokenizer.token_to_id(pad_token) or 0
+    tokenizer.enable_padding(length=CONTEXT_LENGTH, pad_id=pad_id, pad_token=pad_token)
+    tokenizer.enable_truncation(max_length=CONTEXT_LENGTH)
+    encodings = tokenizer.encode_batch(prompts)
+    input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+    attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+    return input_ids, attention_mask
+
+
+def encode_text(session: ort.InferenceSession, input_ids, attention_mask) -> np.ndarray:
+    """Run the text encoder and return the (N, 512) projected text embeddings."""
+    feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+    input_names = [i.name for i in session.get_inputs()]
+    outputs = session.run(None, {name: feeds[name] for name in input_names})
+
+    # Exports differ in output order/naming; take the 2-D (N, 512) output
+    by_name = dict(zip([o.name for o in session.get_outputs()], outputs))
+    if "text_embeds" in by_name:
+        return by_name["text_embeds"]
+    for output in outputs:
+        if output.ndim == 2 and output.shape[1] == 512:
+            return output
+    raise ValueError(f"No (N, 512) output among {list(by_name)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--text-model",
+        type=Path,
+        default=MODEL_DIR / "clip-vit-base-patch32-text.onnx",
+    )
+    parser.add_argument("--tokenizer", type=Path, default=MODEL_DIR / "tokenizer.json")
+    parser.add_argument("--output", type=Path, default=LABEL_EMBEDDINGS_PATH)
+    args = parser.parse_args()
+
+    for path in (args.text_model, args.tokenizer):
+        if not path.exists():
+            logger.error(f"Not found: {path} (see Requirements in this script)")
+            sys.exit(1)
+
+    from tokenizers import Tokenizer
+
+    tokenizer = Tokenizer.from_file(str(args.tokenizer))
+    session = ort.InferenceSession(
+        str(args.text_model), providers=["CPUExecutionProvider"]
+    )
+
+    prompts = [
+        template.format(animal) for animal in ANIMALS for template in PROMPT_TEMPLATES
+    ]
+    input_ids, attention_mask = tokenize(tokenizer, prompts)
+    embeddings = encode_text(session, input_ids, attention_mask).astype(np.float32)
+
+    # Normalize each prompt, average per animal, then normalize the mean
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings = embeddings.reshape(len(ANIMALS), len(PROMPT_TEMPLATES), -1).mean(
+        axis=1
+    )
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    np.savez(args.output, labels=np.array(ANIMALS), embeddings=embeddings)
+    logger.info(f"Saved {embeddings.shape} label embeddings to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
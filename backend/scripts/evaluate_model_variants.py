@@ -0,0 +1,156 @@
+"""
+Purpose:
+    - Compare CLIP model variants (fp32 / int8 / fp16, plain or optimized) on a fixed doodle set
+    - Measure latency (batch of 1 and a full batch) and accuracy relative to the FP32 model
+    - Accuracy = cosine similarity to the FP32 embedding and top-3 agreement of retrieved photos
+
+Usage:
+    poetry run python -m scripts.evaluate_model_variants --snapshot local_index.npz
+    poetry run python -m scripts.evaluate_model_variants              # gallery from Qdrant
+    poetry run python -m scripts.evaluate_model_variants --gallery synthetic
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+import numpy as np
+import onnxruntime as ort
+from PIL import Image
+from scripts.benchmark_preprocess import make_doodle
+from services.clip_service import (
+    MODEL_VARIANTS,
+    create_session,
+    preprocess_batch,
+    resolve_model_path,
+)
+from services.local_index import LocalVectorIndex
+from utils.logger import logger
+
+TEST_IMAGE_PATH = Path(__file__).resolve().parent / "test_cat.png"
+TOP_K = 3
+
+
+def load_doodle_set(count: int) -> list[Image.Image]:
+    """Deterministic doodle set: seeded synthetic canvases plus the bundled test image."""
+    images = [make_doodle("RGBA", seed, size=(512, 512)) for seed in range(count)]
+    if TEST_IMAGE_PATH.exists():
+        images.append(Image.open(TEST_IMAGE_PATH))
+    for image in images:
+        image.load()
+    return images
+
+
+def embed(session: ort.InferenceSession, images: list[Image.Image]) -> np.ndarray:
+    input_name = session.get_inputs()[0].name
+    embeddings = session.run(None, {input_name: preprocess_batch(images)})[0]
+    embeddings = embeddings.astype(np.float32)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def measure_latency(
+    session: ort.InferenceSession, images: list[Image.Image], batch_size: int
+) -> dict:
+    single = []
+    for image in images:
+        start = time.perf_counter()
+        embed(session, [image])
+        single.append((time.perf_counter() - start) * 1000)
+
+    batch = images[:batch_size]
+    start = time.perf_counter()
+    rounds = 3
+    for _ in range(rounds):
+        embed(session, batch)
+    batch_ms = (time.perf_counter() - start) * 1000 / rounds
+
+    return {
+        "p50_ms": round(float(np.percentile(single, 50)), 2),
+        "p95_ms": round(float(np.percentile(single, 95)), 2),
+        "batch_images_per_sec": round(len(batch) / (batch_ms / 1000), 1),
+    }
+
+
+def load_gallery(args, reference: ort.InferenceSession) -> LocalVectorIndex:
+    index = LocalVectorIndex()
+    if args.gallery == "snapshot":
+        index.load_snapshot(args.snapshot)
+    elif args.gallery == "qdrant":
+        from services.qdrant_service import get_client, COLLECTION_NAME
+
+        index.load_from_qdrant(get_client(), COLLECTION_NAME)
+    else:
+        # Offline fallback: a gallery of different synthetic canvases embedded with FP32
+        gallery = [
+            make_doodle("RGB", 10_000 + seed, size=(512, 512)) for seed in range(500)
+        ]
+        vectors = np.concatenate(
+            [embed(reference, gallery[i : i + 32]) for i in range(0, len(gallery), 32)]
+        )
+        index.build(
+            [str(i) for i in range(len(gallery))],
+            vectors,
+            [{"photo_url": str(i)} for i in range(len(gallery))],
+        )
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--gallery", choices=("snapshot", "qdrant", "synthetic"), default=None
+    )
+    parser.add_argument("--snapshot", type=Path, help="Local index .npz snapshot")
+    parser.add_argument("--doodles", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--output", type=Path, help="Write the report as JSON")
+    args = parser.parse_args()
+    args.gallery = args.gallery or ("snapshot" if args.snapshot else "qdrant")
+
+    images = load_doodle_set(args.doodles)
+    reference = create_session(
+        resolve_model_path("fp32", optimized=False, shared=False), optimized=False
+    )
+    reference_embeddings = embed(reference, images)
+
+    gallery = load_gallery(args, reference)
+    reference_top = [
+        [url for url, *_ in gallery.search(e, limit=TOP_K)]
+        for e in reference_embeddings
+    ]
+
+    report = []
+    for variant in MODEL_VARIANTS:
+        for optimized in (False, True):
+            path = resolve_model_path(variant, optimized, shared=False)
+            if not path.exists():
+                continue
+            session = create_session(path, optimized=optimized)
+            embeddings = embed(session, images)
+
+            cosine = np.sum(embeddings * reference_embeddings, axis=1)
+            agreement = [
+                len(set(ref) & {url for url, *_ in gallery.search(e, limit=TOP_K)})
+                / TOP_K
+                for ref, e in zip(reference_top, embeddings)
+            ]
+            row = {
+                "model": path.name,
+                "variant": variant,
+                "optimized": optimized,
+                "size_mb": round(path.stat().st_size / 1024 / 1024, 1),
+                **measure_latency(session, images, args.batch_size),
+                "mean_cosine_vs_fp32": round(float(cosine.mean()), 4),
+                "min_cosine_vs_fp32": round(float(cosine.min()), 4),
+                "top3_agreement": round(float(np.mean(agreement)), 4),
+            }
+            report.append(row)
+            logger.info(json.dumps(row))
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        logger.info(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Purpose:
+    - Rewrite a CLIP model variant with its weights moved to one raw,
+      64-byte-aligned external-data file, plus a JSON manifest of every tensor
+      (name, offset, length, dtype, shape)
+    - With CLIP_SHARED_WEIGHTS=1 the server maps that file read-only and feeds
+      the tensors to ONNX Runtime without copying them (see clip_service), so
+      every session in every worker process shares one copy through the page cache
+    - The output is a regular ONNX external-data model; ONNX Runtime can also
+      load it on its own
+
+Output (next to the source model, e.g. for fp32):
+    clip-vit-base-patch32.shared.onnx   graph, tensors point at the data file
+    clip-vit-base-patch32.shared.data   raw little-endian weights
+    clip-vit-base-patch32.shared.json   manifest read by the server (no onnx needed)
+
+Requirements:
+    The onnx package (offline only, not a server dependency), from the
+    optional "tooling" dependency group:
+        poetry install --with tooling
+
+Usage:
+    poetry run python -m scripts.externalize_onnx_weights
+    poetry run python -m scripts.externalize_onnx_weights --variant int8 --optimized
+
+    Then serve it:
+        CLIP_SHARED_WEIGHTS=1 WEB_CONCURRENCY=4 poetry run python -m serve
+"""
+
+import argparse
+import json
+import sys
+import numpy as np
+import onnxruntime as ort
+from services.clip_service import (
+    MODEL_VARIANTS,
+    resolve_model_path,
+    shared_weights_files,
+)
+from utils.logger import logger
+
+# Offsets are aligned for SIMD loads straight from the mapping
+ALIGNMENT = 64
+# Small tensors (shapes, scales) stay inline in the graph
+MIN_EXTERNAL_BYTES = 1024
+
+TYPED_DATA_FIELDS = (
+    "raw_data",
+    "float_data",
+    "int32_data",
+    "int64_data",
+    "double_data",
+    "uint64_data",
+)
+
+
+def externalize(source, target):
+    import onnx
+    from onnx import numpy_helper
+
+    data_path, manifest_path = shared_weights_files(target)
+    model = onnx.load(str(source))
+    tensors = {}
+    offset = 0
+    with open(data_path, "wb") as data_file:
+        for tensor in model.graph.initializer:
+            array = numpy_helper.to_array(tensor)
+            if array.nbytes < MIN_EXTERNAL_BYTES:
+                continue
+            offset += -offset % ALIGNMENT
+            data_file.seek(offset)
+            little_endian = array.astype(array.dtype.newbyteorder("<"), copy=False)
+            data_file.write(np.ascontiguousarray(little_endian).tobytes())
+
+            for field in TYPED_DATA_FIELDS:
+                tensor.ClearField(field)
+            del tensor.external_data[:]
+            tensor.data_location = onnx.TensorProto.EXTERNAL
+            for key, value in (
+                ("location", data_path.name),
+                ("offset", str(offset)),
+                ("length", str(array.nbytes)),
+            ):
+                entry = tensor.external_data.add()
+                entry.key, entry.value = key, value
+            tensors[tensor.name] = {
+                "offset": offset,
+                "length": array.nbytes,
+                "dtype": array.dtype.name,
+                "shape": list(array.shape),
+            }
+            offset += array.nbytes
+
+    onnx.save(model, str(target))
+    manifest_path.write_text(
+        json.dumps({"data_file": data_path.name, "tensors": tensors}, indent=2) + "\n"
+    )
+    return tensors, offset
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--variant", choices=MODEL_VARIANTS, default="fp32")
+    parser.add_argument(
+        "--optimized", action="store_true", help="Start from the *.opt.onnx graph"
+    )
+    args = parser.parse_args()
+
+    source = resolve_model_path(args.variant, args.optimized, shared=False)
+    target = resolve_model_path(args.variant, args.optimized, shared=True)
+    if not source.exists():
+        logger.error(f"Model not found: {source}")
+        sys.exit(1)
+    try:
+        import onnx  # noqa: F401
+    except ImportError:
+        logger.error("The onnx package is required: poetry install --with tooling")
+        sys.exit(1)
+
+    tensors, size = externalize(source, target)
+    logger.info(
+        f"Wrote {target.name}: {len(tensors)} tensors, "
+        f"{size / 1024 / 1024:.1f} MB in {shared_weights_files(target)[0].name}"
+    )
+
+    # The rewritten graph must compute the same embeddings as the source
+    dummy = np.random.default_rng(0).random((2, 3, 224, 224), dtype=np.float32)
+    outputs = []
+    for path in (source, target):
+        session = ort.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+        outputs.append(session.run(None, {session.get_inputs()[0].name: dummy})[0])
+    logger.info(f"Max abs difference: {np.abs(outputs[0] - outputs[1]).max():.2e}")
+
+
+if __name__ == "__main__":
+    main()
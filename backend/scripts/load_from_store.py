@@ -0,0 +1,123 @@
+"""
+Purpose:
+    - Bulk-load the embeddings recorded by populate_qdrant from the local
+      embedding store, without downloading or embedding any image:
+        qdrant    upload into a collection (provisioned with the current
+                  quantization/HNSW settings; --recreate starts it from scratch)
+        snapshot  write a LocalVectorIndex .npz snapshot for SEARCH_BACKEND=local
+    - Use after changing collection settings, moving to a new Qdrant instance,
+      or to ship the local index without a Qdrant round trip
+
+Usage:
+    poetry run python -m scripts.load_from_store
+    poetry run python -m scripts.load_from_store --collection animal_photos_v2
+    poetry run python -m scripts.load_from_store --recreate
+    poetry run python -m scripts.load_from_store --target snapshot --snapshot index.npz
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from scripts.populate_qdrant import (
+    DEFAULT_CHECKPOINT,
+    Checkpoint,
+    point_id,
+    point_payload,
+)
+from services.embedding_store import EMBEDDING_STORE_DIR, MODEL_TAG, EmbeddingStore
+from services.local_index import LocalVectorIndex
+from services.qdrant_collection import provision_collection
+from services.qdrant_service import COLLECTION_NAME, get_client
+from services.search_service import (
+    LOCAL_INDEX_DTYPE,
+    LOCAL_INDEX_MODE,
+    LOCAL_INDEX_NLIST,
+    LOCAL_INDEX_NPROBE,
+    LOCAL_INDEX_SNAPSHOT,
+)
+from utils.logger import logger
+
+
+def load_into_qdrant(photos, vectors, collection: str, recreate: bool, batch_size: int):
+    client = get_client()
+    if recreate and client.collection_exists(collection):
+        logger.info(f"Dropping collection {collection}")
+        client.delete_collection(collection)
+    provision_collection(client, collection)
+    client.upload_collection(
+        collection_name=collection,
+        vectors=vectors,
+        ids=[point_id(photo["id"]) for photo in photos],
+        payload=[point_payload(photo) for photo in photos],
+        batch_size=batch_size,
+        max_retries=3,
+        wait=True,
+    )
+
+
+def write_snapshot(photos, vectors, path: Path):
+    index = LocalVectorIndex(
+        dtype=LOCAL_INDEX_DTYPE,
+        mode=LOCAL_INDEX_MODE,
+        nlist=LOCAL_INDEX_NLIST,
+        nprobe=LOCAL_INDEX_NPROBE,
+    )
+    index.build(
+        [point_id(photo["id"]) for photo in photos],
+        vectors,
+        [point_payload(photo) for photo in photos],
+    )
+    index.save_snapshot(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--store", type=Path, default=EMBEDDING_STORE_DIR)
+    parser.add_argument("--target", choices=("qdrant", "snapshot"), default="qdrant")
+    parser.add_argument("--collection", default=COLLECTION_NAME)
+    parser.add_argument("--recreate", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--snapshot", type=Path, default=LOCAL_INDEX_SNAPSHOT)
+    parser.add_argument(
+        "--all-models",
+        action="store_true",
+        help=f"Include vectors from models other than {MODEL_TAG}",
+    )
+    args = parser.parse_args()
+
+    if not (args.store / "manifest.sqlite").exists():
+        logger.error(f"No embedding store at {args.store} (run populate_qdrant first)")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    store = EmbeddingStore(args.store)
+    photos, vectors = store.load(None if args.all_models else MODEL_TAG)
+    if not photos:
+        logger.error(f"The store holds no embeddings from {MODEL_TAG}")
+        sys.exit(1)
+
+    if args.target == "snapshot":
+        if args.snapshot is None:
+            logger.error("Pass --snapshot or set LOCAL_INDEX_SNAPSHOT")
+            sys.exit(1)
+        write_snapshot(photos, vectors, args.snapshot)
+    else:
+        load_into_qdrant(
+            photos, vectors, args.collection, args.recreate, args.batch_size
+        )
+        # The default collection is the one populate_qdrant's checkpoint tracks
+        if args.collection == COLLECTION_NAME:
+            checkpoint = Checkpoint(DEFAULT_CHECKPOINT)
+            if args.recreate:
+                checkpoint.stored_ids.clear()
+            checkpoint.add([photo["id"] for photo in photos])
+    store.close()
+    logger.info(
+        f"Loaded {len(photos)} points into {args.target} "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Purpose:
+    - Measure how long a fresh backend process takes to import and become ready
+    - Break import time down by module (python -X importtime) and startup by stage
+    - Each measurement runs in a new interpreter, so results reflect a cold worker
+
+Usage:
+    poetry run python -m scripts.measure_startup
+    poetry run python -m scripts.measure_startup --top 15
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from utils.logger import logger
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# Runs in a child interpreter: import the app, run its lifespan, wait for readiness
+COLD_START_SNIPPET = """
+import asyncio, json, time
+t0 = time.perf_counter()
+import main
+import_ms = (time.perf_counter() - t0) * 1000
+from services.lifecycle import get_readiness, is_ready
+
+async def run():
+    async with main.app.router.lifespan_context(main.app):
+        while not is_ready() and not get_readiness()["errors"]:
+            await asyncio.sleep(0.01)
+        return get_readiness()
+
+readiness = asyncio.run(run())
+print(json.dumps({
+    "import_main_ms": round(import_ms, 1),
+    "time_to_ready_ms": round((time.perf_counter() - t0) * 1000, 1),
+    **readiness,
+}))
+"""
+
+
+def import_time_breakdown(top: int) -> list[dict]:
+    """Return the slowest modules (cumulative microseconds) imported by `import main`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        indent = len(name) - len(name.lstrip())
+        rows.append(
+            {
+                "module": name.strip(),
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+                "depth": (indent - 1) // 2,
+            }
+        )
+    # Top-level imports (depth 0/1) give the clearest picture of where time goes
+    rows = [row for row in rows if row["depth"] <= 1]
+    return sorted(rows, key=lambda row: row["cumulative_ms"], reverse=True)[:top]
+
+
+def cold_start() -> dict:
+    """Import the app and run its lifespan warm-up in a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-c", COLD_START_SNIPPET],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    logger.info("== Import time (import main) ==")
+    for row in import_time_breakdown(args.top):
+        logger.info(
+            f"{row['cumulative_ms']:8.1f} ms cumulative {row['self_ms']:8.1f} ms self  "
+            f"{'  ' * row['depth']}{row['module']}"
+        )
+
+    logger.info("== Cold start ==")
+    logger.info(json.dumps(cold_start(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Purpose:
+    - Create the animal_photos collection with the settings declared in
+      services/qdrant_collection.py, or migrate an existing collection to them
+      (quantization, HNSW parameters, on-disk vectors, payload indexes)
+    - Show what would change before applying it
+
+Usage:
+    poetry run python -m scripts.migrate_collection --dry-run
+    poetry run python -m scripts.migrate_collection
+    QDRANT_QUANTIZATION=pq poetry run python -m scripts.migrate_collection
+"""
+
+import argparse
+from services.qdrant_collection import migrate_collection, provision_collection
+from services.qdrant_service import COLLECTION_NAME, get_client
+from utils.exceptions import QdrantServiceError
+from utils.logger import logger
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--collection", default=COLLECTION_NAME)
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Report drift without applying it"
+    )
+    args = parser.parse_args()
+
+    client = get_client()
+    try:
+        if not args.dry_run and provision_collection(client, args.collection):
+            return
+        drift = migrate_collection(client, args.collection, dry_run=args.dry_run)
+    except QdrantServiceError as e:
+        logger.error(str(e))
+        raise SystemExit(1)
+
+    if not drift:
+        logger.info(f"{args.collection} already matches the declared settings")
+        return
+    verb = "Would change" if args.dry_run else "Changed"
+    for setting, (current, wanted) in drift.items():
+        logger.info(f"{verb} {setting}: {current} -> {wanted}")
+    if not args.dry_run:
+        logger.info(
+            "Qdrant is rebuilding segments in the background; "
+            "check optimizer_status in the collection info"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Purpose:
+    - Produce faster variants of the CLIP vision ONNX model next to the original file
+    - INT8: dynamic quantization of MatMul/Gemm weights
+    - FP16: weights converted to float16 (inputs/outputs stay float32)
+    - Save an offline-optimized graph (*.opt.onnx) for every variant, so servers skip optimization at startup
+
+Requirements:
+    The onnx package is needed for quantization and FP16 conversion; it is in
+    the optional "tooling" dependency group:
+        poetry install --with tooling
+
+Usage:
+    poetry run python -m scripts.optimize_onnx_model
+    poetry run python -m scripts.optimize_onnx_model --variants int8
+
+    Then select a variant at runtime:
+        CLIP_MODEL_VARIANT=int8 CLIP_MODEL_OPTIMIZED=1 uvicorn main:app
+"""
+
+import argparse
+import sys
+from pathlib import Path
+import onnxruntime as ort
+from services.clip_service import MODEL_PATH, MODEL_VARIANTS, resolve_model_path
+from utils.logger import logger
+
+
+def quantize_int8(source: Path, target: Path):
+    """Dynamically quantize weights to INT8 (activations are quantized at runtime)."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(source, target, weight_type=QuantType.QInt8)
+
+
+def convert_fp16(source: Path, target: Path):
+    """Convert weights to float16 while keeping float32 model inputs and outputs."""
+    import onnx
+    from onnxruntime.transformers.float16 import convert_float_to_float16
+
+    model = convert_float_to_float16(onnx.load(str(source)), keep_io_types=True)
+    onnx.save(model, str(target))
+
+
+def save_optimized_graph(source: Path, target: Path):
+    """
+    Let ONNX Runtime apply its graph optimizations once and save the result.
+
+    ORT_ENABLE_EXTENDED is used rather than ORT_ENABLE_ALL because the
+    layout optimizations of the latter are specific to the building machine.
+    """
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    options.optimized_model_filepath = str(target)
+    ort.InferenceSession(
+        str(source), sess_options=options, providers=["CPUExecutionProvider"]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--variants", nargs="+", choices=MODEL_VARIANTS, default=list(MODEL_VARIANTS)
+    )
+    args = parser.parse_args()
+
+    if not MODEL_PATH.exists():
+        logger.error(f"Model not found: {MODEL_PATH}")
+        sys.exit(1)
+
+    try:
+        import onnx  # noqa: F401
+    except ImportError:
+        logger.error("The onnx package is required: poetry install --with tooling")
+        sys.exit(1)
+
+    converters = {"int8": quantize_int8, "fp16": convert_fp16}
+
+    for variant in args.variants:
+        target = resolve_model_path(variant, optimized=False, shared=False)
+        if variant in converters:
+            logger.info(f"Building {variant} variant: {target.name}")
+            converters[variant](MODEL_PATH, target)
+
+        optimized = resolve_model_path(variant, optimized=True, shared=False)
+        logger.info(f"Saving optimized graph: {optimized.name}")
+        save_optimized_graph(target, optimized)
+
+        size_mb = target.stat().st_size / 1024 / 1024
+        logger.info(f"{variant}: {size_mb:.1f} MB ({target.name})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,75 +1,369 @@
 """
 Purpose:
     - Populate Qdrant collection with animal photos from Unsplash
-    - Download images, generate CLIP embeddings, and store vectors in Qdrant
+    - Download images concurrently, generate CLIP embeddings in batches, and upsert points in bulk
     - Use deterministic UUIDs for points to satisfy Qdrant requirements
+    - Checkpoint stored photo ids so an interrupted run resumes where it stopped
+    - Record every embedding in the local embedding store; photos whose vector is
+      already stored (same URL and model) are upserted from it without a download
+
+Pipeline (per animal):
+    metadata (rate-limited API) -> concurrent downloads (pooled session)
+    -> batched CLIP inference -> embedding store
+    -> batched upserts (background thread) -> checkpoint
+
+    With --stream, metadata pages feed a bounded queue of async downloads over
+    one pooled HTTP/2 client (services.unsplash_service.stream_photo_images),
+    images are decoded at reduced size, and memory stays flat however many
+    photos or animals are ingested.
 
 Usage:
     poetry run python -m scripts.populate_qdrant
+    poetry run python -m scripts.populate_qdrant --download-workers 16 --upsert-batch-size 256
+    poetry run python -m scripts.populate_qdrant --no-store
+    poetry run python -m scripts.populate_qdrant --stream --photos-per-animal 1000
+
+    Rebuild a collection or the local index from the store alone:
+        poetry run python -m scripts.load_from_store
 """
 
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from pathlib import Path
+import numpy as np
 from dotenv import load_dotenv
-from services.clip_service import get_image_embedding
+from PIL import Image
+from services.clip_service import get_image_embedding, get_image_embeddings
+from services.embedding_store import EMBEDDING_STORE_DIR, EmbeddingStore
 from services.qdrant_service import (
-    client,
+    get_client,
     COLLECTION_NAME,
     create_collection_if_not_exists,
 )
-from services.unsplash_service import get_unsplash_photos, download_image
+from services.unsplash_service import (
+    download_image,
+    get_unsplash_photos,
+    stream_photo_images,
+)
 from constants.animals_list import ANIMALS
-from qdrant_client.models import PointStruct
 from utils.exceptions import UnsplashServiceError, ClipServiceError, QdrantServiceError
 from utils.logger import logger
-import uuid
-import time
 
 load_dotenv()
 
+DEFAULT_CHECKPOINT = Path(__file__).resolve().parent / ".populate_checkpoint.json"
+
+
+def point_id(photo_id: str) -> str:
+    """Deterministic Qdrant point id for an Unsplash photo id."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, photo_id))
+
 
-def process_and_store_photo(photo_data: dict) -> bool:
+class Checkpoint:
     """
-    Download photo, generate embedding, and insert into Qdrant.
-    Returns True if stored successfully, False otherwise.
+    Set of Unsplash photo ids already stored in Qdrant, persisted as JSON.
+
+    The file is rewritten atomically after every successful upsert batch.
     """
 
-    logger.info(f"Processing photo {photo_data['id']} from {photo_data['url']}")
+    def __init__(self, path: Path):
+        self.path = path
+        self.stored_ids: set[str] = set()
+        if path.exists():
+            with open(path) as f:
+                self.stored_ids = set(json.load(f).get("stored_ids", []))
+            logger.info(f"Resuming from checkpoint with {len(self.stored_ids)} photos")
+
+    def __contains__(self, photo_id: str) -> bool:
+        return photo_id in self.stored_ids
+
+    def add(self, photo_ids: list[str]):
+        self.stored_ids.update(photo_ids)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"stored_ids": sorted(self.stored_ids)}, f)
+        os.replace(tmp_path, self.path)
+
+
+def point_payload(photo: dict) -> dict:
+    """
+    Qdrant payload stored with every photo.
+
+    ingested_at changes on every upsert, even of an unchanged photo, so the
+    server can tell the collection was rewritten (see
+    qdrant_service.collection_version_async).
+    """
+    return {
+        "photo_url": photo["url"],
+        "animal_type": photo["animal_type"],
+        "photographer": photo["photographer"],
+        "source": "unsplash",
+        "ingested_at": time.time(),
+    }
+
+
+def filter_pending(photos: list[dict], checkpoint: Checkpoint) -> list[dict]:
+    """
+    Drop photos that are already stored, according to the checkpoint or Qdrant itself.
+
+    Qdrant is asked for the deterministic ids too, so points stored by a run
+    whose checkpoint was lost are still skipped.
+    """
+    candidates = [photo for photo in photos if photo["id"] not in checkpoint]
+    if not candidates:
+        return []
 
     try:
-        image = download_image(photo_data["url"])
-        if image is None:
-            return False
+        existing = get_client().retrieve(
+            collection_name=COLLECTION_NAME,
+            ids=[point_id(photo["id"]) for photo in candidates],
+            with_payload=False,
+            with_vectors=False,
+        )
+    except Exception as e:
+        logger.warning(f"Could not check existing points, processing all: {e}")
+        return candidates
+
+    existing_ids = {str(point.id) for point in existing}
+    already_stored = [p["id"] for p in candidates if point_id(p["id"]) in existing_ids]
+    if already_stored:
+        checkpoint.add(already_stored)
+    return [p for p in candidates if point_id(p["id"]) not in existing_ids]
+
+
+def download_photo(photo_data: dict) -> tuple[dict, Image.Image | None]:
+    """Download one photo, returning None instead of raising on failure."""
+    try:
+        return photo_data, download_image(photo_data["url"])
     except UnsplashServiceError as e:
-        logger.error(f"Could not download {photo_data['url']}: {e}", exc_info=True)
-        return False
+        logger.error(f"Could not download {photo_data['url']}: {e}")
+        return photo_data, None
+
 
+def embed_photos(
+    batch: list[tuple[dict, Image.Image]],
+) -> list[tuple[dict, np.ndarray]]:
+    """
+    Embed a batch of downloaded photos in one inference call.
+
+    Falls back to one-by-one inference if the batch fails, so a single
+    corrupt image only drops itself.
+    """
     try:
-        embedding = get_image_embedding(image)
-        if embedding is None:
-            return False
+        embeddings = get_image_embeddings([image for _, image in batch])
+        return [(photo, emb) for (photo, _), emb in zip(batch, embeddings)]
     except ClipServiceError as e:
-        logger.error(
-            f"Could not generate embedding for {photo_data['url']}: {e}", exc_info=True
-        )
-        return False
-
-    point = PointStruct(
-        id=str(uuid.uuid5(uuid.NAMESPACE_URL, photo_data["id"])),
-        vector=embedding.tolist(),
-        payload={
-            "photo_url": photo_data["url"],
-            "animal_type": photo_data["animal_type"],
-            "photographer": photo_data["photographer"],
-            "source": "unsplash",
-        },
-    )
+        logger.warning(f"Batch embedding failed, retrying photos one by one: {e}")
+
+    results = []
+    for photo, image in batch:
+        try:
+            results.append((photo, get_image_embedding(image)))
+        except ClipServiceError as e:
+            logger.error(f"Could not generate embedding for {photo['url']}: {e}")
+    return results
+
+
+def upsert_points(embedded: list[tuple[dict, np.ndarray]]) -> list[str]:
+    """
+    Store embedded photos in Qdrant with a single upsert call.
+
+    The float32 vectors are stacked into one (N, 512) array and handed to
+    upload_collection as-is, instead of building a 512-float Python list per
+    point; the gRPC transport packs the array without that round trip.
 
+    Returns:
+        Unsplash ids of the stored photos
+    """
+    vectors = np.stack([vector for _, vector in embedded]).astype(
+        np.float32, copy=False
+    )
     try:
-        client.upsert(collection_name=COLLECTION_NAME, points=[point])
-        logger.info(f"Stored photo {photo_data['id']} in Qdrant")
-        return True
-    except QdrantServiceError as e:
-        logger.error(f"Failed to store in Qdrant: {e}", exc_info=True)
-        return False
+        get_client().upload_collection(
+            collection_name=COLLECTION_NAME,
+            vectors=vectors,
+            ids=[point_id(photo["id"]) for photo, _ in embedded],
+            payload=[point_payload(photo) for photo, _ in embedded],
+            batch_size=len(embedded),
+            max_retries=1,
+            wait=True,
+        )
+    except Exception as e:
+        raise QdrantServiceError(f"Error upserting {len(embedded)} points: {e}")
+    return [photo["id"] for photo, _ in embedded]
+
+
+class IngestionPipeline:
+    """
+    Staged ingestion: concurrent downloads feed batched inference, which
+    feeds batched upserts running on a background thread. New embeddings are
+    recorded in the store (if any) before they are upserted.
+    """
+
+    def __init__(
+        self,
+        checkpoint: Checkpoint,
+        download_workers: int,
+        embed_batch_size: int,
+        upsert_batch_size: int,
+        store: EmbeddingStore | None = None,
+    ):
+        self.checkpoint = checkpoint
+        self.store = store
+        self.embed_batch_size = embed_batch_size
+        self.upsert_batch_size = upsert_batch_size
+        self.downloads = ThreadPoolExecutor(
+            max_workers=download_workers, thread_name_prefix="download"
+        )
+        self.uploads = ThreadPoolExecutor(max_workers=1, thread_name_prefix="upsert")
+        self.pending_upserts: list[Future] = []
+        self.to_embed: list[tuple[dict, Image.Image]] = []
+        self.to_upsert: list[tuple[dict, np.ndarray]] = []
+        self.total_stored = 0
+
+    def process(self, photos: list[dict]):
+        """Download, embed and queue upserts for a list of photos."""
+        futures = [self.downloads.submit(download_photo, photo) for photo in photos]
+        for future in as_completed(futures):
+            photo, image = future.result()
+            if image is not None:
+                self.add_downloaded(photo, image)
+
+    def add_downloaded(self, photo: dict, image: Image.Image):
+        """Queue one downloaded photo, embedding a batch once it is full."""
+        self.to_embed.append((photo, image))
+        if len(self.to_embed) >= self.embed_batch_size:
+            self._flush_embeddings()
+
+    def add_embedded(self, embedded: list[tuple[dict, np.ndarray]]):
+        """Queue photos that already have a vector (from the store) for upsert."""
+        self.to_upsert.extend(embedded)
+        if len(self.to_upsert) >= self.upsert_batch_size:
+            self._flush_upserts()
+
+    def _flush_embeddings(self):
+        if self.to_embed:
+            embedded = embed_photos(self.to_embed)
+            if self.store is not None:
+                self.store.add(embedded)
+            self.to_upsert.extend(embedded)
+            self.to_embed = []
+        if len(self.to_upsert) >= self.upsert_batch_size:
+            self._flush_upserts()
+
+    def _flush_upserts(self):
+        self._collect_upserts(block=False)
+        if self.to_upsert:
+            self.pending_upserts.append(
+                self.uploads.submit(upsert_points, self.to_upsert)
+            )
+            self.to_upsert = []
+
+    def _collect_upserts(self, block: bool):
+        remaining = []
+        for future in self.pending_upserts:
+            if not block and not future.done():
+                remaining.append(future)
+                continue
+            try:
+                stored = future.result()
+            except QdrantServiceError as e:
+                logger.error(f"Failed to store batch in Qdrant: {e}", exc_info=True)
+                continue
+            self.checkpoint.add(stored)
+            self.total_stored += len(stored)
+            logger.info(f"Stored {len(stored)} photos (total {self.total_stored})")
+        self.pending_upserts = remaining
+
+    def finish(self) -> int:
+        """Flush all partial batches, wait for uploads and return the stored count."""
+        self._flush_embeddings()
+        self._flush_upserts()
+        self._collect_upserts(block=True)
+        self.downloads.shutdown()
+        self.uploads.shutdown()
+        return self.total_stored
+
+
+def ingest(
+    pipeline: IngestionPipeline,
+    checkpoint: Checkpoint,
+    store: EmbeddingStore | None,
+    photos_per_animal: int,
+):
+    """Fetch each animal's metadata list, then download and embed what is missing."""
+    for animal in ANIMALS:
+        try:
+            photos = get_unsplash_photos(animal, count=photos_per_animal)
+        except UnsplashServiceError as e:
+            logger.error(f"Could not fetch photos for {animal}: {e}")
+            continue
+        if not photos:
+            logger.warning(f"No photos found for animal: {animal}")
+            continue
+
+        pending = filter_pending(photos, checkpoint)
+        cached = []
+        if store is not None:
+            # Only photos that are new, moved or embedded by another model
+            # are downloaded again
+            cached, pending = store.partition(pending)
+            pipeline.add_embedded(cached)
+        logger.info(
+            f"{animal}: {len(photos)} photos, "
+            f"{len(photos) - len(pending) - len(cached)} already stored, "
+            f"{len(cached)} from the embedding store"
+        )
+        pipeline.process(pending)
+
+
+async def stream_ingest(
+    pipeline: IngestionPipeline,
+    checkpoint: Checkpoint,
+    store: EmbeddingStore | None,
+    photos_per_animal: int,
+    download_workers: int,
+):
+    """
+    Feed the pipeline from stream_photo_images instead of per-animal lists.
+
+    Stored photos are dropped page by page before download; pipeline calls
+    run in worker threads (inference would otherwise stall the downloads on
+    the event loop), serialized by a lock.
+    """
+    lock = threading.Lock()
+
+    def select(page: list[dict]) -> list[dict]:
+        with lock:
+            pending = filter_pending(page, checkpoint)
+            cached = []
+            if store is not None:
+                cached, pending = store.partition(pending)
+                pipeline.add_embedded(cached)
+        logger.info(
+            f"{page[0]['animal_type']}: page of {len(page)} photos, "
+            f"{len(page) - len(pending) - len(cached)} already stored, "
+            f"{len(cached)} from the embedding store"
+        )
+        return pending
+
+    def add(photo: dict, image: Image.Image):
+        with lock:
+            pipeline.add_downloaded(photo, image)
+
+    async for photo, image in stream_photo_images(
+        ANIMALS, photos_per_animal, select=select, download_workers=download_workers
+    ):
+        if isinstance(image, Exception):
+            logger.error(f"Could not download {photo['url']}: {image}")
+            continue
+        await asyncio.to_thread(add, photo, image)
 
 
 def main():
@@ -77,9 +371,27 @@ def main():
     Main routine:
         1. Ensure Qdrant collection exists
         2. Iterate over animal types
-        3. Fetch photos from Unsplash
-        4. Process and store each photo
+        3. Fetch photo metadata from Unsplash and skip photos already stored
+        4. Upsert photos with a current vector in the embedding store from it
+        5. Download, embed and store the rest through the ingestion pipeline
     """
+    parser = argparse.ArgumentParser(description="Populate Qdrant with Unsplash photos")
+    parser.add_argument("--photos-per-animal", type=int, default=100)
+    parser.add_argument("--download-workers", type=int, default=8)
+    parser.add_argument("--embed-batch-size", type=int, default=32)
+    parser.add_argument("--upsert-batch-size", type=int, default=256)
+    parser.add_argument("--checkpoint", type=Path, default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--store", type=Path, default=EMBEDDING_STORE_DIR)
+    parser.add_argument(
+        "--no-store", action="store_true", help="Do not read or record embeddings"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream metadata and downloads through the async HTTP/2 fetcher",
+    )
+    args = parser.parse_args()
+
     logger.info("Starting Qdrant population script...")
 
     try:
@@ -88,18 +400,33 @@ def main():
         logger.error(f"Failed to create collection in Qdrant: {e}", exc_info=True)
         return
 
-    total_stored = 0
-
-    for animal in ANIMALS:
-        photos = get_unsplash_photos(animal)
-        if not photos:
-            logger.warning(f"No photos found for animal: {animal}")
-            continue
+    checkpoint = Checkpoint(args.checkpoint)
+    store = None if args.no_store else EmbeddingStore(args.store)
+    pipeline = IngestionPipeline(
+        checkpoint,
+        download_workers=args.download_workers,
+        embed_batch_size=args.embed_batch_size,
+        upsert_batch_size=args.upsert_batch_size,
+        store=store,
+    )
 
-        for photo in photos:
-            if process_and_store_photo(photo):
-                total_stored += 1
-            time.sleep(1)  # avoid hitting Unsplash rate limits
+    try:
+        if args.stream:
+            asyncio.run(
+                stream_ingest(
+                    pipeline,
+                    checkpoint,
+                    store,
+                    args.photos_per_animal,
+                    args.download_workers,
+                )
+            )
+        else:
+            ingest(pipeline, checkpoint, store, args.photos_per_animal)
+    finally:
+        total_stored = pipeline.finish()
+        if store is not None:
+            store.close()
 
     logger.info(f"Finished. Total photos stored: {total_stored}")
 
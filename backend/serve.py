@@ -0,0 +1,94 @@
+"""
+Purpose:
+    - Production entry point for running several uvicorn workers on one host
+    - Before the workers start: check the configured model, pull shared weights
+      into the page cache once (workers then map them without disk reads) and
+      log the per-worker ONNX thread budget
+    - Workers inherit WEB_CONCURRENCY, from which clip_service splits the usable
+      cores between every session of every worker (ONNX_INTRA_OP_THREADS)
+
+Usage:
+    poetry run python -m serve                             # one worker, as before
+    WEB_CONCURRENCY=4 CLIP_SHARED_WEIGHTS=1 poetry run python -m serve
+    poetry run python -m serve --port 8080
+
+Notes:
+    Without CLIP_SHARED_WEIGHTS each worker holds its own copy of the weights
+    (plus ONNX Runtime's prepacked copy), so memory grows with the worker count.
+    Build the shared layout once with scripts/externalize_onnx_weights.py.
+"""
+
+import argparse
+import os
+import sys
+import time
+from services.clip_service import (
+    CLIP_SHARED_WEIGHTS,
+    ONNX_INTRA_OP_THREADS,
+    WEB_CONCURRENCY,
+    resolve_model_path,
+    shared_weights_files,
+)
+from services.inference_executor import INFERENCE_WORKERS, INFERENCE_WORKER_TYPE
+from utils.logger import logger
+from utils.resources import available_cpus
+
+# Read size while pulling the weights into the page cache
+READ_CHUNK_BYTES = 16 * 1024 * 1024
+
+
+def warm_page_cache(path) -> float:
+    """Read a file once so every worker's mmap finds it resident; returns seconds."""
+    start = time.perf_counter()
+    buffer = bytearray(READ_CHUNK_BYTES)
+    with open(path, "rb", buffering=0) as f:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+        while f.readinto(buffer):
+            pass
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    model_path = resolve_model_path()
+    if not model_path.exists():
+        logger.error(f"Model not found: {model_path}")
+        sys.exit(1)
+
+    if CLIP_SHARED_WEIGHTS:
+        data_path, manifest_path = shared_weights_files(model_path)
+        if not (data_path.exists() and manifest_path.exists()):
+            logger.error(
+                f"Shared weights for {model_path.name} not found "
+                "(build them with scripts/externalize_onnx_weights.py)"
+            )
+            sys.exit(1)
+        seconds = warm_page_cache(data_path)
+        size_mb = data_path.stat().st_size / 1024 / 1024
+        logger.info(
+            f"Shared weights {data_path.name} ({size_mb:.1f} MB) cached in "
+            f"{seconds * 1000:.0f} ms"
+        )
+
+    sessions = WEB_CONCURRENCY * INFERENCE_WORKERS
+    logger.info(
+        f"Starting {WEB_CONCURRENCY} worker(s) x {INFERENCE_WORKERS} "
+        f"{INFERENCE_WORKER_TYPE} inference worker(s) = {sessions} ONNX sessions, "
+        f"{ONNX_INTRA_OP_THREADS} intra-op thread(s) each on {available_cpus()} "
+        f"usable core(s), model {model_path.name}"
+    )
+    if sessions * ONNX_INTRA_OP_THREADS > available_cpus():
+        logger.warning("ONNX threads exceed the usable cores; expect contention")
+
+    import uvicorn
+
+    uvicorn.run("main:app", host=args.host, port=args.port, workers=WEB_CONCURRENCY)
+
+
+if __name__ == "__main__":
+    main()
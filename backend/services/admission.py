@@ -0,0 +1,271 @@
+"""
+Purpose:
+    - Admission control for /api/search-doodle: cap the searches running at
+      once so overload queues (briefly) or sheds requests instead of slowing
+      every request down until clients time out
+    - The cap adapts to measured service time (gradient method): it grows
+      while searches finish within ADMISSION_LATENCY_TOLERANCE x the no-load
+      service time and shrinks as contention inflates it. Only searches that
+      ran inference and a vector search are measured: cache hits are orders
+      of magnitude faster and would make every real search look congested
+    - Requests over the cap wait in a deadline queue (earliest deadline
+      first). A request whose estimated wait would outlast its deadline is
+      rejected on arrival, and one whose deadline expires while queued is
+      dropped, both with HTTP 503; a full queue answers 429. Rejections carry
+      a Retry-After estimated from the queue's drain time
+    - Degraded mode (routes/search.py): requests that waited in the queue
+      skip test-time augmentation, and rejected requests are still answered
+      when their result is cached
+
+Usage:
+    from services.admission import admission
+    async with admission.admit(deadline) as ticket:   # deadline: monotonic s
+        ...  # ticket.queued is True when the request had to wait for a slot
+        ticket.measured = True  # the search ran embed + search, time it
+
+Notes:
+    State lives on the event loop of one worker process; each uvicorn worker
+    adapts its own limit.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from services.metrics import admission_rejections, observe_stage
+from utils.exceptions import AdmissionRejectedError
+
+#! Admission control configuration
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "1") == "1"
+ADMISSION_INITIAL_LIMIT = int(os.getenv("ADMISSION_INITIAL_LIMIT", "8"))
+ADMISSION_MIN_LIMIT = int(os.getenv("ADMISSION_MIN_LIMIT", "2"))
+ADMISSION_MAX_LIMIT = int(os.getenv("ADMISSION_MAX_LIMIT", "64"))
+# Requests allowed to wait for a slot; beyond this new arrivals get 429
+ADMISSION_QUEUE_LIMIT = int(os.getenv("ADMISSION_QUEUE_LIMIT", "64"))
+# Deadline of a request that does not send X-Request-Timeout-Ms (and the most
+# a client may ask for)
+ADMISSION_TIMEOUT_MS = float(os.getenv("ADMISSION_TIMEOUT_MS", "10000"))
+# Service time may grow to this multiple of the no-load time before the limit
+# shrinks
+ADMISSION_LATENCY_TOLERANCE = float(os.getenv("ADMISSION_LATENCY_TOLERANCE", "2.0"))
+# Degraded answers under pressure (no TTA when queued, cached results when shed)
+ADMISSION_DEGRADED = os.getenv("ADMISSION_DEGRADED", "1") == "1"
+
+# Weight of a new sample in the smoothed service time and limit
+SMOOTHING = 0.1
+# The no-load baseline is a low percentile of the most recent samples: one
+# unusually fast search cannot pin it, and it follows lasting changes
+# (another model variant, a larger collection) within a window
+BASELINE_WINDOW = 200
+BASELINE_PERCENTILE = 0.1
+# Floor of the gradient: one slow sample at most halves the target limit
+MIN_GRADIENT = 0.5
+
+
+class Ticket:
+    """A held slot; set measured when the search's time reflects the load."""
+
+    __slots__ = ("queued", "measured")
+
+    def __init__(self, queued: bool):
+        self.queued = queued
+        self.measured = False
+
+
+class AdmissionController:
+    """Adaptive concurrency limit with an earliest-deadline-first wait queue."""
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        queue_limit: int,
+        tolerance: float,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_limit = queue_limit
+        self.tolerance = tolerance
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.in_flight = 0
+        # (deadline, arrival order, future resolved when a slot is granted)
+        self._waiters: list[tuple[float, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        # Seconds; None until the first search completes
+        self.service_time: float | None = None
+        self.baseline: float | None = None
+        self._samples: deque[float] = deque(maxlen=BASELINE_WINDOW)
+        self.admitted = 0
+        self.queued_total = 0
+        self.rejected = {"queue_full": 0, "deadline": 0, "expired": 0}
+
+    def _estimated_wait(self, position: int) -> float:
+        """Seconds until the request at this queue position gets a slot."""
+        return position * (self.service_time or 0.0) / max(int(self.limit), 1)
+
+    def _reject(self, reason: str, status_code: int, wait: float):
+        self.rejected[reason] += 1
+        admission_rejections.inc(reason=reason)
+        raise AdmissionRejectedError(
+            f"Search rejected by admission control ({reason})",
+            reason=reason,
+            status_code=status_code,
+            retry_after=max(1, math.ceil(wait)),
+        )
+
+    async def _acquire(self, deadline: float) -> bool:
+        """Take a slot, waiting in the queue if needed. Returns True if it waited."""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return False
+
+        position = len(self._waiters) + 1
+        wait = self._estimated_wait(position)
+        if position > self.queue_limit:
+            self._reject("queue_full", 429, wait)
+        # Shed now rather than fail the client later: it would time out anyway
+        remaining = deadline - time.monotonic()
+        if wait + (self.service_time or 0.0) > remaining:
+            self._reject("deadline", 503, wait)
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (deadline, next(self._order), future)
+        heapq.heappush(self._waiters, entry)
+        self.queued_total += 1
+        try:
+            # Wait until a slot is granted or it can no longer be used in time
+            await asyncio.wait({future}, timeout=remaining - (self.service_time or 0))
+        except BaseException:
+            # A waiter _dispatch expired holds no slot, only its exception
+            granted = (
+                future.done() and not future.cancelled() and future.exception() is None
+            )
+            self._leave(entry, granted=granted)
+            raise
+        if not future.done():
+            self._leave(entry, granted=False)
+            self._reject("expired", 503, self._estimated_wait(len(self._waiters)))
+        future.result()  # raises if _dispatch expired it
+        return True
+
+    def _leave(self, entry, granted: bool):
+        """Take an abandoned waiter out of the queue (or give back its slot)."""
+        if granted:
+            self._release(None)
+            return
+        entry[2].cancel()
+        if entry in self._waiters:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+
+    def _dispatch(self):
+        """Hand free slots to waiters, earliest deadline first."""
+        now = time.monotonic()
+        while self._waiters and self.in_flight < int(self.limit):
+            deadline, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            if now + (self.service_time or 0.0) > deadline:
+                self.rejected["expired"] += 1
+                admission_rejections.inc(reason="expired")
+                future.set_exception(
+                    AdmissionRejectedError(
+                        "Search rejected by admission control (expired)",
+                        reason="expired",
+                        status_code=503,
+                        retry_after=max(1, math.ceil(self._estimated_wait(1))),
+                    )
+                )
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _update(self, sample: float):
+        """Adapt the limit to one completed search's service time (seconds)."""
+        if self.service_time is None:
+            self.service_time = sample
+        self.service_time += SMOOTHING * (sample - self.service_time)
+        self._samples.append(sample)
+        window = sorted(self._samples)
+        self.baseline = window[int(len(window) * BASELINE_PERCENTILE)]
+
+        # 1 while service time stays within tolerance of the baseline, lower
+        # as queueing inside the pipeline (executor, batcher) inflates it
+        gradient = self.tolerance * self.baseline / self.service_time
+        gradient = max(MIN_GRADIENT, min(1.0, gradient))
+        # Probe for more capacity only while the limit is actually in use
+        headroom = math.sqrt(self.limit) if self.in_flight >= self.limit / 2 else 0.0
+        target = self.limit * gradient + headroom
+        limit = self.limit + SMOOTHING * (target - self.limit)
+        self.limit = max(self.min_limit, min(self.max_limit, limit))
+
+    def _release(self, sample: float | None):
+        if sample is not None:
+            self._update(sample)
+        self.in_flight -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def admit(self, deadline: float) -> AsyncIterator[Ticket]:
+        """
+        Hold a slot for the enclosed search.
+
+        Args:
+            deadline: time.monotonic() by which the client expects an answer
+
+        Yields:
+            Ticket: queued is True if the request waited in the queue (the
+            service is saturated); set measured = True when the search ran
+            inference and a vector search, so its time adapts the limit
+
+        Raises:
+            AdmissionRejectedError: queue full (429) or deadline unreachable (503)
+        """
+        if not self.enabled:
+            yield Ticket(queued=False)
+            return
+        start = time.perf_counter_ns()
+        ticket = Ticket(await self._acquire(deadline))
+        if ticket.queued:
+            observe_stage("queue", time.perf_counter_ns() - start)
+        self.admitted += 1
+        started = time.monotonic()
+        try:
+            yield ticket
+        except BaseException:
+            # Failed searches (bad input, backend errors) say nothing about load
+            self._release(None)
+            raise
+        self._release(time.monotonic() - started if ticket.measured else None)
+
+    def get_stats(self) -> dict:
+        """Return the current limit, occupancy, service times and counters."""
+        return {
+            "enabled": self.enabled,
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "service_time_ms": round((self.service_time or 0.0) * 1000, 2),
+            "baseline_ms": round((self.baseline or 0.0) * 1000, 2),
+            "admitted": self.admitted,
+            "queued_total": self.queued_total,
+            "rejected": dict(self.rejected),
+        }
+
+
+admission = AdmissionController(
+    initial_limit=ADMISSION_INITIAL_LIMIT,
+    min_limit=ADMISSION_MIN_LIMIT,
+    max_limit=ADMISSION_MAX_LIMIT,
+    queue_limit=ADMISSION_QUEUE_LIMIT,
+    tolerance=ADMISSION_LATENCY_TOLERANCE,
+    enabled=ADMISSION_CONTROL,
+)
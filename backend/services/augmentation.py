@@ -0,0 +1,257 @@
+"""
+Purpose:
+    - Test-time augmentation for doodle search: build several views of one
+      canvas, embed them in a single batched ONNX run and fuse their results
+    - Views (TTA_VIEWS, in this order):
+        full     the whole canvas (transparent areas flattened onto white
+                 paper, like every other view)
+        crop     tight bounding box of the strokes, stretched to fill the input
+        square   bounding box padded to a square, so strokes keep their aspect
+        dilate   the padded square with thickened strokes (thin lines survive
+                 the downscale to 224x224)
+        flip     the padded square mirrored horizontally
+    - Fusion of the per-view result lists:
+        rrf      reciprocal rank fusion, sum of 1 / (k + rank) (scale-free)
+        score    mean cosine similarity across views
+
+Usage:
+    from services.augmentation import doodle_views, fuse_results
+    views = doodle_views(decoded_image)                  # list of canonical images
+    embeddings = get_image_embeddings(views)             # one ONNX call
+    per_view = search_similar_images_batch(embeddings, limit=TTA_CANDIDATES)
+    results = fuse_results(per_view, limit=3, fusion="rrf")
+"""
+
+import os
+from typing import List, Sequence, Tuple
+import numpy as np
+from PIL import Image, ImageOps
+from services.clip_service import IMAGE_SIZE, canonicalize_image
+
+#! Augmentation configuration
+VIEW_NAMES = ("full", "crop", "square", "dilate", "flip")
+TTA_VIEWS = tuple(
+    view.strip()
+    for view in os.getenv("TTA_VIEWS", ",".join(VIEW_NAMES)).split(",")
+    if view.strip()
+)
+FUSION_METHODS = ("rrf", "score")
+TTA_FUSION = os.getenv("TTA_FUSION", "rrf")
+# Reciprocal rank fusion damping constant (60 is the value from the RRF paper)
+TTA_RRF_K = float(os.getenv("TTA_RRF_K", "60"))
+# Results fetched per view before fusion; deeper lists let views outvote each other
+TTA_CANDIDATES = int(os.getenv("TTA_CANDIDATES", "20"))
+
+if unknown := set(TTA_VIEWS) - set(VIEW_NAMES):
+    raise ValueError(f"Unknown TTA_VIEWS: {', '.join(sorted(unknown))}")
+if TTA_FUSION not in FUSION_METHODS:
+    raise ValueError(f"Unknown TTA_FUSION: {TTA_FUSION}")
+
+# A pixel counts as ink when it differs from the background by more than this
+INK_THRESHOLD = 32
+# Margin around the stroke bounding box, as a fraction of its longer side
+CROP_MARGIN = 0.04
+SQUARE_MARGIN = 0.1
+# Derived views are cut from one copy of the padded square at this resolution,
+# so the full-size canvas is resampled once instead of once per view
+WORK_SIZE = 2 * IMAGE_SIZE
+# Stroke growth at WORK_SIZE (2 px there ~ 1 px at 224x224)
+DILATE_RADIUS = 2
+
+SearchResult = Tuple[str, float, str, str]
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """RGB copy of the canvas; transparent areas become white paper."""
+    if image.mode in ("RGBA", "LA") or "transparency" in image.info:
+        rgba = image.convert("RGBA")
+        paper = Image.new("RGB", rgba.size, (255, 255, 255))
+        paper.paste(rgba, mask=rgba.getchannel("A"))
+        return paper
+    return image.convert("RGB")
+
+
+def _background(gray: np.ndarray) -> int:
+    """Background level of a grayscale canvas: the median of its border pixels."""
+    border = np.concatenate([gray[0], gray[-1], gray[:, 0], gray[:, -1]])
+    return int(np.median(border))
+
+
+def ink_bbox(image: Image.Image) -> tuple[tuple[int, int, int, int] | None, int]:
+    """
+    Locate the strokes of an RGB canvas.
+
+    Returns:
+        (bounding box (left, top, right, bottom) or None for a blank canvas,
+        background gray level)
+    """
+    gray = np.asarray(image.convert("L"), dtype=np.int16)
+    background = _background(gray)
+    ink = np.abs(gray - background) > INK_THRESHOLD
+    rows = np.flatnonzero(ink.any(axis=1))
+    if not len(rows):
+        return None, background
+    cols = np.flatnonzero(ink.any(axis=0))
+    return (cols[0], rows[0], cols[-1] + 1, rows[-1] + 1), background
+
+
+def _expand(box, margin: float, square: bool) -> tuple[int, int, int, int]:
+    """Grow a box by a relative margin (and to a square), around its center."""
+    left, top, right, bottom = box
+    width, height = right - left, bottom - top
+    pad = max(width, height) * margin
+    if square:
+        width = height = max(width, height)
+    cx, cy = (left + right) / 2, (top + bottom) / 2
+    half_w, half_h = width / 2 + pad, height / 2 + pad
+    return (
+        round(cx - half_w),
+        round(cy - half_h),
+        round(cx + half_w),
+        round(cy + half_h),
+    )
+
+
+def _crop(image: Image.Image, box, fill: int) -> Image.Image:
+    """Crop that may extend past the canvas, padding with the background."""
+    left, top, right, bottom = box
+    if left >= 0 and top >= 0 and right <= image.width and bottom <= image.height:
+        return image.crop(box)
+    canvas = Image.new(image.mode, (right - left, bottom - top), (fill,) * 3)
+    canvas.paste(image, (-left, -top))
+    return canvas
+
+
+def _dilate(image: Image.Image, background: int) -> Image.Image:
+    """
+    Thicken the strokes of a WORK_SIZE view by about one model-input pixel.
+
+    A separable 5x5 rank filter runs as shifted numpy minimums (dark ink on
+    light paper) or maximums (light ink on dark paper): a few vectorized
+    passes instead of PIL's per-pixel sort. Edges are padded with their own
+    values.
+    """
+    pixels = np.asarray(image)
+    reduce = np.minimum if background >= 128 else np.maximum
+    for axis in (0, 1):
+        pad = [(0, 0)] * pixels.ndim
+        pad[axis] = (DILATE_RADIUS, DILATE_RADIUS)
+        padded = np.pad(pixels, pad, mode="edge")
+        size = pixels.shape[axis]
+        pixels = padded.take(range(size), axis=axis)
+        for shift in range(1, 2 * DILATE_RADIUS + 1):
+            shifted = padded.take(range(shift, shift + size), axis=axis)
+            pixels = reduce(pixels, shifted)
+    return Image.fromarray(pixels)
+
+
+def doodle_views(image: Image.Image, views: Sequence[str] = TTA_VIEWS) -> list:
+    """
+    Build the canonical (224x224) views of one decoded doodle.
+
+    Every view starts from the same flattened canvas, so a transparent
+    background is white paper in all of them (a plain RGB conversion would
+    turn it black in the full view alone and skew the fusion). Only the full
+    view is resampled from that canvas; the others are cut from a single
+    WORK_SIZE copy of the padded square (the crop box always lies inside it).
+    A blank canvas has no stroke bounding box, so its crop and square views
+    fall back to the whole canvas.
+
+    Returns:
+        list of PIL.Image.Image, one per name in `views`, in the same order
+    """
+    built = {}
+    rgb = _flatten(image)
+    if "full" in views:
+        built["full"] = canonicalize_image(rgb)
+
+    if set(views) - {"full"}:
+        box, background = ink_bbox(rgb)
+        if box is None:
+            box = (0, 0, rgb.width, rgb.height)
+        square_box = _expand(box, SQUARE_MARGIN, square=True)
+        work = _crop(rgb, square_box, background).resize((WORK_SIZE, WORK_SIZE))
+
+        square = canonicalize_image(work)
+        built["square"] = square
+        built["flip"] = ImageOps.mirror(square)
+        if "crop" in views:
+            scale = WORK_SIZE / (square_box[2] - square_box[0])
+            x0, y0 = square_box[:2]
+            left, top, right, bottom = _expand(box, CROP_MARGIN, square=False)
+            crop_box = (
+                round((left - x0) * scale),
+                round((top - y0) * scale),
+                round((right - x0) * scale),
+                round((bottom - y0) * scale),
+            )
+            built["crop"] = canonicalize_image(work.crop(crop_box))
+        if "dilate" in views:
+            built["dilate"] = canonicalize_image(_dilate(work, background))
+
+    return [built[view] for view in views]
+
+
+def fuse_results(
+    per_view: Sequence[Sequence[SearchResult]],
+    limit: int,
+    fusion: str = TTA_FUSION,
+    rrf_k: float = TTA_RRF_K,
+) -> List[SearchResult]:
+    """
+    Merge the ranked result lists of several views into one.
+
+    Args:
+        per_view: One (photo_url, similarity, animal_type, photographer) list
+            per view, best first
+        fusion: "rrf" ranks by sum(1 / (rrf_k + rank)) over the views that
+            returned a photo; "score" ranks by mean similarity over all views,
+            counting a view that missed the photo at its lowest returned score
+            (an upper bound on the unseen similarity)
+
+    Returns:
+        Top `limit` results. The similarity reported for each photo is its
+        mean over the views that returned it, so confidences stay on the
+        usual cosine scale whatever the fusion method.
+    """
+    if fusion not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method: {fusion}")
+
+    payloads: dict[str, tuple[str, str]] = {}
+    similarities: dict[str, list[float]] = {}
+    rrf: dict[str, float] = {}
+    for results in per_view:
+        for rank, (url, similarity, animal_type, photographer) in enumerate(results):
+            payloads[url] = (animal_type, photographer)
+            similarities.setdefault(url, []).append(similarity)
+            rrf[url] = rrf.get(url, 0.0) + 1.0 / (rrf_k + rank + 1)
+
+    if fusion == "rrf":
+        scores = rrf
+    else:
+        floors = [results[-1][1] if results else 0.0 for results in per_view]
+        missing_floor = {url: 0.0 for url in similarities}
+        for results, floor in zip(per_view, floors):
+            seen = {url for url, *_ in results}
+            for url in similarities:
+                if url not in seen:
+                    missing_floor[url] += floor
+        scores = {
+            url: (sum(found) + missing_floor[url]) / len(per_view)
+            for url, found in similarities.items()
+        }
+
+    ranked = sorted(scores, key=lambda url: scores[url], reverse=True)[:limit]
+    return [(url, float(np.mean(similarities[url])), *payloads[url]) for url in ranked]
+
+
+def best_per_animal(results: Sequence[SearchResult], limit: int) -> List[SearchResult]:
+    """Grouped mode over fused results: keep the best photo of each animal type."""
+    grouped, seen = [], set()
+    for result in results:
+        if result[2] not in seen:
+            seen.add(result[2])
+            grouped.append(result)
+            if len(grouped) == limit:
+                break
+    return grouped
@@ -0,0 +1,337 @@
+"""
+Purpose:
+    - Cache CLIP embeddings and search results for resubmitted doodles
+    - Key entries by a hash of the canonical (decoded, model-resolution) pixels, not the raw base64
+    - Evict by LRU order, TTL and a bounded memory budget
+    - Optionally share entries through an on-disk tier that survives restarts,
+      namespaced by model (MODEL_TAG) so a model change never serves old vectors
+    - Optionally store embeddings as float16 or int8 (EMBEDDING_CACHE_DTYPE)
+    - Map hashes of raw request payloads to their content keys (payload_keys),
+      so degraded cache-only answers can find an entry without decoding
+
+Usage:
+    from services.cache_service import embedding_cache, search_cache, content_key
+    key = content_key(canonical_image)
+    embedding = embedding_cache.get(key)
+    if embedding is None:
+        embedding = get_image_embedding(canonical_image)
+        embedding_cache.put(key, embedding)
+
+    # On the event loop: the disk tier is read and written in a thread
+    embedding = await embedding_cache.aget(key)
+    await embedding_cache.aput(key, embedding)
+"""
+
+import asyncio
+import hashlib
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Hashable
+import numpy as np
+from PIL import Image
+from services.embedding_store import MODEL_TAG
+from utils.logger import logger
+from utils.vectors import EMBEDDING_DTYPES, decode_embedding, encode_embedding
+
+#! Cache configuration
+# EMBEDDING_CACHE_DIR enables the shared on-disk tier (e.g. a volume mounted
+# into every worker). Leave unset to keep the cache purely in memory.
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "2048"))
+EMBEDDING_CACHE_MAX_MB = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "32"))
+EMBEDDING_CACHE_TTL_SECONDS = float(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", "86400"))
+# Search results depend on the collection contents, so they expire sooner
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "600"))
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR")
+# Entries on disk outlive the process: keep each model's (and variant's) apart,
+# content keys only hash pixels
+CACHE_DISK_DIR = (
+    str(Path(EMBEDDING_CACHE_DIR) / MODEL_TAG.replace(":", "-"))
+    if EMBEDDING_CACHE_DIR
+    else None
+)
+# Compact storage for cached embeddings: float32 | float16 (half) | int8 (quarter)
+EMBEDDING_CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float32")
+
+if EMBEDDING_CACHE_DTYPE not in EMBEDDING_DTYPES:
+    raise ValueError(f"Unknown EMBEDDING_CACHE_DTYPE: {EMBEDDING_CACHE_DTYPE}")
+
+# Touched by clear(); workers drop their in-memory entries when its mtime moves
+GENERATION_FILE = "GENERATION"
+
+
+def content_key(image: Image.Image) -> str:
+    """
+    Hash the pixel content of a canonical image (see clip_service.canonicalize_image).
+
+    Returns:
+        Hex digest identifying the image content
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{image.mode}:{image.size}".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def _estimate_size(value: Any) -> int:
+    """Approximate the memory held by a cached value in bytes."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes + sys.getsizeof(value)
+    if isinstance(value, tuple) and value and isinstance(value[0], np.ndarray):
+        return sum(_estimate_size(item) for item in value)
+    if isinstance(value, float):
+        return sys.getsizeof(value)
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU cache with TTL and a memory budget.
+
+    An optional disk directory acts as a second tier: misses in memory fall
+    back to disk, and every put is written through so other workers and
+    future processes can reuse the entry. clear() empties both tiers and
+    touches a generation marker on disk; every worker compares the marker
+    on access and drops its in-memory entries when it has moved.
+
+    encode/decode, if given, convert values to and from their stored form
+    (in memory and on disk), e.g. to keep embeddings in a compact dtype.
+
+    get/put touch the disk tier synchronously; async callers use aget/aput,
+    which run them in a thread when there is a disk tier.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int,
+        max_bytes: int,
+        ttl_seconds: float,
+        disk_dir: str | None = None,
+        encode: Callable[[Any], Any] | None = None,
+        decode: Callable[[Any], Any] | None = None,
+    ):
+        self.name = name
+        self.encode = encode
+        self.decode = decode
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = Path(disk_dir) / name if disk_dir else None
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+        self._entries: OrderedDict[Hashable, tuple[Any, float, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = self._disk_generation()
+        self.memory_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        """Return the cached value, or None on a miss or expired entry."""
+        value = self._get_stored(key)
+        if value is not None and self.decode is not None:
+            return self.decode(value)
+        return value
+
+    async def aget(self, key: Hashable) -> Any | None:
+        """get() without blocking the event loop on the disk tier."""
+        if self.disk_dir is None:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key: Hashable, value: Any, age: float = 0.0):
+        """put() without blocking the event loop on the disk tier."""
+        if self.disk_dir is None:
+            self.put(key, value, age)
+            return
+        await asyncio.to_thread(self.put, key, value, age)
+
+    def _get_stored(self, key: Hashable) -> Any | None:
+        now = time.monotonic()
+        self._sync_generation()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, _ = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+
+        value, age = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            # The entry keeps its remaining disk lifetime in memory
+            self._store(key, value, now - age)
+        return value
+
+    def put(self, key: Hashable, value: Any, age: float = 0.0):
+        """
+        Insert or refresh an entry, evicting least recently used ones as needed.
+
+        Args:
+            age: Seconds the value has already been cached elsewhere; it expires
+                that much sooner (e.g. results copied from the semantic cache)
+        """
+        if self.encode is not None:
+            value = self.encode(value)
+        self._sync_generation()
+        with self._lock:
+            self._store(key, value, time.monotonic() - age)
+        self._write_disk(key, value, age)
+
+    def clear(self):
+        """Drop every entry, in memory and on disk, for every worker."""
+        self._clear_memory()
+        if self.disk_dir is None:
+            return
+        for path in self.disk_dir.glob("*.pkl"):
+            path.unlink(missing_ok=True)
+        marker = self.disk_dir / GENERATION_FILE
+        marker.touch()
+        # Bump the mtime even when the filesystem clock is coarse
+        stamp = max(time.time_ns(), self._generation + 1)
+        os.utime(marker, ns=(stamp, stamp))
+        self._generation = self._disk_generation()
+
+    def _clear_memory(self):
+        with self._lock:
+            self._entries.clear()
+            self.memory_bytes = 0
+
+    def _disk_generation(self) -> int:
+        """mtime (ns) of the generation marker, 0 without one or a disk tier."""
+        if self.disk_dir is None:
+            return 0
+        try:
+            return (self.disk_dir / GENERATION_FILE).stat().st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def _sync_generation(self):
+        """Forget in-memory entries when another worker cleared the cache."""
+        generation = self._disk_generation()
+        if generation != self._generation:
+            self._clear_memory()
+            self._generation = generation
+
+    def _store(self, key: Hashable, value: Any, now: float):
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, now + self.ttl_seconds, size)
+        self.memory_bytes += size
+
+        while self._entries and (
+            len(self._entries) > self.max_entries or self.memory_bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        _, _, size = self._entries.pop(key)
+        self.memory_bytes -= size
+
+    def _disk_path(self, key: Hashable) -> Path:
+        name = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return self.disk_dir / f"{name}.pkl"
+
+    def _read_disk(self, key: Hashable) -> tuple[Any | None, float]:
+        """Return (stored value or None, seconds since it was written)."""
+        if self.disk_dir is None:
+            return None, 0.0
+        path = self._disk_path(key)
+        try:
+            age = max(0.0, time.time() - path.stat().st_mtime)
+            if age > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                return None, 0.0
+            with open(path, "rb") as f:
+                return pickle.load(f), age
+        except FileNotFoundError:
+            return None, 0.0
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable {self.name} cache file {path}: {e}")
+            return None, 0.0
+
+    def _write_disk(self, key: Hashable, value: Any, age: float = 0.0):
+        if self.disk_dir is None:
+            return
+        path = self._disk_path(key)
+        # Write to a temp file and rename so concurrent readers never see partial data
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            if age:
+                # Disk entries expire by mtime, so backdate it by the age
+                written = time.time() - age
+                os.utime(tmp_path, (written, written))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            tmp_path.unlink(missing_ok=True)
+            logger.warning(f"Failed to write {self.name} cache file {path}: {e}")
+
+    def get_stats(self) -> dict:
+        """Return hit/miss counters and memory usage."""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "memory_bytes": self.memory_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "disk_tier": str(self.disk_dir) if self.disk_dir else None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (
+                round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0
+            ),
+        }
+
+
+_max_bytes = int(EMBEDDING_CACHE_MAX_MB * 1024 * 1024)
+
+embedding_cache = LRUCache(
+    "embeddings",
+    max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+    max_bytes=_max_bytes,
+    ttl_seconds=EMBEDDING_CACHE_TTL_SECONDS,
+    disk_dir=CACHE_DISK_DIR,
+    encode=lambda embedding: encode_embedding(embedding, EMBEDDING_CACHE_DTYPE),
+    decode=decode_embedding,
+)
+
+search_cache = LRUCache(
+    "search_results",
+    max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+    max_bytes=_max_bytes,
+    ttl_seconds=SEARCH_CACHE_TTL_SECONDS,
+    disk_dir=CACHE_DISK_DIR,
+)
+
+# Raw payload hash -> content key of its canonical image; in memory only (the
+# keys are tiny, and a worker that never decoded a payload has no use for it)
+payload_keys = LRUCache(
+    "payload_keys",
+    max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+    max_bytes=_max_bytes,
+    ttl_seconds=EMBEDDING_CACHE_TTL_SECONDS,
+)
@@ -2,33 +2,229 @@
 Purpose:
     - Provide functions to generate CLIP image embeddings from PIL Images
     - Handle preprocessing, ONNX inference, and L2 normalization
+    - Preprocess whole batches into a reusable, preallocated input buffer
+    - Micro-batch concurrent requests into a single ONNX inference call
     - Centralized service for embedding generation used across scripts
 
 Usage:
     from services.clip_service import get_image_embedding
     embedding = get_image_embedding(pil_image)
+
+    # Inside async request handlers, prefer the batching queue
+    from services.clip_service import get_image_embedding_batched
+    embedding = await get_image_embedding_batched(pil_image)
 """
 
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import time
 from pathlib import Path
+from typing import TYPE_CHECKING
 import numpy as np
 from PIL import Image
-import onnxruntime as ort
-from utils.exceptions import ClipServiceError
+from services.inference_executor import (
+    INFERENCE_QUEUE_LIMIT,
+    INFERENCE_WORKERS,
+    run_in_inference_executor,
+)
+from services.metrics import observe_stage
+from utils.exceptions import ClipServiceError, InferenceQueueFullError
+from utils.logger import logger
+from utils.resources import available_cpus
+
+if TYPE_CHECKING:
+    import onnxruntime as ort
 
 # Setup ONNX model path
 BASE_DIR = Path(__file__).resolve().parent.parent
-MODEL_PATH = BASE_DIR / "models/clip/clip-vit-base-patch32.onnx"
+MODEL_DIR = BASE_DIR / "models/clip"
+MODEL_PATH = MODEL_DIR / "clip-vit-base-patch32.onnx"
+
+#! Model variant selection
+# Variants are produced by scripts/optimize_onnx_model.py next to MODEL_PATH:
+#   fp32 -> clip-vit-base-patch32.onnx        (original export)
+#   int8 -> clip-vit-base-patch32.int8.onnx   (dynamic INT8 quantization)
+#   fp16 -> clip-vit-base-patch32.fp16.onnx   (FP16 weights, FP32 inputs/outputs)
+# With CLIP_MODEL_OPTIMIZED=1 the offline-optimized graph (*.opt.onnx) is loaded
+# and runtime graph optimization is skipped, which also shortens startup.
+MODEL_VARIANTS = ("fp32", "int8", "fp16")
+CLIP_MODEL_VARIANT = os.getenv("CLIP_MODEL_VARIANT", "fp32")
+CLIP_MODEL_OPTIMIZED = os.getenv("CLIP_MODEL_OPTIMIZED", "0") == "1"
+
+#! Shared, memory-mapped weights
+# With CLIP_SHARED_WEIGHTS=1 the weights are read from a raw external-data file
+# (built by scripts/externalize_onnx_weights.py) through one read-only mmap per
+# process and handed to every session without a copy. All sessions of a process
+# use the same buffers, and the page cache backs them once for every process on
+# the host, so memory no longer grows with uvicorn or inference workers.
+# ONNX Runtime's weight prepacking would copy them again, so it is disabled.
+CLIP_SHARED_WEIGHTS = os.getenv("CLIP_SHARED_WEIGHTS", "0") == "1"
+
+#! ONNX Runtime threading
+# Each inference worker of each uvicorn worker (WEB_CONCURRENCY, as uvicorn and
+# serve.py read it) owns a session, so by default the usable cores (affinity and
+# container quota aware) are split between all of them instead of every session
+# spinning up one thread per core.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+ONNX_INTRA_OP_THREADS = int(
+    os.getenv(
+        "ONNX_INTRA_OP_THREADS",
+        str(max(1, available_cpus() // (WEB_CONCURRENCY * INFERENCE_WORKERS))),
+    )
+)
+ONNX_INTER_OP_THREADS = int(os.getenv("ONNX_INTER_OP_THREADS", "1"))
+
+
+def resolve_model_path(
+    variant: str = CLIP_MODEL_VARIANT,
+    optimized: bool = CLIP_MODEL_OPTIMIZED,
+    shared: bool = CLIP_SHARED_WEIGHTS,
+) -> Path:
+    """
+    Return the ONNX file for a model variant.
+
+    Args:
+        variant: One of MODEL_VARIANTS
+        optimized: Use the offline-optimized graph of that variant
+        shared: Use the external-data copy of that graph (*.shared.onnx)
+    """
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Unknown CLIP model variant: {variant}")
+    suffix = "" if variant == "fp32" else f".{variant}"
+    if optimized:
+        suffix += ".opt"
+    if shared:
+        suffix += ".shared"
+    return MODEL_PATH.with_name(f"{MODEL_PATH.stem}{suffix}.onnx")
+
 
-# Ensure model exists
-if not MODEL_PATH.exists():
-    raise FileNotFoundError(f"Model not found: {MODEL_PATH}")
+def shared_weights_files(model_path: Path) -> tuple[Path, Path]:
+    """Return the (raw weights, JSON manifest) files of a *.shared.onnx model."""
+    return model_path.with_suffix(".data"), model_path.with_suffix(".json")
 
-# Load ONNX session (CPU)
-session = ort.InferenceSession(str(MODEL_PATH), providers=["CPUExecutionProvider"])
 
-# Retrieve input name dynamically
-input_name = session.get_inputs()[0].name
-print(f"Model input name: {input_name}")
+# model path -> {initializer name: OrtValue over the mmap}; kept for the
+# lifetime of the process, since sessions only borrow the buffers
+_shared_initializers: dict[Path, dict] = {}
+_shared_initializers_lock = threading.Lock()
+
+
+def load_shared_initializers(model_path: Path) -> dict:
+    """
+    Map the external weights of model_path read-only and wrap every tensor
+    listed in its manifest as an OrtValue, once per process.
+    """
+    import onnxruntime as ort
+
+    with _shared_initializers_lock:
+        if model_path not in _shared_initializers:
+            data_path, manifest_path = shared_weights_files(model_path)
+            if not manifest_path.exists():
+                raise FileNotFoundError(
+                    f"Shared weights manifest not found: {manifest_path} "
+                    "(build it with scripts/externalize_onnx_weights.py)"
+                )
+            manifest = json.loads(manifest_path.read_text())
+            weights = np.memmap(data_path, mode="r")
+            _shared_initializers[model_path] = {
+                name: ort.OrtValue.ortvalue_from_numpy(
+                    weights[t["offset"] : t["offset"] + t["length"]]
+                    .view(t["dtype"])
+                    .reshape(t["shape"])
+                )
+                for name, t in manifest["tensors"].items()
+            }
+        return _shared_initializers[model_path]
+
+
+def create_session(
+    model_path: Path | None = None,
+    optimized: bool = CLIP_MODEL_OPTIMIZED,
+    intra_op_threads: int = ONNX_INTRA_OP_THREADS,
+    inter_op_threads: int = ONNX_INTER_OP_THREADS,
+) -> ort.InferenceSession:
+    """
+    Build a CPU InferenceSession with explicit threading and optimization options.
+
+    Args:
+        model_path: ONNX file to load (defaults to the configured variant)
+        optimized: The file is an offline-optimized graph, skip re-optimizing it
+        intra_op_threads: Threads used inside a single operator
+        inter_op_threads: Threads used to run independent operators in parallel
+
+    *.shared.onnx models get their weights from the process-wide mmap.
+    """
+    # Imported here so importing this module stays cheap for scripts and /health
+    import onnxruntime as ort
+
+    model_path = model_path or resolve_model_path()
+    # Ensure model exists
+    if not model_path.exists():
+        raise FileNotFoundError(f"Model not found: {model_path}")
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = intra_op_threads
+    options.inter_op_num_threads = inter_op_threads
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = (
+        ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        if optimized
+        else ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    )
+    if model_path.name.endswith(".shared.onnx"):
+        options.add_session_config_entry("session.disable_prepacking", "1")
+        for name, value in load_shared_initializers(model_path).items():
+            options.add_initializer(name, value)
+    return ort.InferenceSession(
+        str(model_path), sess_options=options, providers=["CPUExecutionProvider"]
+    )
+
+
+#! Per-worker ONNX sessions
+# Every inference worker (thread or process) lazily builds and keeps its own
+# InferenceSession, so concurrent batches never contend on a shared session.
+_worker_state = threading.local()
+
+
+def get_session() -> tuple[ort.InferenceSession, str]:
+    """
+    Return the calling worker's ONNX session and its input name.
+
+    The session is created on first use in each thread, using the configured
+    model variant and threading options.
+    """
+    if getattr(_worker_state, "session", None) is None:
+        _worker_state.session = create_session()
+        # Retrieve input name dynamically
+        _worker_state.input_name = _worker_state.session.get_inputs()[0].name
+        logger.info(
+            f"Loaded ONNX session ({CLIP_MODEL_VARIANT}"
+            f"{', optimized' if CLIP_MODEL_OPTIMIZED else ''}"
+            f"{', shared weights' if CLIP_SHARED_WEIGHTS else ''}) in "
+            f"{threading.current_thread().name} (input name: {_worker_state.input_name})"
+        )
+    return _worker_state.session, _worker_state.input_name
+
+
+#! Micro-batching configuration
+# Concurrent requests are grouped into one session.run call. A batch is flushed
+# as soon as it holds CLIP_MAX_BATCH_SIZE images or the oldest request has
+# waited CLIP_MAX_BATCH_WAIT_MS, whichever comes first.
+CLIP_MAX_BATCH_SIZE = int(os.getenv("CLIP_MAX_BATCH_SIZE", "16"))
+CLIP_MAX_BATCH_WAIT_MS = float(os.getenv("CLIP_MAX_BATCH_WAIT_MS", "5"))
+
+#! Batch preprocessing constants
+IMAGE_SIZE = 224
+# uint8 -> normalized float32 lookup table: (x / 255 - 0.5) / 0.5 for every
+# possible pixel value, so normalization is a single fused np.take pass
+NORMALIZE_LUT = (np.arange(256, dtype=np.float32) / 255.0 - 0.5) / 0.5
+# Modes that carry a single luminance channel. convert("RGB") would just copy
+# that channel three times, so these are resized once and broadcast instead.
+GRAYSCALE_MODES = ("1", "L", "LA")
 
 
 def preprocess_image(image: Image.Image) -> np.ndarray:
@@ -51,34 +247,344 @@ def preprocess_image(image: Image.Image) -> np.ndarray:
     return img_array
 
 
-def get_image_embedding(image: Image.Image) -> np.ndarray:
+def canonicalize_image(image: Image.Image) -> Image.Image:
     """
-    Generate a normalized embedding vector for a given image.
+    Reduce an image to exactly the pixels the model will see.
+
+    Single-channel images stay in "L", everything else becomes "RGB", and the
+    result is resized to 224x224. Preprocessing a canonical image yields the
+    same model input as preprocessing the original, so its bytes are a stable
+    content key regardless of PNG encoding, metadata or canvas resolution.
+
+    Returns:
+        PIL.Image.Image of size (224, 224) in mode "L" or "RGB"
+    """
+    mode = "L" if image.mode in GRAYSCALE_MODES else "RGB"
+    return image.convert(mode).resize((IMAGE_SIZE, IMAGE_SIZE))
+
+
+def _get_input_buffer(batch_size: int) -> np.ndarray:
+    """
+    Return this worker's contiguous (batch_size, 3, 224, 224) float32 buffer.
+
+    The buffer is allocated once per worker (sized for at least
+    CLIP_MAX_BATCH_SIZE images) and reused across calls; it only grows when
+    a larger batch arrives.
+    """
+    buffer = getattr(_worker_state, "input_buffer", None)
+    if buffer is None or buffer.shape[0] < batch_size:
+        capacity = max(batch_size, CLIP_MAX_BATCH_SIZE)
+        buffer = np.empty((capacity, 3, IMAGE_SIZE, IMAGE_SIZE), dtype=np.float32)
+        _worker_state.input_buffer = buffer
+    return buffer[:batch_size]
+
+
+def _fill_input_slot(image: Image.Image, out: np.ndarray):
+    """
+    Resize and normalize one image directly into a (3, 224, 224) buffer slot.
+    """
+    if image.mode in GRAYSCALE_MODES:
+        # Fast path for single-channel doodles: resize one channel, not three
+        pixels = np.asarray(image.convert("L").resize((IMAGE_SIZE, IMAGE_SIZE)))
+        np.take(NORMALIZE_LUT, pixels, out=out[0], mode="clip")
+        out[1] = out[0]
+        out[2] = out[0]
+    else:
+        pixels = np.asarray(image.convert("RGB").resize((IMAGE_SIZE, IMAGE_SIZE)))
+        # HWC -> CHW happens through the transposed view, no extra copy
+        np.take(NORMALIZE_LUT, pixels.transpose(2, 0, 1), out=out, mode="clip")
+
+
+def preprocess_batch(images: list[Image.Image]) -> np.ndarray:
+    """
+    Convert a list of PIL images into one CLIP input batch.
+
+    Produces the same values as stacking preprocess_image() outputs, but
+    writes every image straight into a reused, contiguous buffer with a
+    single fused normalization pass per image.
+
+    Note:
+        The returned array is a view of the calling worker's buffer and is
+        overwritten by the next call; copy it if it must outlive the batch.
+
+    Returns:
+        np.ndarray of shape (len(images), 3, 224, 224)
+    """
+    batch = _get_input_buffer(len(images))
+    for slot, image in zip(batch, images):
+        _fill_input_slot(image, slot)
+    return batch
+
+
+def get_image_embeddings_timed(
+    images: list[Image.Image],
+) -> tuple[np.ndarray, dict[str, int]]:
+    """
+    Generate normalized embedding vectors for a batch of images in one ONNX call.
 
     Steps:
-        1. Preprocess the image
-        2. Run ONNX inference
-        3. Remove batch dimension
-        4. Convert to float64
-        5. Normalize embedding to unit length (L2 norm = 1)
+        1. Preprocess every image into the worker's batch buffer
+        2. Run a single ONNX inference for the whole batch
+        3. Normalize each embedding to unit length (L2 norm = 1), in place in
+           the float32 output (no float64 copy: halves memory and pickling cost)
+
+    The preprocess and inference durations are returned rather than recorded:
+    this runs on an executor worker, outside the request's context (and, with
+    process workers, outside the process holding the metrics). The awaiting
+    coroutine records them with record_embedding_stages.
 
     Returns:
-        np.ndarray of shape (512,) or None on failure
+        (np.ndarray of shape (len(images), 512), {stage name: nanoseconds})
     """
     try:
-        input_data = preprocess_image(image)
+        session, input_name = get_session()
+        start = time.perf_counter_ns()
+        input_data = preprocess_batch(images)
+        preprocessed = time.perf_counter_ns()
         outputs = session.run(None, {input_name: input_data})
-        embedding = outputs[0]
+        timings = {
+            "preprocess": preprocessed - start,
+            "inference": time.perf_counter_ns() - preprocessed,
+        }
+        embeddings = outputs[0].astype(np.float32, copy=False)
+
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        embeddings /= norms
+        return embeddings, timings
+
+    except Exception as e:
+        raise ClipServiceError(f"Error generating embeddings: {e}")
+
+
+def get_image_embeddings(images: list[Image.Image]) -> np.ndarray:
+    """
+    Generate normalized embedding vectors for a batch of images in one ONNX call.
+
+    Returns:
+        np.ndarray of shape (len(images), 512)
+    """
+    return get_image_embeddings_timed(images)[0]
+
+
+def record_embedding_stages(timings: dict[str, int]):
+    """Record worker-side stage durations in the current request's breakdown."""
+    for name, elapsed_ns in timings.items():
+        observe_stage(name, elapsed_ns)
+
+
+async def get_image_embeddings_async(images: list[Image.Image]) -> np.ndarray:
+    """
+    Embed a batch on the inference executor in one ONNX call, recording its
+    preprocess/inference stages for the calling request.
+
+    Returns:
+        np.ndarray of shape (len(images), 512)
+    """
+    embeddings, timings = await run_in_inference_executor(
+        get_image_embeddings_timed, images
+    )
+    record_embedding_stages(timings)
+    return embeddings
+
+
+def get_image_embedding(image: Image.Image) -> np.ndarray:
+    """
+    Generate a normalized embedding vector for a given image.
+
+    Steps:
+        1. Run a batch-of-1 inference via get_image_embeddings
+        2. Remove batch dimension
+
+    Raises:
+        ClipServiceError: if preprocessing or inference fails
+
+    Returns:
+        np.ndarray of shape (512,)
+    """
+    return get_image_embeddings([image])[0]
+
 
-        if embedding.ndim == 2 and embedding.shape[0] == 1:
-            embedding = embedding[0]
+def _warm_up_worker() -> float:
+    """Load this worker's session and run one dummy inference; returns seconds spent."""
+    start = time.perf_counter()
+    session, input_name = get_session()
+    dummy = np.zeros((1, 3, IMAGE_SIZE, IMAGE_SIZE), dtype=np.float32)
+    session.run(None, {input_name: dummy})
+    return time.perf_counter() - start
 
-        embedding = embedding.astype(np.float64)
-        norm = np.linalg.norm(embedding)
-        if norm > 0:
-            embedding = embedding / norm
 
+async def warm_up() -> list[float]:
+    """
+    Build the ONNX session of every inference worker and run a warm-up inference.
+
+    The jobs are submitted concurrently so each one lands on a different idle
+    worker. Returns the per-worker warm-up time in seconds.
+    """
+    return list(
+        await asyncio.gather(
+            *[
+                run_in_inference_executor(_warm_up_worker)
+                for _ in range(INFERENCE_WORKERS)
+            ]
+        )
+    )
+
+
+class EmbeddingBatcher:
+    """
+    Async queue that gathers concurrent embedding requests into batches.
+
+    Each caller awaits its own future; a background task drains the queue and
+    dispatches one batched inference per flush to the inference executor,
+    keeping up to max_concurrent_batches batches in flight at once.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int,
+        max_wait_ms: float,
+        max_queue_size: int = 0,
+        max_concurrent_batches: int = 1,
+    ):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.max_queue_size = max(0, max_queue_size)
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+        self.total_batches = 0
+        self.total_images = 0
+        self.last_batch_size = 0
+        self.last_batch_latency_ms = 0.0
+        self.max_batch_latency_ms = 0.0
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._worker = loop.create_task(self._run())
+        return self._queue
+
+    async def embed(self, image: Image.Image) -> np.ndarray:
+        """
+        Queue an image for the next batch and wait for its embedding.
+
+        Raises:
+            InferenceQueueFullError: if max_queue_size images are already waiting
+
+        Returns:
+            np.ndarray of shape (512,)
+        """
+        queue = self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            queue.put_nowait((image, future))
+        except asyncio.QueueFull:
+            raise InferenceQueueFullError(
+                f"Embedding queue is full ({queue.qsize()} images waiting)"
+            )
+        embedding, timings = await future
+        # The batch ran in the batcher's task; its stages count for every
+        # request that waited on it
+        record_embedding_stages(timings)
         return embedding
 
-    except Exception as e:
-        raise ClipServiceError(f"Error generating embedding: {e}")
+    async def _collect_batch(self) -> list[tuple[Image.Image, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Wait for a free executor slot first, so requests keep piling up
+            # into the next batch while all workers are busy
+            await self._slots.acquire()
+            batch = await self._collect_batch()
+            # Skip callers that went away while waiting in the queue
+            batch = [(image, future) for image, future in batch if not future.done()]
+            if not batch:
+                self._slots.release()
+                continue
+            loop.create_task(self._process_batch(batch))
+
+    async def _process_batch(self, batch: list[tuple[Image.Image, asyncio.Future]]):
+        start = time.perf_counter()
+        try:
+            embeddings, timings = await run_in_inference_executor(
+                get_image_embeddings_timed, [image for image, _ in batch]
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+            self._record_batch(len(batch), time.perf_counter() - start)
+
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result((embedding, timings))
+
+    def _record_batch(self, size: int, elapsed: float):
+        latency_ms = elapsed * 1000
+        self.total_batches += 1
+        self.total_images += size
+        self.last_batch_size = size
+        self.last_batch_latency_ms = latency_ms
+        self.max_batch_latency_ms = max(self.max_batch_latency_ms, latency_ms)
+        logger.debug(f"CLIP batch: size={size} latency_ms={latency_ms:.1f}")
+
+    def get_stats(self) -> dict:
+        """Return batching counters for monitoring."""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "total_batches": self.total_batches,
+            "total_images": self.total_images,
+            "avg_batch_size": (
+                round(self.total_images / self.total_batches, 2)
+                if self.total_batches
+                else 0.0
+            ),
+            "last_batch_size": self.last_batch_size,
+            "last_batch_latency_ms": round(self.last_batch_latency_ms, 2),
+            "max_batch_latency_ms": round(self.max_batch_latency_ms, 2),
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
+batcher = EmbeddingBatcher(
+    CLIP_MAX_BATCH_SIZE,
+    CLIP_MAX_BATCH_WAIT_MS,
+    max_queue_size=INFERENCE_QUEUE_LIMIT,
+    max_concurrent_batches=INFERENCE_WORKERS,
+)
+
+
+async def get_image_embedding_batched(image: Image.Image) -> np.ndarray:
+    """
+    Generate a normalized embedding through the shared micro-batching queue.
+
+    Returns:
+        np.ndarray of shape (512,)
+    """
+    return await batcher.embed(image)
@@ -0,0 +1,217 @@
+"""
+Purpose:
+    - Keep every embedded photo on local disk, so a collection or the local index
+      can be rebuilt (new quantization, HNSW or collection settings) without
+      downloading and embedding the images again
+    - Vectors: one float32 (capacity, 512) .npy matrix, memory-mapped and grown
+      by doubling; rows are never moved, a re-embedded photo overwrites its row
+    - Manifest: SQLite table mapping photo id -> matrix row, with the Unsplash
+      metadata and the model that produced the vector
+    - Incremental ingestion: split photos into those with a current vector
+      (same URL and model) and those that still need embedding
+
+Usage:
+    from services.embedding_store import EmbeddingStore, MODEL_TAG
+    store = EmbeddingStore(EMBEDDING_STORE_DIR)
+    cached, missing = store.partition(photos, MODEL_TAG)
+    store.add(embedded, MODEL_TAG)          # [(photo, vector), ...]
+    photos, vectors = store.load(MODEL_TAG)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+import numpy as np
+from services.clip_service import CLIP_MODEL_VARIANT, MODEL_PATH
+from utils.logger import logger
+
+#! Store configuration
+BASE_DIR = Path(__file__).resolve().parent.parent
+EMBEDDING_STORE_DIR = Path(
+    os.getenv("EMBEDDING_STORE_DIR", str(BASE_DIR / "data" / "embeddings"))
+)
+# Vectors from a different model (or variant) are treated as missing
+MODEL_TAG = f"{MODEL_PATH.stem}:{CLIP_MODEL_VARIANT}"
+
+VECTOR_SIZE = 512
+INITIAL_CAPACITY = 1024
+# SQLite's default limit on bound parameters per statement
+MAX_SQL_PARAMS = 900
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS photos (
+    id TEXT PRIMARY KEY,
+    row INTEGER NOT NULL UNIQUE,
+    url TEXT NOT NULL,
+    animal_type TEXT NOT NULL,
+    photographer TEXT,
+    model TEXT NOT NULL,
+    embedded_at REAL NOT NULL
+)
+"""
+
+
+def _chunks(items: list, size: int = MAX_SQL_PARAMS) -> Iterable[list]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class EmbeddingStore:
+    """
+    Append/overwrite store of photo embeddings. Thread-safe; vectors are
+    flushed to the matrix before the manifest rows that point at them are
+    committed, so a crash never leaves a manifest row without its vector.
+    """
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.matrix_path = self.directory / "embeddings.npy"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            self.directory / "manifest.sqlite", check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(SCHEMA)
+        self._db.commit()
+
+        if self.matrix_path.exists():
+            self.matrix = np.load(self.matrix_path, mmap_mode="r+")
+        else:
+            self.matrix = self._create_matrix(self.matrix_path, INITIAL_CAPACITY)
+        (self.rows_used,) = self._db.execute(
+            "SELECT COALESCE(MAX(row) + 1, 0) FROM photos"
+        ).fetchone()
+
+    def __len__(self) -> int:
+        (count,) = self._db.execute("SELECT COUNT(*) FROM photos").fetchone()
+        return count
+
+    @staticmethod
+    def _create_matrix(path: Path, capacity: int) -> np.memmap:
+        return np.lib.format.open_memmap(
+            path, mode="w+", dtype=np.float32, shape=(capacity, VECTOR_SIZE)
+        )
+
+    def _ensure_capacity(self, rows: int):
+        """Grow the matrix file (doubling) so it holds at least `rows` rows."""
+        capacity = len(self.matrix)
+        if rows <= capacity:
+            return
+        while capacity < rows:
+            capacity *= 2
+        tmp_path = self.matrix_path.with_suffix(".tmp.npy")
+        grown = self._create_matrix(tmp_path, capacity)
+        grown[: self.rows_used] = self.matrix[: self.rows_used]
+        grown.flush()
+        del self.matrix
+        os.replace(tmp_path, self.matrix_path)
+        self.matrix = np.load(self.matrix_path, mmap_mode="r+")
+
+    def _existing(self, photo_ids: list[str]) -> dict[str, tuple[int, str, str]]:
+        """photo id -> (row, url, model) for the ids already in the manifest."""
+        found = {}
+        for chunk in _chunks(photo_ids):
+            placeholders = ",".join("?" * len(chunk))
+            for photo_id, row, url, model in self._db.execute(
+                f"SELECT id, row, url, model FROM photos WHERE id IN ({placeholders})",
+                chunk,
+            ):
+                found[photo_id] = (row, url, model)
+        return found
+
+    def partition(
+        self, photos: list[dict], model: str = MODEL_TAG
+    ) -> tuple[list[tuple[dict, np.ndarray]], list[dict]]:
+        """
+        Split photos into (photo, stored vector) pairs that are still current
+        (same URL, same model) and photos that need to be downloaded and embedded.
+        """
+        with self._lock:
+            existing = self._existing([photo["id"] for photo in photos])
+            cached, missing = [], []
+            for photo in photos:
+                entry = existing.get(photo["id"])
+                if entry and entry[1] == photo["url"] and entry[2] == model:
+                    cached.append((photo, np.array(self.matrix[entry[0]])))
+                else:
+                    missing.append(photo)
+        return cached, missing
+
+    def add(self, embedded: list[tuple[dict, np.ndarray]], model: str = MODEL_TAG):
+        """Store (photo, vector) pairs, overwriting the rows of known photos."""
+        if not embedded:
+            return
+        with self._lock:
+            existing = self._existing([photo["id"] for photo, _ in embedded])
+            rows = []
+            next_row = self.rows_used
+            for photo, _ in embedded:
+                if photo["id"] in existing:
+                    rows.append(existing[photo["id"]][0])
+                else:
+                    rows.append(next_row)
+                    next_row += 1
+            self._ensure_capacity(next_row)
+
+            self.matrix[rows] = np.stack([vector for _, vector in embedded])
+            self.matrix.flush()
+            now = time.time()
+            self._db.executemany(
+                "INSERT OR REPLACE INTO photos "
+                "(id, row, url, animal_type, photographer, model, embedded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        photo["id"],
+                        row,
+                        photo["url"],
+                        photo["animal_type"],
+                        photo.get("photographer"),
+                        model,
+                        now,
+                    )
+                    for (photo, _), row in zip(embedded, rows)
+                ],
+            )
+            self._db.commit()
+            self.rows_used = next_row
+
+    def load(self, model: str | None = MODEL_TAG) -> tuple[list[dict], np.ndarray]:
+        """
+        Return every stored photo and its vectors, in row order.
+
+        Args:
+            model: Only photos embedded by this model (None for all)
+
+        Returns:
+            (photos shaped like get_unsplash_photos() output, (N, 512) float32).
+            When the rows are contiguous the vectors are a read-only view of
+            the memory-mapped matrix, so nothing is read until it is used.
+        """
+        query = "SELECT id, row, url, animal_type, photographer FROM photos"
+        params: tuple = ()
+        if model is not None:
+            query += " WHERE model = ?"
+            params = (model,)
+        with self._lock:
+            records = self._db.execute(query + " ORDER BY row", params).fetchall()
+            rows = [row for _, row, _, _, _ in records]
+            if rows == list(range(len(rows))):
+                vectors = np.load(self.matrix_path, mmap_mode="r")[: len(rows)]
+            else:
+                vectors = np.asarray(self.matrix[rows])
+        photos = [
+            {"id": i, "url": url, "animal_type": animal, "photographer": by}
+            for i, _, url, animal, by in records
+        ]
+        logger.info(f"Loaded {len(photos)} embeddings from {self.directory}")
+        return photos, vectors
+
+    def close(self):
+        with self._lock:
+            self.matrix.flush()
+            self._db.close()
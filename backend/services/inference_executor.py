@@ -0,0 +1,102 @@
+"""
+Purpose:
+    - Run CPU-bound work (image decoding, preprocessing, ONNX inference) off the asyncio event loop
+    - Use a bounded pool of thread or process workers, each holding its own InferenceSession
+    - Apply backpressure by rejecting new jobs once the queue limit is reached
+    - Expose queue-depth metrics for monitoring
+
+Usage:
+    from services.inference_executor import run_in_inference_executor
+    result = await run_in_inference_executor(fn, *args)
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+from utils.exceptions import InferenceQueueFullError
+
+#! Executor configuration
+# INFERENCE_WORKER_TYPE=thread shares one process; ONNX Runtime releases the GIL
+# during session.run so threads scale well. Use "process" to isolate workers
+# completely (e.g. when decoding large images is GIL-bound).
+INFERENCE_WORKER_TYPE = os.getenv("INFERENCE_WORKER_TYPE", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+# Maximum number of jobs submitted but not yet finished. Beyond this new work is
+# rejected so latency stays bounded instead of growing with the backlog.
+INFERENCE_QUEUE_LIMIT = int(os.getenv("INFERENCE_QUEUE_LIMIT", "64"))
+
+_executor: Executor | None = None
+_in_flight = 0
+_max_in_flight = 0
+_completed = 0
+_rejected = 0
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if INFERENCE_WORKER_TYPE == "process":
+            _executor = ProcessPoolExecutor(
+                max_workers=INFERENCE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            _executor = ThreadPoolExecutor(
+                max_workers=INFERENCE_WORKERS, thread_name_prefix="inference"
+            )
+    return _executor
+
+
+async def run_in_inference_executor(fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run fn(*args) on the inference executor and await its result.
+
+    In process mode fn and args must be picklable (module-level functions,
+    PIL images, numpy arrays, bytes). memoryview arguments are turned into
+    bytes, since they have to be copied to the worker process anyway.
+
+    Raises:
+        InferenceQueueFullError: if INFERENCE_QUEUE_LIMIT jobs are already pending
+    """
+    global _in_flight, _max_in_flight, _completed, _rejected
+
+    if _in_flight >= INFERENCE_QUEUE_LIMIT:
+        _rejected += 1
+        raise InferenceQueueFullError(
+            f"Inference queue is full ({_in_flight}/{INFERENCE_QUEUE_LIMIT} jobs pending)"
+        )
+
+    _in_flight += 1
+    _max_in_flight = max(_max_in_flight, _in_flight)
+    try:
+        if INFERENCE_WORKER_TYPE == "process":
+            args = tuple(bytes(a) if isinstance(a, memoryview) else a for a in args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), fn, *args)
+    finally:
+        _in_flight -= 1
+        _completed += 1
+
+
+def get_queue_metrics() -> dict:
+    """Return queue-depth counters for the inference executor."""
+    return {
+        "worker_type": INFERENCE_WORKER_TYPE,
+        "workers": INFERENCE_WORKERS,
+        "queue_limit": INFERENCE_QUEUE_LIMIT,
+        "in_flight": _in_flight,
+        "queued": max(0, _in_flight - INFERENCE_WORKERS),
+        "max_in_flight": _max_in_flight,
+        "completed": _completed,
+        "rejected": _rejected,
+    }
+
+
+def shutdown_inference_executor():
+    """Stop the worker pool, waiting for running jobs to finish."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
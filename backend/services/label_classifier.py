@@ -0,0 +1,129 @@
+"""
+Purpose:
+    - Zero-shot "which animal is this doodle" prediction from the image embedding
+      the search already computed: one (44, 512) x (512,) matmul, no extra model call
+    - The label matrix holds CLIP text embeddings of every entry in
+      constants/animals_list.ANIMALS, precomputed offline by
+      scripts/build_label_embeddings.py and loaded once at startup
+    - Turn the prediction into an animal_type filter that narrows the search space
+
+Usage:
+    from services.label_classifier import predict_animal_types, animal_types_for_filter
+    predictions = predict_animal_types(embedding, top_k=3)   # [(label, probability)]
+    animal_types = animal_types_for_filter(predictions)      # None if not confident
+
+The classifier is optional: without the label file every function degrades to
+"no prediction" and searches run unfiltered. Building the file needs the
+optional "tooling" dependency group (poetry install --with tooling); serving
+it does not.
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+import numpy as np
+from constants.animals_list import ANIMALS
+from services.clip_service import MODEL_DIR
+from utils.logger import logger
+
+#! Label matrix location and prediction settings
+LABEL_EMBEDDINGS_PATH = Path(
+    os.getenv("LABEL_EMBEDDINGS_PATH", str(MODEL_DIR / "animal_label_embeddings.npz"))
+)
+# CLIP's learned temperature (logit_scale.exp() of ViT-B/32)
+LOGIT_SCALE = 100.0
+# Filter on the smallest set of top predictions whose probability mass reaches
+# this, capped at CLASSIFIER_MAX_TYPES labels
+CLASSIFIER_MIN_MASS = float(os.getenv("CLASSIFIER_MIN_MASS", "0.8"))
+CLASSIFIER_MAX_TYPES = int(os.getenv("CLASSIFIER_MAX_TYPES", "5"))
+
+_labels: List[str] = []
+_matrix: Optional[np.ndarray] = None
+_load_lock = threading.Lock()
+_loaded = False
+
+
+def load_label_embeddings(path: Path = LABEL_EMBEDDINGS_PATH) -> bool:
+    """
+    Load the precomputed label matrix (idempotent).
+
+    Returns:
+        True if the classifier is available
+    """
+    global _labels, _matrix, _loaded
+    with _load_lock:
+        if _loaded:
+            return _matrix is not None
+        _loaded = True
+        if not path.exists():
+            logger.warning(
+                f"Label embeddings not found at {path}; animal prediction disabled "
+                "(build them with scripts/build_label_embeddings.py)"
+            )
+            return False
+
+        with np.load(path) as data:
+            labels = [str(label) for label in data["labels"]]
+            matrix = np.ascontiguousarray(data["embeddings"], dtype=np.float32)
+        if matrix.shape != (len(labels), 512):
+            logger.error(f"Label embeddings have unexpected shape {matrix.shape}")
+            return False
+        missing = set(ANIMALS) - set(labels)
+        if missing:
+            logger.warning(f"Label embeddings missing animals: {sorted(missing)}")
+
+        _labels, _matrix = labels, matrix
+        logger.info(f"Loaded {len(labels)} animal label embeddings from {path}")
+        return True
+
+
+def is_available() -> bool:
+    return load_label_embeddings()
+
+
+def predict_animal_types(
+    embedding: np.ndarray, top_k: int = 3
+) -> List[Tuple[str, float]]:
+    """
+    Rank animal labels for an image embedding.
+
+    Args:
+        embedding: L2-normalized CLIP image embedding
+        top_k: Number of labels to return
+
+    Returns:
+        [(label, probability)] sorted by probability, empty if unavailable
+    """
+    if not is_available():
+        return []
+
+    logits = LOGIT_SCALE * (_matrix @ np.asarray(embedding, dtype=np.float32))
+    logits -= logits.max()
+    probabilities = np.exp(logits)
+    probabilities /= probabilities.sum()
+
+    k = min(top_k, len(_labels))
+    top = np.argpartition(-probabilities, k - 1)[:k]
+    top = top[np.argsort(-probabilities[top])]
+    return [(_labels[i], float(probabilities[i])) for i in top]
+
+
+def animal_types_for_filter(
+    predictions: List[Tuple[str, float]],
+    min_mass: float = CLASSIFIER_MIN_MASS,
+    max_types: int = CLASSIFIER_MAX_TYPES,
+) -> Optional[List[str]]:
+    """
+    Pick the labels to filter on: the top predictions until min_mass is covered.
+
+    Returns None (search everything) when the top max_types labels together
+    stay below min_mass, i.e. the doodle is too ambiguous to narrow down.
+    """
+    selected, mass = [], 0.0
+    for label, probability in predictions[:max_types]:
+        selected.append(label)
+        mass += probability
+        if mass >= min_mass:
+            return sorted(selected)
+    return None
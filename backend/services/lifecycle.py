@@ -0,0 +1,85 @@
+"""
+Purpose:
+    - Warm up heavy dependencies (ONNX sessions, search backend) after the app starts
+    - Track readiness separately from liveness, so /api/health answers immediately
+      while /api/ready reports 503 until warm-up has finished
+    - Record a startup timing breakdown
+
+Usage:
+    from services.lifecycle import warm_up, get_readiness
+    task = asyncio.create_task(warm_up())   # from the FastAPI lifespan
+"""
+
+import asyncio
+import time
+from services import clip_service, label_classifier, search_service
+from utils.logger import logger
+
+_components = {"clip_model": False, "search_backend": False}
+_errors: dict[str, str] = {}
+_startup_timings_ms: dict[str, float] = {}
+
+
+async def _warm_up_clip():
+    stage_start = time.perf_counter()
+    try:
+        worker_times = await clip_service.warm_up()
+        _components["clip_model"] = True
+        _startup_timings_ms["clip_worker_max"] = max(worker_times) * 1000
+    except Exception as e:
+        _errors["clip_model"] = str(e)
+        logger.error(f"CLIP warm-up failed: {e}", exc_info=True)
+    _startup_timings_ms["clip_model"] = (time.perf_counter() - stage_start) * 1000
+
+
+async def _warm_up_search_backend():
+    stage_start = time.perf_counter()
+    try:
+        await search_service.init_search_backend()
+        _components["search_backend"] = True
+    except Exception as e:
+        _errors["search_backend"] = str(e)
+        logger.error(f"Search backend warm-up failed: {e}", exc_info=True)
+    _startup_timings_ms["search_backend"] = (time.perf_counter() - stage_start) * 1000
+
+
+async def _warm_up_label_classifier():
+    # Optional: a missing label file only disables animal prediction
+    stage_start = time.perf_counter()
+    try:
+        await asyncio.to_thread(label_classifier.load_label_embeddings)
+    except Exception as e:
+        logger.error(f"Label classifier warm-up failed: {e}", exc_info=True)
+    _startup_timings_ms["label_classifier"] = (time.perf_counter() - stage_start) * 1000
+
+
+async def warm_up():
+    """
+    Load the CLIP sessions and the search backend concurrently, then mark the app ready.
+
+    Failures are logged and reported through get_readiness(); the app keeps
+    serving liveness checks so the orchestrator can decide what to do.
+    """
+    started = time.perf_counter()
+    await asyncio.gather(
+        _warm_up_clip(), _warm_up_search_backend(), _warm_up_label_classifier()
+    )
+    _startup_timings_ms["total"] = (time.perf_counter() - started) * 1000
+    logger.info(
+        "Warm-up finished: "
+        + ", ".join(f"{k}={v:.0f}ms" for k, v in _startup_timings_ms.items())
+    )
+
+
+def is_ready() -> bool:
+    return all(_components.values())
+
+
+def get_readiness() -> dict:
+    """Return readiness per component, errors and startup timings."""
+    return {
+        "ready": is_ready(),
+        "components": dict(_components),
+        "errors": dict(_errors),
+        "startup_timings_ms": {k: round(v, 1) for k, v in _startup_timings_ms.items()},
+    }
@@ -0,0 +1,376 @@
+"""
+Purpose:
+    - Keep an in-memory copy of the animal_photos collection for local similarity search
+    - Answer top-k queries with one vectorized matmul plus argpartition (exact mode)
+    - Store vectors as float32, float16 (half the memory) or int8 with a per-row
+      scale (a quarter), see utils/vectors.py
+    - Optionally use an IVF (inverted file) index to probe only a few clusters on larger corpora
+    - Restrict queries to a set of animal types, or return the best match per animal type
+    - Load from Qdrant (scroll) or from an on-disk snapshot, and resync on demand
+
+Usage:
+    from services.local_index import LocalVectorIndex
+    index = LocalVectorIndex(dtype="float32", mode="exact")
+    index.load_from_qdrant(get_client(), COLLECTION_NAME)
+    results = index.search(embedding, limit=3)
+    results = index.search(embedding, limit=3, animal_types=["cats", "dogs"])
+    best_per_animal = index.search_grouped(embedding, limit=5)
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Sequence, Tuple
+import numpy as np
+from utils.logger import logger
+from utils.vectors import EMBEDDING_DTYPES, quantize_int8
+
+if TYPE_CHECKING:
+    from qdrant_client import QdrantClient
+
+# Rows converted to float32 at a time when scoring a float16 matrix, so the
+# temporary stays small regardless of corpus size
+SCORE_CHUNK_ROWS = 4096
+
+
+class LocalVectorIndex:
+    """
+    In-memory vector index returning (photo_url, score, animal_type, photographer) tuples.
+
+    Vectors are stored L2-normalized, so the dot product equals the cosine
+    similarity Qdrant reports for a COSINE collection.
+    """
+
+    def __init__(
+        self,
+        dtype: str = "float32",
+        mode: str = "exact",
+        nlist: int = 0,
+        nprobe: int = 8,
+    ):
+        if dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"Unsupported index dtype: {dtype}")
+        if mode not in ("exact", "ivf"):
+            raise ValueError(f"Unsupported index mode: {mode}")
+
+        self.dtype = np.dtype(dtype)
+        self.mode = mode
+        self.nlist = nlist
+        self.nprobe = nprobe
+
+        self._lock = threading.Lock()
+        self.ids: list[str] = []
+        self.payloads: list[tuple[str, str, str]] = []
+        self.matrix = np.empty((0, 0), dtype=self.dtype)
+        # Per-row dequantization scales of an int8 matrix (None otherwise)
+        self.scales: np.ndarray | None = None
+        self.centroids: np.ndarray | None = None
+        self.inverted_lists: list[np.ndarray] = []
+        # animal_type -> row indices; the in-memory counterpart of the Qdrant
+        # keyword payload index
+        self.animal_rows: dict[str, np.ndarray] = {}
+        self.loaded_at: float | None = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def build(self, ids: list[str], vectors: np.ndarray, payloads: list[dict]):
+        """
+        Replace the index contents with the given points.
+
+        Args:
+            ids: Point ids
+            vectors: Array of shape (N, D)
+            payloads: Qdrant payload dict for each point
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(vectors):
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            vectors = vectors / norms
+
+        rows = [
+            (
+                payload.get("photo_url", ""),
+                payload.get("animal_type", "unknown"),
+                payload.get("photographer", "unknown"),
+            )
+            for payload in payloads
+        ]
+
+        centroids, inverted_lists = None, []
+        if self.mode == "ivf" and len(vectors):
+            centroids, inverted_lists = self._build_ivf(vectors)
+
+        animal_types = np.array([row[1] for row in rows], dtype=object)
+        animal_rows = {
+            animal_type: np.flatnonzero(animal_types == animal_type)
+            for animal_type in set(animal_types)
+        }
+
+        # Swap everything in at once so concurrent searches see a consistent index
+        with self._lock:
+            self.ids = list(ids)
+            self.payloads = rows
+            self.matrix, self.scales = self._encode(vectors)
+            self.centroids = centroids
+            self.inverted_lists = inverted_lists
+            self.animal_rows = animal_rows
+            self.loaded_at = time.time()
+
+        logger.info(
+            f"Local index built: {len(self.ids)} points, dtype={self.dtype}, "
+            f"mode={self.mode}, {self.matrix.nbytes / 1024 / 1024:.1f} MB"
+        )
+
+    def _build_ivf(
+        self, vectors: np.ndarray, iterations: int = 10
+    ) -> tuple[np.ndarray, list[np.ndarray]]:
+        """Cluster vectors with spherical k-means and bucket them by centroid."""
+        n = len(vectors)
+        nlist = self.nlist or max(1, int(np.sqrt(n)))
+        nlist = min(nlist, n)
+
+        rng = np.random.default_rng(0)
+        centroids = vectors[rng.choice(n, nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = vectors[assignments == c]
+                if len(members):
+                    centroid = members.mean(axis=0)
+                    centroids[c] = centroid / (np.linalg.norm(centroid) or 1.0)
+
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        inverted_lists = [np.flatnonzero(assignments == c) for c in range(nlist)]
+        return centroids, inverted_lists
+
+    def _encode(self, vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray | None]:
+        if self.dtype == np.int8:
+            codes, scales = quantize_int8(vectors)
+            return np.ascontiguousarray(codes), scales
+        return np.ascontiguousarray(vectors, dtype=self.dtype), None
+
+    def _score(
+        self,
+        matrix: np.ndarray,
+        scales: np.ndarray | None,
+        query: np.ndarray,
+        rows: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """Cosine scores of `query` against all rows, or only the given rows."""
+        if rows is not None:
+            matrix = matrix[rows]
+            scales = scales[rows] if scales is not None else None
+        if matrix.dtype == np.float32:
+            return matrix @ query
+        scores = np.empty(len(matrix), dtype=np.float32)
+        for start in range(0, len(matrix), SCORE_CHUNK_ROWS):
+            chunk = matrix[start : start + SCORE_CHUNK_ROWS].astype(np.float32)
+            scores[start : start + SCORE_CHUNK_ROWS] = chunk @ query
+        if scales is not None:
+            scores *= scales
+        return scores
+
+    def _allowed_rows(self, animal_types: Sequence[str]) -> np.ndarray:
+        with self._lock:
+            animal_rows = self.animal_rows
+        rows = [animal_rows[t] for t in animal_types if t in animal_rows]
+        if not rows:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(np.concatenate(rows))
+
+    @staticmethod
+    def _normalize_query(embedding: np.ndarray) -> np.ndarray:
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        return query / norm if norm > 0 else query
+
+    def search(
+        self,
+        embedding: np.ndarray,
+        limit: int = 3,
+        animal_types: Sequence[str] | None = None,
+    ) -> List[Tuple[str, float, str, str]]:
+        """
+        Return the top `limit` points by cosine similarity.
+
+        Args:
+            animal_types: Only consider points with one of these animal types.
+                Filtered queries are scored exactly over the matching rows.
+
+        Returns:
+            List of (photo_url, similarity_score, animal_type, photographer) tuples
+        """
+        with self._lock:
+            matrix, scales, payloads = self.matrix, self.scales, self.payloads
+            centroids, inverted_lists = self.centroids, self.inverted_lists
+
+        if not len(payloads):
+            return []
+
+        query = self._normalize_query(embedding)
+
+        if animal_types is not None:
+            candidates = self._allowed_rows(animal_types)
+            scores = self._score(matrix, scales, query, rows=candidates)
+        elif centroids is not None:
+            nprobe = min(self.nprobe, len(centroids))
+            probe = np.argpartition(-(centroids @ query), nprobe - 1)[:nprobe]
+            candidates = np.concatenate([inverted_lists[c] for c in probe])
+            scores = self._score(matrix, scales, query, rows=candidates)
+        else:
+            candidates = None
+            scores = self._score(matrix, scales, query)
+
+        k = min(limit, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        rows = candidates[top] if candidates is not None else top
+
+        return [
+            (payloads[row][0], float(scores[i]), payloads[row][1], payloads[row][2])
+            for row, i in zip(rows, top)
+        ]
+
+    def search_grouped(
+        self,
+        embedding: np.ndarray,
+        limit: int = 3,
+        animal_types: Sequence[str] | None = None,
+    ) -> List[Tuple[str, float, str, str]]:
+        """
+        Return the best match for each of the top `limit` animal types.
+
+        One exact scoring pass over the (optionally filtered) rows, then a
+        per-type argmax, so results never repeat an animal type.
+        """
+        with self._lock:
+            matrix, scales = self.matrix, self.scales
+            payloads, animal_rows = self.payloads, self.animal_rows
+
+        if not len(payloads):
+            return []
+
+        scores = self._score(matrix, scales, self._normalize_query(embedding))
+        types = animal_rows if animal_types is None else animal_types
+        best = []
+        for animal_type in types:
+            rows = animal_rows.get(animal_type)
+            if rows is None or not len(rows):
+                continue
+            row = rows[np.argmax(scores[rows])]
+            best.append((float(scores[row]), row))
+        best.sort(reverse=True)
+
+        return [
+            (payloads[row][0], score, payloads[row][1], payloads[row][2])
+            for score, row in best[:limit]
+        ]
+
+    def search_batch(
+        self,
+        embeddings: np.ndarray,
+        limit: int = 3,
+        animal_types: Sequence[str] | None = None,
+    ) -> List[List[Tuple[str, float, str, str]]]:
+        """
+        Return the top `limit` points for each query embedding.
+
+        Exact mode scores every query with a single (N, D) x (D, Q) matmul.
+        """
+        with self._lock:
+            matrix, payloads, centroids = self.matrix, self.payloads, self.centroids
+
+        if (
+            animal_types is not None
+            or centroids is not None
+            or matrix.dtype != np.float32
+            or not len(payloads)
+        ):
+            return [
+                self.search(embedding, limit=limit, animal_types=animal_types)
+                for embedding in embeddings
+            ]
+
+        queries = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        scores = matrix @ (queries / norms).T
+
+        k = min(limit, len(payloads))
+        top = np.argpartition(-scores, k - 1, axis=0)[:k]
+        results = []
+        for q in range(scores.shape[1]):
+            rows = top[np.argsort(-scores[top[:, q], q]), q]
+            results.append(
+                [
+                    (
+                        payloads[r][0],
+                        float(scores[r, q]),
+                        payloads[r][1],
+                        payloads[r][2],
+                    )
+                    for r in rows
+                ]
+            )
+        return results
+
+    def load_from_qdrant(
+        self, client: QdrantClient, collection_name: str, batch_size: int = 1000
+    ):
+        """Scroll the whole collection (vectors and payloads) and rebuild the index."""
+        ids, vectors, payloads = [], [], []
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            for point in points:
+                ids.append(str(point.id))
+                vectors.append(point.vector)
+                payloads.append(point.payload or {})
+            if offset is None:
+                break
+
+        self.build(
+            ids, np.array(vectors, dtype=np.float32).reshape(len(ids), -1), payloads
+        )
+
+    def save_snapshot(self, path: str | Path):
+        """Write the index contents to an .npz file at exactly this path."""
+        with self._lock:
+            ids, payloads, matrix = self.ids, self.payloads, self.matrix
+        # Through a file handle: given a path, np.savez appends ".npz" when it
+        # is missing, and load_snapshot(path) would not find the file
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                matrix=matrix,
+                ids=np.array(ids, dtype=str),
+                payloads=np.array(json.dumps(payloads)),
+            )
+        logger.info(f"Saved local index snapshot ({len(ids)} points) to {path}")
+
+    def load_snapshot(self, path: str | Path):
+        """Rebuild the index from an .npz file written by save_snapshot."""
+        with np.load(path) as data:
+            ids = data["ids"].tolist()
+            rows = json.loads(str(data["payloads"]))
+            # An int8 matrix is stored without its scales: build() re-normalizes
+            # and re-quantizes the rows, which reproduces the same codes
+            matrix = data["matrix"]
+        payloads = [
+            {"photo_url": url, "animal_type": animal, "photographer": photographer}
+            for url, animal, photographer in rows
+        ]
+        self.build(ids, matrix, payloads)
@@ -0,0 +1,246 @@
+"""
+Purpose:
+    - Per-stage latency timers (perf_counter_ns) for the search hot path
+    - Prometheus histograms, counters and scrape-time gauges rendered in the
+      text exposition format for GET /metrics (no prometheus_client dependency)
+    - Per-request stage breakdown, exposed by the middleware as a Server-Timing
+      header and by the search endpoints as timings_ms
+    - Error counters by exception class
+
+Usage:
+    from services.metrics import stage, record_error
+    with stage("decode"):
+        image = decode(payload)
+
+    # main.py
+    app.middleware("http")(timing_middleware)
+
+Notes:
+    The request breakdown lives in a ContextVar, which executor workers and the
+    micro-batcher's task do not share with the request. Code running there
+    (preprocess/inference in clip_service) returns its durations instead, and
+    the awaiting request records them with observe_stage on the event loop;
+    a micro-batch's stages count once for every request in it.
+"""
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+#! Metrics configuration
+SERVER_TIMING_HEADER = os.getenv("SERVER_TIMING_HEADER", "1") == "1"
+
+# Seconds; dense below 100 ms where the search stages live
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.075,
+    0.1, 0.15, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)  # fmt: skip
+
+# Seconds; how old cached search results are when served
+STALENESS_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    """Thread-safe Prometheus histogram with one series per label set."""
+
+    def __init__(
+        self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [per-bucket counts..., +Inf count, sum]
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                bucket = _format_labels(labels, 'le="%s"' % bound)
+                yield f"{self.name}_bucket{bucket} {cumulative}"
+            cumulative += series[len(self.buckets)]
+            bucket = _format_labels(labels, 'le="+Inf"')
+            yield f"{self.name}_bucket{bucket} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(labels)} {series[-1]}"
+            yield f"{self.name}_count{_format_labels(labels)} {cumulative}"
+
+
+class Counter:
+    """Thread-safe Prometheus counter with one series per label set."""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._series: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            snapshot = dict(self._series)
+        for labels, value in sorted(snapshot.items()):
+            yield f"{self.name}{_format_labels(labels)} {value}"
+
+
+stage_duration = Histogram(
+    "doodlematcher_stage_duration_seconds", "Time spent per search pipeline stage"
+)
+request_duration = Histogram(
+    "doodlematcher_request_duration_seconds", "End-to-end HTTP request latency"
+)
+errors_total = Counter(
+    "doodlematcher_errors_total", "Request-path errors by exception class"
+)
+semantic_cache_hit_age = Histogram(
+    "doodlematcher_semantic_cache_hit_age_seconds",
+    "Age of semantic cache entries when served (result staleness)",
+    buckets=STALENESS_BUCKETS,
+)
+semantic_cache_invalidations = Counter(
+    "doodlematcher_semantic_cache_invalidations_total",
+    "Semantic cache invalidations by reason",
+)
+coalesced_requests = Counter(
+    "doodlematcher_coalesced_requests_total",
+    "Requests answered by joining an identical in-flight request",
+)
+admission_rejections = Counter(
+    "doodlematcher_admission_rejections_total",
+    "Searches shed by admission control by reason",
+)
+degraded_responses = Counter(
+    "doodlematcher_degraded_responses_total",
+    "Searches answered in degraded mode under load by mode",
+)
+
+# name -> (help, callback returning the current value); read at scrape time
+_gauges: Dict[str, Tuple[str, Callable[[], float]]] = {}
+
+# Stage durations (ns) of the request being handled; set by timing_middleware
+_request_stages: ContextVar[Optional[Dict[str, int]]] = ContextVar(
+    "request_stages", default=None
+)
+
+
+def register_gauge(name: str, help_text: str, callback: Callable[[], float]):
+    """Expose a value computed at scrape time, e.g. a queue depth."""
+    _gauges[name] = (help_text, callback)
+
+
+def observe_stage(name: str, elapsed_ns: int):
+    """Record a stage duration in the histogram and the current request breakdown."""
+    stage_duration.observe(elapsed_ns / 1e9, stage=name)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages[name] = stages.get(name, 0) + elapsed_ns
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as one pipeline stage."""
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter_ns() - start)
+
+
+def record_error(error: BaseException):
+    errors_total.inc(exception=type(error).__name__)
+
+
+def current_timings_ms() -> Dict[str, float]:
+    """Stage breakdown of the current request so far, in milliseconds."""
+    stages = _request_stages.get() or {}
+    return {name: round(ns / 1e6, 2) for name, ns in stages.items()}
+
+
+def render_metrics() -> str:
+    """Render every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in (
+        stage_duration,
+        request_duration,
+        errors_total,
+        semantic_cache_hit_age,
+        semantic_cache_invalidations,
+        coalesced_requests,
+        admission_rejections,
+        degraded_responses,
+    ):
+        lines.extend(metric.render())
+    for name, (help_text, callback) in sorted(_gauges.items()):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {float(callback())}")
+    return "\n".join(lines) + "\n"
+
+
+async def timing_middleware(request, call_next):
+    """
+    Collect the stage breakdown of each request, record its total latency and
+    attach a Server-Timing header (visible in browser devtools).
+    """
+    stages: Dict[str, int] = {}
+    token = _request_stages.set(stages)
+    start = time.perf_counter_ns()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    except Exception as e:
+        record_error(e)
+        raise
+    finally:
+        elapsed_ns = time.perf_counter_ns() - start
+        route = request.scope.get("route")
+        request_duration.observe(
+            elapsed_ns / 1e9,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status_code),
+        )
+        _request_stages.reset(token)
+
+    if SERVER_TIMING_HEADER:
+        entries = [f"{name};dur={ns / 1e6:.2f}" for name, ns in stages.items()]
+        entries.append(f"total;dur={elapsed_ns / 1e6:.2f}")
+        response.headers["Server-Timing"] = ", ".join(entries)
+        # Lets the cross-origin frontend read the entries (devtools, PerformanceAPI)
+        response.headers["Timing-Allow-Origin"] = "*"
+    return response
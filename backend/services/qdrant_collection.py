@@ -0,0 +1,242 @@
+"""
+Purpose:
+    - Declare how the animal_photos collection is provisioned: vector storage,
+      HNSW graph parameters, quantization and payload indexes
+    - Create the collection with these settings, or migrate an existing one in place
+    - Provide the search-time parameters (hnsw_ef, quantized search with rescoring)
+      that match the provisioned collection
+
+Usage:
+    from services.qdrant_collection import provision_collection, migrate_collection
+    provision_collection(get_client(), COLLECTION_NAME)
+    changes = migrate_collection(get_client(), COLLECTION_NAME, dry_run=True)
+
+    # Per-query parameters
+    client.search(..., search_params=search_params())
+
+Notes:
+    - int8 scalar quantization keeps a 4x smaller copy of every vector in RAM and
+      searches it first; the top `limit * oversampling` candidates are then
+      rescored against the original float32 vectors, so rankings stay exact
+      enough for top-3 while memory and latency drop as the corpus grows
+    - pq (product quantization, x16) trades more accuracy for a much smaller
+      footprint; only worth it for very large collections
+    - With QDRANT_VECTORS_ON_DISK=1 the original vectors are memory-mapped and
+      only touched during rescoring
+"""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+from utils.exceptions import QdrantServiceError
+from utils.logger import logger
+
+if TYPE_CHECKING:
+    from qdrant_client import QdrantClient, models
+
+
+#! Collection provisioning settings
+VECTOR_SIZE = 512
+QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "int8")  # int8 | pq | none
+QDRANT_QUANTILE = float(os.getenv("QDRANT_QUANTILE", "0.99"))
+QDRANT_QUANTIZATION_ALWAYS_RAM = os.getenv("QDRANT_QUANTIZATION_ALWAYS_RAM", "1") == "1"
+QDRANT_VECTORS_ON_DISK = os.getenv("QDRANT_VECTORS_ON_DISK", "0") == "1"
+QDRANT_HNSW_M = int(os.getenv("QDRANT_HNSW_M", "16"))
+QDRANT_HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "128"))
+
+#! Search-time settings
+QDRANT_SEARCH_EF = int(os.getenv("QDRANT_SEARCH_EF", "64"))
+QDRANT_RESCORE = os.getenv("QDRANT_RESCORE", "1") == "1"
+QDRANT_OVERSAMPLING = float(os.getenv("QDRANT_OVERSAMPLING", "2.0"))
+
+# Payload fields that get an index; animal_type drives filtered search, and
+# ingested_at (set on every upsert) lets the server find the latest write
+PAYLOAD_INDEXES = {"animal_type": "keyword", "ingested_at": "float"}
+
+if QDRANT_QUANTIZATION not in ("int8", "pq", "none"):
+    raise ValueError(f"Unknown QDRANT_QUANTIZATION: {QDRANT_QUANTIZATION}")
+
+_search_params: models.SearchParams | None = None
+
+
+def vectors_config() -> models.VectorParams:
+    from qdrant_client import models
+
+    return models.VectorParams(
+        size=VECTOR_SIZE,
+        distance=models.Distance.COSINE,
+        on_disk=QDRANT_VECTORS_ON_DISK,
+    )
+
+
+def hnsw_config() -> models.HnswConfigDiff:
+    from qdrant_client import models
+
+    return models.HnswConfigDiff(m=QDRANT_HNSW_M, ef_construct=QDRANT_HNSW_EF_CONSTRUCT)
+
+
+def quantization_config():
+    """Return the quantization config for QDRANT_QUANTIZATION (None = disabled)."""
+    from qdrant_client import models
+
+    if QDRANT_QUANTIZATION == "int8":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=QDRANT_QUANTILE,
+                always_ram=QDRANT_QUANTIZATION_ALWAYS_RAM,
+            )
+        )
+    if QDRANT_QUANTIZATION == "pq":
+        return models.ProductQuantization(
+            product=models.ProductQuantizationConfig(
+                compression=models.CompressionRatio.X16,
+                always_ram=QDRANT_QUANTIZATION_ALWAYS_RAM,
+            )
+        )
+    return None
+
+
+def search_params() -> models.SearchParams:
+    """Per-query parameters matching the provisioned collection (built once)."""
+    global _search_params
+    if _search_params is None:
+        from qdrant_client import models
+
+        quantization = None
+        if QDRANT_QUANTIZATION != "none":
+            quantization = models.QuantizationSearchParams(
+                rescore=QDRANT_RESCORE, oversampling=QDRANT_OVERSAMPLING
+            )
+        _search_params = models.SearchParams(
+            hnsw_ef=QDRANT_SEARCH_EF, quantization=quantization
+        )
+    return _search_params
+
+
+def _create_payload_indexes(client: QdrantClient, collection_name: str, existing):
+    for field_name, schema in PAYLOAD_INDEXES.items():
+        if field_name in existing:
+            continue
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=schema,
+            wait=True,
+        )
+        logger.info(f"Created {schema} payload index on {collection_name}.{field_name}")
+
+
+def provision_collection(client: QdrantClient, collection_name: str) -> bool:
+    """
+    Create the collection with the declared settings if it does not exist,
+    or add the payload indexes an existing one is missing.
+
+    Returns:
+        True if the collection was created, False if it already existed
+    """
+    try:
+        if client.collection_exists(collection_name):
+            info = client.get_collection(collection_name)
+            _create_payload_indexes(client, collection_name, info.payload_schema or {})
+            return False
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=vectors_config(),
+            hnsw_config=hnsw_config(),
+            quantization_config=quantization_config(),
+        )
+        _create_payload_indexes(client, collection_name, existing={})
+        logger.info(
+            f"Created collection {collection_name} "
+            f"(quantization={QDRANT_QUANTIZATION}, m={QDRANT_HNSW_M}, "
+            f"ef_construct={QDRANT_HNSW_EF_CONSTRUCT})"
+        )
+        return True
+    except Exception as e:
+        raise QdrantServiceError(
+            f"Error provisioning collection {collection_name}: {e}"
+        )
+
+
+def _current_quantization(config) -> str:
+    quantization = config.quantization_config
+    if quantization is None:
+        return "none"
+    if getattr(quantization, "scalar", None) is not None:
+        return "int8"
+    if getattr(quantization, "product", None) is not None:
+        return "pq"
+    return "other"
+
+
+def collection_drift(client: QdrantClient, collection_name: str) -> dict:
+    """
+    Compare an existing collection against the declared settings.
+
+    Returns:
+        {setting: (current, wanted)} for every setting that differs
+    """
+    info = client.get_collection(collection_name)
+    config = info.config
+    current = {
+        "quantization": _current_quantization(config),
+        "hnsw_m": config.hnsw_config.m,
+        "hnsw_ef_construct": config.hnsw_config.ef_construct,
+        "vectors_on_disk": bool(config.params.vectors.on_disk),
+    }
+    wanted = {
+        "quantization": QDRANT_QUANTIZATION,
+        "hnsw_m": QDRANT_HNSW_M,
+        "hnsw_ef_construct": QDRANT_HNSW_EF_CONSTRUCT,
+        "vectors_on_disk": QDRANT_VECTORS_ON_DISK,
+    }
+    drift = {
+        setting: (current[setting], wanted[setting])
+        for setting in wanted
+        if current[setting] != wanted[setting]
+    }
+    for field_name, schema in PAYLOAD_INDEXES.items():
+        if field_name not in (info.payload_schema or {}):
+            drift[f"payload_index:{field_name}"] = (None, schema)
+    return drift
+
+
+def migrate_collection(
+    client: QdrantClient, collection_name: str, dry_run: bool = False
+) -> dict:
+    """
+    Bring an existing collection in line with the declared settings in place.
+
+    Qdrant applies HNSW, quantization and on-disk changes without reinserting
+    points; the optimizer rebuilds segments in the background, and searches
+    keep working against the old segments until it finishes.
+
+    Returns:
+        The drift that was (or, with dry_run, would be) applied
+    """
+    from qdrant_client import models
+
+    try:
+        drift = collection_drift(client, collection_name)
+        if dry_run or not drift:
+            return drift
+
+        quantization = quantization_config()
+        if quantization is None:
+            quantization = models.Disabled.DISABLED
+        client.update_collection(
+            collection_name=collection_name,
+            vectors_config={
+                "": models.VectorParamsDiff(on_disk=QDRANT_VECTORS_ON_DISK)
+            },
+            hnsw_config=hnsw_config(),
+            quantization_config=quantization,
+        )
+        info = client.get_collection(collection_name)
+        _create_payload_indexes(client, collection_name, info.payload_schema or {})
+        logger.info(f"Migrated collection {collection_name}: {drift}")
+        return drift
+    except Exception as e:
+        raise QdrantServiceError(f"Error migrating collection {collection_name}: {e}")
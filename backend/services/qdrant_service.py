@@ -2,24 +2,52 @@
 Purpose:
     - Provide Qdrant client and utility functions for storing and searching image embeddings
     - Handle collection creation and similarity search
+    - Filter searches by animal_type (indexed payload field) or return the best
+      match per animal type with search_groups
     - Centralized service for other scripts to interact with Qdrant
+    - Create the client lazily: qdrant_client is slow to import, so it is only
+      loaded on first use (or during app startup, see services/lifecycle.py)
+    - Serve request-path searches through AsyncQdrantClient (pooled keep-alive
+      HTTP or gRPC) with short per-call timeouts, retries and hedged requests
 
 Usage:
     from services.qdrant_service import (
-        client,
+        get_client,
         COLLECTION_NAME,
         create_collection_if_not_exists,
         search_similar_images
     )
+    results = search_similar_images(embedding, limit=3, animal_types=["cats", "dogs"])
+    best_per_animal = search_similar_images_grouped(embedding, limit=5)
+
+    # Inside async request handlers
+    from services.qdrant_service import search_similar_images_async
+    results = await search_similar_images_async(embedding, limit=3)
 """
 
-from qdrant_client import QdrantClient
+from __future__ import annotations
 
+import asyncio
 import os
-from qdrant_client.models import Distance, VectorParams
+import threading
 import numpy as np
-from typing import List, Tuple
+from typing import (
+    TYPE_CHECKING,
+    Awaitable,
+    Callable,
+    List,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+from services.qdrant_collection import provision_collection, search_params
 from utils.exceptions import QdrantServiceError
+from utils.logger import logger
+
+if TYPE_CHECKING:
+    from qdrant_client import AsyncQdrantClient, QdrantClient, models
+
+T = TypeVar("T")
 
 
 #! Qdrant Client Configuration
@@ -41,20 +69,184 @@ QDRANT_URL = os.getenv("QDRANT_URL")  # Must be set in .env for production
 USE_HTTPS = True  # Railway Qdrant uses HTTPS
 PORT = 443  # Default HTTPS port
 
-# Initialize the Qdrant client
-client = QdrantClient(
-    url=QDRANT_URL,
-    timeout=60,  # * Wait up to 60 seconds for requests, important for Railway to avoid Qdrant creating timeouts
-    https=USE_HTTPS,
-    port=PORT,
-)
+#! Async request-path settings
+# gRPC needs the Qdrant gRPC port exposed (6334 by default, not Railway's 443)
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "0") == "1"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+QDRANT_MAX_CONNECTIONS = int(os.getenv("QDRANT_MAX_CONNECTIONS", "32"))
+# Client-side deadline per search attempt; the old 60s timeout let one stuck
+# call hold a request for a minute
+QDRANT_SEARCH_TIMEOUT_MS = float(os.getenv("QDRANT_SEARCH_TIMEOUT_MS", "2000"))
+QDRANT_SEARCH_RETRIES = int(os.getenv("QDRANT_SEARCH_RETRIES", "2"))
+QDRANT_RETRY_BACKOFF_MS = float(os.getenv("QDRANT_RETRY_BACKOFF_MS", "50"))
+# Send a duplicate request if the first has not answered after this long and
+# use whichever finishes first (0 disables hedging). Set near the p95 latency.
+QDRANT_HEDGE_AFTER_MS = float(os.getenv("QDRANT_HEDGE_AFTER_MS", "0"))
 
 # Collection name for storing animal photo embeddings
 COLLECTION_NAME = "animal_photos"
 
+_client: QdrantClient | None = None
+_client_lock = threading.Lock()
+_async_client: AsyncQdrantClient | None = None
+_hedged_requests = 0
+_retried_requests = 0
+
+
+def get_client() -> QdrantClient:
+    """
+    Return the shared Qdrant client, creating it on first use.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            from qdrant_client import QdrantClient
+
+            # Initialize the Qdrant client
+            _client = QdrantClient(
+                url=QDRANT_URL,
+                timeout=60,  # * Wait up to 60 seconds for requests, important for Railway to avoid Qdrant creating timeouts
+                https=USE_HTTPS,
+                port=PORT,
+            )
+        return _client
+
+
+def get_async_client() -> AsyncQdrantClient:
+    """
+    Return the shared AsyncQdrantClient, creating it on first use.
+
+    Must be called from the event loop that will use it; the underlying
+    keep-alive connection pool is bound to that loop.
+    """
+    global _async_client
+    if _async_client is None:
+        import httpx
+        from qdrant_client import AsyncQdrantClient
+
+        _async_client = AsyncQdrantClient(
+            url=QDRANT_URL,
+            https=USE_HTTPS,
+            port=PORT,
+            grpc_port=QDRANT_GRPC_PORT,
+            prefer_grpc=QDRANT_PREFER_GRPC,
+            timeout=max(1, int(QDRANT_SEARCH_TIMEOUT_MS / 1000)),
+            # The version probe is a blocking call; skip it on the request path
+            check_compatibility=False,
+            limits=httpx.Limits(
+                max_connections=QDRANT_MAX_CONNECTIONS,
+                max_keepalive_connections=QDRANT_MAX_CONNECTIONS,
+                keepalive_expiry=60,
+            ),
+        )
+    return _async_client
+
+
+async def init_async_client():
+    """Import qdrant_client off the event loop (slow), then create the async client."""
+    await asyncio.to_thread(__import__, "qdrant_client")
+    get_async_client()
+
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+
+
+async def _hedged(make_call: Callable[[], Awaitable[T]]) -> T:
+    """
+    Run make_call() with a deadline; if it is still pending after
+    QDRANT_HEDGE_AFTER_MS, start a second copy and return the first success.
+    """
+    global _hedged_requests
+    timeout = QDRANT_SEARCH_TIMEOUT_MS / 1000
+    primary = asyncio.ensure_future(asyncio.wait_for(make_call(), timeout))
+    tasks = [primary]
+    try:
+        if QDRANT_HEDGE_AFTER_MS <= 0:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=QDRANT_HEDGE_AFTER_MS / 1000)
+        if done:
+            return primary.result()
+
+        _hedged_requests += 1
+        hedge = asyncio.ensure_future(asyncio.wait_for(make_call(), timeout))
+        tasks.append(hedge)
+        pending = {primary, hedge}
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        # Also runs when the caller is cancelled mid-wait: asyncio.wait does not
+        # cancel what it waits on, so stop every call still in flight
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def _call_with_retries(make_call: Callable[[], Awaitable[T]]) -> T:
+    """Retry timed-out or failed (possibly hedged) calls with a short backoff."""
+    global _retried_requests
+    for attempt in range(QDRANT_SEARCH_RETRIES + 1):
+        try:
+            return await _hedged(make_call)
+        except Exception as e:
+            if attempt == QDRANT_SEARCH_RETRIES:
+                raise
+            _retried_requests += 1
+            logger.warning(
+                f"Qdrant call failed (attempt {attempt + 1}), retrying: {e!r}"
+            )
+            await asyncio.sleep(QDRANT_RETRY_BACKOFF_MS * (attempt + 1) / 1000)
+
+
+def _to_result_tuples(
+    search_results: List[models.ScoredPoint],
+) -> List[Tuple[str, float, str, str]]:
+    results = []
+    for result in search_results:
+        if result.payload is not None:
+            photo_url = result.payload.get("photo_url", "")
+            animal_type = result.payload.get("animal_type", "unknown")
+            photographer = result.payload.get("photographer", "unknown")
+            similarity_score = result.score
+            results.append((photo_url, similarity_score, animal_type, photographer))
+    return results
+
+
+def _animal_filter(animal_types: Sequence[str] | None) -> models.Filter | None:
+    """Filter on the keyword-indexed animal_type payload field (None = no filter)."""
+    if animal_types is None:
+        return None
+    from qdrant_client import models
+
+    return models.Filter(
+        must=[
+            models.FieldCondition(
+                key="animal_type", match=models.MatchAny(any=list(animal_types))
+            )
+        ]
+    )
+
+
+def _best_per_group(groups_result: models.GroupsResult):
+    return _to_result_tuples([group.hits[0] for group in groups_result.groups])
+
 
 def search_similar_images(
-    embedding: np.ndarray, limit: int = 3
+    embedding: np.ndarray,
+    limit: int = 3,
+    animal_types: Sequence[str] | None = None,
 ) -> List[Tuple[str, float, str, str]]:
     """
     Search for images similar to the given embedding in Qdrant.
@@ -62,54 +254,246 @@ def search_similar_images(
     Args:
         embedding: CLIP embedding vector
         limit: Number of results to return
+        animal_types: Only return photos of these animal types
 
     Returns:
-        List of (photo_url, similarity_score, animal_type) tuples
+        List of (photo_url, similarity_score, animal_type, photographer) tuples
     """
     try:
-        search_results = client.search(
+        search_results = get_client().search(
             collection_name=COLLECTION_NAME,
-            query_vector=embedding.tolist(),
+            query_vector=np.asarray(embedding, dtype=np.float32),
+            query_filter=_animal_filter(animal_types),
             limit=limit,
             with_payload=True,
+            search_params=search_params(),
         )
+        return _to_result_tuples(search_results)
+
+    except Exception as e:
+        raise QdrantServiceError(f"Error searching similar images: {e}")
 
-        results = []
-        for result in search_results:
-            if result.payload is not None:
-                photo_url = result.payload.get("photo_url", "")
-                animal_type = result.payload.get("animal_type", "unknown")
-                photographer = result.payload.get("photographer", "unknown")
-                similarity_score = result.score
-                results.append((photo_url, similarity_score, animal_type, photographer))
 
-        return results
+def search_similar_images_grouped(
+    embedding: np.ndarray,
+    limit: int = 3,
+    animal_types: Sequence[str] | None = None,
+) -> List[Tuple[str, float, str, str]]:
+    """
+    Return the best match for each of the top `limit` animal types in one query.
+
+    Returns:
+        List of (photo_url, similarity_score, animal_type, photographer) tuples,
+        at most one per animal type
+    """
+    try:
+        groups_result = get_client().search_groups(
+            collection_name=COLLECTION_NAME,
+            query_vector=np.asarray(embedding, dtype=np.float32),
+            group_by="animal_type",
+            query_filter=_animal_filter(animal_types),
+            limit=limit,
+            group_size=1,
+            with_payload=True,
+            search_params=search_params(),
+        )
+        return _best_per_group(groups_result)
 
     except Exception as e:
-        raise QdrantServiceError(f"Error searching similar images: {e}")
+        raise QdrantServiceError(f"Error searching similar images by group: {e}")
 
 
-def create_collection_if_not_exists():
+def search_similar_images_batch(
+    embeddings: np.ndarray,
+    limit: int = 3,
+    animal_types: Sequence[str] | None = None,
+) -> List[List[Tuple[str, float, str, str]]]:
     """
-    Create the animal_photos collection if it doesn't exist.
+    Run several similarity searches in a single Qdrant round trip.
+
+    Args:
+        embeddings: Array of shape (N, 512)
+        limit: Number of results to return per query
+        animal_types: Only return photos of these animal types
 
-    Uses 512-D vectors and cosine distance for embeddings.
+    Returns:
+        One list of (photo_url, similarity_score, animal_type, photographer)
+        tuples per input embedding
     """
+    from qdrant_client import models
+
+    query_filter = _animal_filter(animal_types)
     try:
-        collections = client.get_collections()
-        collection_names = [col.name for col in collections.collections]
-
-        if COLLECTION_NAME not in collection_names:
-            client.create_collection(
-                collection_name=COLLECTION_NAME,
-                vectors_config=VectorParams(
-                    size=512,
-                    distance=Distance.COSINE,
-                ),
-            )
-            print(f"Created collection: {COLLECTION_NAME}")
-        else:
-            print(f"Collection {COLLECTION_NAME} already exists")
+        batch_results = get_client().search_batch(
+            collection_name=COLLECTION_NAME,
+            requests=[
+                models.SearchRequest(
+                    vector=embedding.tolist(),
+                    filter=query_filter,
+                    limit=limit,
+                    with_payload=True,
+                    params=search_params(),
+                )
+                for embedding in embeddings
+            ],
+        )
+        return [_to_result_tuples(results) for results in batch_results]
+
+    except Exception as e:
+        raise QdrantServiceError(f"Error batch searching similar images: {e}")
 
+
+async def search_similar_images_async(
+    embedding: np.ndarray,
+    limit: int = 3,
+    animal_types: Sequence[str] | None = None,
+) -> List[Tuple[str, float, str, str]]:
+    """
+    Async version of search_similar_images for request handlers.
+
+    Does not block the event loop; each attempt has a short deadline and is
+    retried (and optionally hedged) on slow or failed responses.
+
+    Returns:
+        List of (photo_url, similarity_score, animal_type, photographer) tuples
+    """
+    vector = np.asarray(embedding, dtype=np.float32)
+    query_filter = _animal_filter(animal_types)
+
+    def make_call():
+        return get_async_client().search(
+            collection_name=COLLECTION_NAME,
+            query_vector=vector,
+            query_filter=query_filter,
+            limit=limit,
+            with_payload=True,
+            search_params=search_params(),
+        )
+
+    try:
+        return _to_result_tuples(await _call_with_retries(make_call))
     except Exception as e:
-        raise QdrantServiceError(f"Error creating collection: {e}")
+        raise QdrantServiceError(f"Error searching similar images: {e!r}")
+
+
+async def search_similar_images_grouped_async(
+    embedding: np.ndarray,
+    limit: int = 3,
+    animal_types: Sequence[str] | None = None,
+) -> List[Tuple[str, float, str, str]]:
+    """Async version of search_similar_images_grouped for request handlers."""
+    vector = np.asarray(embedding, dtype=np.float32)
+    query_filter = _animal_filter(animal_types)
+
+    def make_call():
+        return get_async_client().search_groups(
+            collection_name=COLLECTION_NAME,
+            query_vector=vector,
+            group_by="animal_type",
+            query_filter=query_filter,
+            limit=limit,
+            group_size=1,
+            with_payload=True,
+            search_params=search_params(),
+        )
+
+    try:
+        return _best_per_group(await _call_with_retries(make_call))
+    except Exception as e:
+        raise QdrantServiceError(f"Error searching similar images by group: {e!r}")
+
+
+async def search_similar_images_batch_async(
+    embeddings: np.ndarray,
+    limit: int = 3,
+    animal_types: Sequence[str] | None = None,
+) -> List[List[Tuple[str, float, str, str]]]:
+    """
+    Async version of search_similar_images_batch for request handlers.
+
+    Returns:
+        One list of (photo_url, similarity_score, animal_type, photographer)
+        tuples per input embedding
+    """
+    from qdrant_client import models
+
+    query_filter = _animal_filter(animal_types)
+    requests = [
+        models.SearchRequest(
+            vector=embedding.tolist(),
+            filter=query_filter,
+            limit=limit,
+            with_payload=True,
+            params=search_params(),
+        )
+        for embedding in embeddings
+    ]
+
+    def make_call():
+        return get_async_client().search_batch(
+            collection_name=COLLECTION_NAME, requests=requests
+        )
+
+    try:
+        batch_results = await _call_with_retries(make_call)
+        return [_to_result_tuples(results) for results in batch_results]
+    except Exception as e:
+        raise QdrantServiceError(f"Error batch searching similar images: {e!r}")
+
+
+async def collection_version_async() -> tuple[int, float | None]:
+    """
+    Identify the current contents of the collection.
+
+    Returns:
+        (points count, latest ingested_at payload value): the count moves on
+        deletes, ingested_at on every upsert, including re-upserts of the same
+        ids. The timestamp is None until the ingested_at index exists (see
+        services/qdrant_collection.py).
+    """
+    from qdrant_client import models
+
+    client = get_async_client()
+    try:
+        info = await client.get_collection(COLLECTION_NAME)
+    except Exception as e:
+        raise QdrantServiceError(f"Error reading collection info: {e!r}")
+    if "ingested_at" not in (info.payload_schema or {}):
+        return info.points_count or 0, None
+    try:
+        latest, _ = await client.scroll(
+            collection_name=COLLECTION_NAME,
+            limit=1,
+            order_by=models.OrderBy(key="ingested_at", direction=models.Direction.DESC),
+            with_payload=["ingested_at"],
+            with_vectors=False,
+        )
+    except Exception as e:
+        raise QdrantServiceError(f"Error reading latest ingestion: {e!r}")
+    ingested_at = latest[0].payload.get("ingested_at") if latest else None
+    return info.points_count or 0, ingested_at
+
+
+def get_client_stats() -> dict:
+    """Return async client settings and hedging/retry counters."""
+    return {
+        "transport": "grpc" if QDRANT_PREFER_GRPC else "http",
+        "search_timeout_ms": QDRANT_SEARCH_TIMEOUT_MS,
+        "retries": QDRANT_SEARCH_RETRIES,
+        "hedge_after_ms": QDRANT_HEDGE_AFTER_MS,
+        "hedged_requests": _hedged_requests,
+        "retried_requests": _retried_requests,
+    }
+
+
+def create_collection_if_not_exists():
+    """
+    Create the animal_photos collection if it doesn't exist.
+
+    Uses 512-D vectors and cosine distance for embeddings, with the HNSW,
+    quantization and payload-index settings from services/qdrant_collection.py.
+    """
+    if provision_collection(get_client(), COLLECTION_NAME):
+        print(f"Created collection: {COLLECTION_NAME}")
+    else:
+        print(f"Collection {COLLECTION_NAME} already exists")
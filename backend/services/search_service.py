@@ -0,0 +1,223 @@
+"""
+Purpose:
+    - Single entry point for similarity search, independent of the backend serving it
+    - Route queries to remote Qdrant or to the in-process LocalVectorIndex based on configuration
+    - Provide a refresh/resync path for the local index after the collection is repopulated
+
+Usage:
+    from services.search_service import search_similar_images, refresh_search_index
+    results = search_similar_images(embedding, limit=3)
+    batch_results = search_similar_images_batch(embeddings, limit=3)
+
+    # Inside async request handlers
+    results = await search_similar_images_async(embedding, limit=3)
+    results = await search_similar_images_async(embedding, animal_types=["cats"])
+    best_per_animal = await search_similar_images_async(embedding, grouped=True)
+"""
+
+import asyncio
+import os
+import threading
+from pathlib import Path
+from typing import List, Sequence, Tuple
+import numpy as np
+from services import qdrant_service
+from services.local_index import LocalVectorIndex
+from utils.exceptions import QdrantServiceError
+from utils.logger import logger
+
+#! Search backend configuration
+# SEARCH_BACKEND=qdrant queries the remote collection for every request.
+# SEARCH_BACKEND=local serves queries from an in-memory copy of the collection.
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "qdrant")
+# float32 | float16 | int8
+LOCAL_INDEX_DTYPE = os.getenv("LOCAL_INDEX_DTYPE", "float32")
+LOCAL_INDEX_MODE = os.getenv("LOCAL_INDEX_MODE", "exact")  # exact | ivf
+LOCAL_INDEX_NLIST = int(os.getenv("LOCAL_INDEX_NLIST", "0"))  # 0 = sqrt(N)
+LOCAL_INDEX_NPROBE = int(os.getenv("LOCAL_INDEX_NPROBE", "8"))
+# Optional .npz snapshot: loaded at startup if present, written after each resync
+LOCAL_INDEX_SNAPSHOT = os.getenv("LOCAL_INDEX_SNAPSHOT")
+
+if SEARCH_BACKEND not in ("qdrant", "local"):
+    raise ValueError(f"Unknown SEARCH_BACKEND: {SEARCH_BACKEND}")
+
+local_index = LocalVectorIndex(
+    dtype=LOCAL_INDEX_DTYPE,
+    mode=LOCAL_INDEX_MODE,
+    nlist=LOCAL_INDEX_NLIST,
+    nprobe=LOCAL_INDEX_NPROBE,
+)
+_load_lock = threading.Lock()
+
+
+def refresh_search_index(from_snapshot: bool = False) -> int:
+    """
+    Resync the local index with the Qdrant collection.
+
+    Args:
+        from_snapshot: Load LOCAL_INDEX_SNAPSHOT instead of scrolling Qdrant
+
+    Returns:
+        Number of points in the index
+    """
+    with _load_lock:
+        try:
+            if from_snapshot:
+                local_index.load_snapshot(LOCAL_INDEX_SNAPSHOT)
+            else:
+                local_index.load_from_qdrant(
+                    qdrant_service.get_client(), qdrant_service.COLLECTION_NAME
+                )
+                if LOCAL_INDEX_SNAPSHOT:
+                    local_index.save_snapshot(LOCAL_INDEX_SNAPSHOT)
+        except Exception as e:
+            raise QdrantServiceError(f"Error loading local search index: {e}")
+    return len(local_index)
+
+
+def _ensure_local_index():
+    if local_index.loaded_at is not None:
+        return
+    snapshot_exists = bool(LOCAL_INDEX_SNAPSHOT) and Path(LOCAL_INDEX_SNAPSHOT).exists()
+    count = refresh_search_index(from_snapshot=snapshot_exists)
+    logger.info(f"Local search index ready with {count} points")
+
+
+async def init_search_backend():
+    """Create the async Qdrant client, or load the local index, before first use."""
+    if SEARCH_BACKEND == "local":
+        await asyncio.to_thread(_ensure_local_index)
+    else:
+        await qdrant_service.init_async_client()
+
+
+def search_similar_images(
+    embedding: np.ndarray,
+    limit: int = 3,
+    animal_types: Sequence[str] | None = None,
+) -> List[Tuple[str, float, str, str]]:
+    """
+    Search for images similar to the given embedding using the configured backend.
+
+    Args:
+        animal_types: Only return photos of these animal types (None = all)
+
+    Returns:
+        List of (photo_url, similarity_score, animal_type, photographer) tuples
+    """
+    if SEARCH_BACKEND == "local":
+        _ensure_local_index()
+        return local_index.search(embedding, limit=limit, animal_types=animal_types)
+    return qdrant_service.search_similar_images(
+        embedding, limit=limit, animal_types=animal_types
+    )
+
+
+def search_similar_images_grouped(
+    embedding: np.ndarray,
+    limit: int = 3,
+    animal_types: Sequence[str] | None = None,
+) -> List[Tuple[str, float, str, str]]:
+    """
+    Return the best match for each of the top `limit` animal types.
+
+    Returns:
+        List of (photo_url, similarity_score, animal_type, photographer) tuples,
+        at most one per animal type
+    """
+    if SEARCH_BACKEND == "local":
+        _ensure_local_index()
+        return local_index.search_grouped(
+            embedding, limit=limit, animal_types=animal_types
+        )
+    return qdrant_service.search_similar_images_grouped(
+        embedding, limit=limit, animal_types=animal_types
+    )
+
+
+def search_similar_images_batch(
+    embeddings: np.ndarray,
+    limit: int = 3,
+    animal_types: Sequence[str] | None = None,
+) -> List[List[Tuple[str, float, str, str]]]:
+    """
+    Search for several embeddings at once using the configured backend.
+
+    Returns:
+        One list of (photo_url, similarity_score, animal_type, photographer)
+        tuples per input embedding
+    """
+    if SEARCH_BACKEND == "local":
+        _ensure_local_index()
+        return local_index.search_batch(
+            embeddings, limit=limit, animal_types=animal_types
+        )
+    return qdrant_service.search_similar_images_batch(
+        embeddings, limit=limit, animal_types=animal_types
+    )
+
+
+async def search_similar_images_async(
+    embedding: np.ndarray,
+    limit: int = 3,
+    animal_types: Sequence[str] | None = None,
+    grouped: bool = False,
+) -> List[Tuple[str, float, str, str]]:
+    """
+    Non-blocking search_similar_images (or _grouped) for request handlers.
+
+    The local index answers in well under a millisecond, so it runs inline;
+    Qdrant is queried through the async client.
+    """
+    if SEARCH_BACKEND == "local":
+        if local_index.loaded_at is None:
+            await asyncio.to_thread(_ensure_local_index)
+        search = local_index.search_grouped if grouped else local_index.search
+        return search(embedding, limit=limit, animal_types=animal_types)
+    search = (
+        qdrant_service.search_similar_images_grouped_async
+        if grouped
+        else qdrant_service.search_similar_images_async
+    )
+    return await search(embedding, limit=limit, animal_types=animal_types)
+
+
+async def search_similar_images_batch_async(
+    embeddings: np.ndarray,
+    limit: int = 3,
+    animal_types: Sequence[str] | None = None,
+) -> List[List[Tuple[str, float, str, str]]]:
+    """Non-blocking search_similar_images_batch for request handlers."""
+    if SEARCH_BACKEND == "local":
+        if local_index.loaded_at is None:
+            await asyncio.to_thread(_ensure_local_index)
+        return local_index.search_batch(
+            embeddings, limit=limit, animal_types=animal_types
+        )
+    return await qdrant_service.search_similar_images_batch_async(
+        embeddings, limit=limit, animal_types=animal_types
+    )
+
+
+async def get_collection_version_async():
+    """
+    Value that changes when the searched collection is repopulated: the load
+    time of the local index, or the points count and latest upsert time of
+    the Qdrant collection.
+    """
+    if SEARCH_BACKEND == "local":
+        return local_index.loaded_at
+    return await qdrant_service.collection_version_async()
+
+
+def get_search_backend_stats() -> dict:
+    """Return the active backend and local index status."""
+    return {
+        "backend": SEARCH_BACKEND,
+        "qdrant_client": qdrant_service.get_client_stats(),
+        "local_index_points": len(local_index),
+        "local_index_dtype": str(local_index.dtype),
+        "local_index_mode": local_index.mode,
+        "local_index_bytes": local_index.matrix.nbytes,
+        "local_index_loaded_at": local_index.loaded_at,
+    }
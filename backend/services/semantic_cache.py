@@ -0,0 +1,232 @@
+"""
+Purpose:
+    - Serve near-duplicate doodles from memory: keep recent query embeddings in
+      a small matrix and, when a new query lies within SEMANTIC_CACHE_THRESHOLD
+      cosine similarity of a cached one (same search options), return that
+      query's top-k without touching the search backend
+    - Complements the exact search_cache (same pixels): traffic is dominated by
+      a few kinds of drawing whose embeddings cluster tightly
+    - Invalidate every entry when the collection changes (points count and
+      latest upsert of the Qdrant collection, or reload of the local index,
+      polled in the background)
+      or when /api/search-index/refresh runs; entries also expire after a TTL
+    - Hit rate, entry age at hit time (staleness) and invalidation metrics
+
+Usage:
+    from services.semantic_cache import semantic_cache
+    results = semantic_cache.get(embedding, options)
+    if results is None:
+        results = await search_similar_images_async(embedding, ...)
+        semantic_cache.put(embedding, options, results)
+
+    # main.py lifespan
+    task = asyncio.create_task(
+        semantic_cache.watch(get_collection_version_async, on_change=search_cache.clear)
+    )
+
+Notes:
+    A hit returns the similarities of the cached query, so confidences can
+    differ slightly from what the new doodle would score; results are the
+    cached query's nearest photos, not re-ranked for the new one.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+import numpy as np
+from services.metrics import semantic_cache_hit_age, semantic_cache_invalidations
+from utils.logger import logger
+
+#! Semantic cache configuration
+# 0 disables the cache
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1024"))
+# Minimum cosine similarity between a query and a cached query to reuse its results
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.97"))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "600"))
+# How often the collection is checked for repopulation (0 disables the watcher)
+SEMANTIC_CACHE_CHECK_SECONDS = float(os.getenv("SEMANTIC_CACHE_CHECK_SECONDS", "30"))
+
+VECTOR_SIZE = 512
+
+
+class SemanticCache:
+    """
+    Thread-safe similarity cache of search results.
+
+    Query embeddings live in one preallocated (max_entries, 512) float32
+    matrix; a lookup scores only the slots cached with the same search options
+    in a single matrix-vector product. Full caches evict the least recently
+    used slot.
+    """
+
+    def __init__(self, max_entries: int, threshold: float, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.vectors = np.zeros((max(max_entries, 1), VECTOR_SIZE), dtype=np.float32)
+        # slot -> (options, results, created_at); ordered least recently used first
+        self._slots: OrderedDict[int, tuple[Hashable, Any, float]] = OrderedDict()
+        self._by_options: dict[Hashable, set[int]] = {}
+        self._free = list(range(max_entries))
+        self._lock = threading.Lock()
+        self.collection_version: Any = None
+        self.invalidated_at = time.time()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _nearest(self, embedding: np.ndarray, options: Hashable):
+        """(slot, similarity) of the closest cached query with these options."""
+        slots = self._by_options.get(options)
+        if not slots:
+            return None, -1.0
+        candidates = np.fromiter(slots, dtype=np.intp, count=len(slots))
+        scores = self.vectors[candidates] @ embedding
+        best = int(np.argmax(scores))
+        return int(candidates[best]), float(scores[best])
+
+    def get(self, embedding: np.ndarray, options: Hashable) -> Any | None:
+        """Return cached results for a query within the threshold, else None."""
+        hit = self.lookup(embedding, options)
+        return hit[0] if hit is not None else None
+
+    def lookup(
+        self, embedding: np.ndarray, options: Hashable
+    ) -> tuple[Any, float] | None:
+        """Like get, but return (results, entry age in seconds) on a hit."""
+        if not self.enabled:
+            return None
+        embedding = np.asarray(embedding, dtype=np.float32)
+        now = time.monotonic()
+        with self._lock:
+            slot, similarity = self._nearest(embedding, options)
+            if slot is not None and similarity >= self.threshold:
+                _, results, created_at = self._slots[slot]
+                age = now - created_at
+                if age <= self.ttl_seconds:
+                    self._slots.move_to_end(slot)
+                    self.hits += 1
+                    semantic_cache_hit_age.observe(age)
+                    return results, age
+                self._remove(slot)
+                self._free.append(slot)
+            self.misses += 1
+        return None
+
+    def put(self, embedding: np.ndarray, options: Hashable, results: Any):
+        """
+        Cache results for a query. A query within the threshold of an existing
+        entry replaces it, so one cluster of similar doodles holds one slot.
+        """
+        if not self.enabled:
+            return
+        embedding = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            slot, similarity = self._nearest(embedding, options)
+            if slot is not None and similarity >= self.threshold:
+                self._remove(slot)
+            elif len(self._slots) >= self.max_entries:
+                slot = next(iter(self._slots))
+                self._remove(slot)
+                self.evictions += 1
+            else:
+                slot = self._free.pop()
+            self.vectors[slot] = embedding
+            self._slots[slot] = (options, results, time.monotonic())
+            self._by_options.setdefault(options, set()).add(slot)
+
+    def _remove(self, slot: int):
+        """Unlink a slot; the caller either reuses it or returns it to _free."""
+        options, _, _ = self._slots.pop(slot)
+        slots = self._by_options[options]
+        slots.discard(slot)
+        if not slots:
+            del self._by_options[options]
+
+    def invalidate(self, reason: str):
+        """Drop every entry, e.g. after the collection was repopulated."""
+        with self._lock:
+            dropped = len(self._slots)
+            self._slots.clear()
+            self._by_options.clear()
+            self._free = list(range(self.max_entries))
+            self.invalidations += 1
+            self.invalidated_at = time.time()
+        semantic_cache_invalidations.inc(reason=reason)
+        logger.info(f"Semantic cache invalidated ({reason}), {dropped} entries dropped")
+
+    def check_version(self, version: Any) -> bool:
+        """
+        Invalidate when the collection version differs from the last one seen.
+
+        Returns:
+            True if the collection changed
+        """
+        previous, self.collection_version = self.collection_version, version
+        changed = previous is not None and version != previous
+        if changed:
+            self.invalidate("collection_changed")
+        return changed
+
+    async def watch(
+        self,
+        get_version: Callable[[], Awaitable[Any]],
+        interval: float = SEMANTIC_CACHE_CHECK_SECONDS,
+        on_change: Callable[[], None] | None = None,
+    ):
+        """
+        Poll the collection version, invalidating on change, until cancelled.
+
+        on_change runs on a thread after each invalidation, e.g. to clear the
+        exact search result cache along with this one.
+        """
+        if not self.enabled or interval <= 0:
+            return
+        while True:
+            # Sleep first: the search backend is still warming up at startup
+            await asyncio.sleep(interval)
+            try:
+                if self.check_version(await get_version()) and on_change:
+                    await asyncio.to_thread(on_change)
+            except Exception as e:
+                logger.warning(f"Semantic cache version check failed: {e}")
+
+    def get_stats(self) -> dict:
+        """Return hit/miss counters, occupancy and time since the last invalidation."""
+        lookups = self.hits + self.misses
+        with self._lock:
+            oldest = min(
+                (created for _, _, created in self._slots.values()), default=None
+            )
+            entries = len(self._slots)
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "oldest_entry_age_seconds": (
+                round(time.monotonic() - oldest, 1) if oldest is not None else 0.0
+            ),
+            "seconds_since_invalidation": round(time.time() - self.invalidated_at, 1),
+            "collection_version": self.collection_version,
+        }
+
+
+semantic_cache = SemanticCache(
+    max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    ttl_seconds=SEMANTIC_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,116 @@
+"""
+Purpose:
+    - Deduplicate identical in-flight work: while a call for a key is running,
+      later callers with the same key await that call instead of starting
+      their own, and all of them receive its result (or its exception)
+    - Used by /api/search-doodle to collapse retry storms and duplicate tabs:
+      the key is a hash of the raw image payload plus the search options, so
+      identical requests share one decode -> embed -> search run
+    - Counts leaders (calls that ran) and coalesced callers (calls that
+      joined one), exported in /api/stats and /metrics
+
+Usage:
+    from services.single_flight import search_flights
+    response, shared = await search_flights.do(key, lambda: run_search(...))
+
+Notes:
+    Flights live on the event loop of one process: with WEB_CONCURRENCY > 1,
+    duplicates routed to different workers still run once per worker. The
+    shared call runs as its own task, so a caller that disconnects does not
+    cancel it for the others; a finished flight is forgotten at once (repeat
+    requests after it are served by the result caches).
+"""
+
+import asyncio
+import hashlib
+import os
+from typing import Awaitable, Callable, Hashable, TypeVar
+from services.metrics import coalesced_requests
+
+#! Request coalescing configuration
+SEARCH_COALESCING = os.getenv("SEARCH_COALESCING", "1") == "1"
+
+T = TypeVar("T")
+
+
+def payload_key(payload: str | bytes | memoryview) -> str:
+    """
+    Hash a raw request payload (base64 text or image bytes).
+
+    Returns:
+        Hex digest identifying the payload
+    """
+    if isinstance(payload, str):
+        payload = payload.encode()
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one running task."""
+
+    def __init__(self, name: str, enabled: bool = True):
+        self.name = name
+        self.enabled = enabled
+        self._flights: dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[T]],
+        timeout: float | None = None,
+    ) -> tuple[T, bool]:
+        """
+        Run fn() once per key at a time.
+
+        Args:
+            timeout: seconds a joining caller waits for the running call; the
+                key does not include the caller's deadline, so a caller with a
+                shorter one must not wait out the leader's. The leader itself
+                is not limited.
+
+        Returns:
+            (result, shared): shared is True when this caller joined a call
+            started by another one
+        """
+        if not self.enabled:
+            return await fn(), False
+
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if shared:
+            self.coalesced += 1
+            coalesced_requests.inc(flight=self.name)
+        else:
+            # The task inherits the leader's context, so its pipeline stages
+            # still land in the leader's Server-Timing breakdown
+            flight = asyncio.ensure_future(fn())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda done: self._land(key, done))
+            self.leaders += 1
+        # Shield: one caller going away must not cancel the call for the rest
+        if shared and timeout is not None:
+            return await asyncio.wait_for(asyncio.shield(flight), timeout), shared
+        return await asyncio.shield(flight), shared
+
+    def _land(self, key: Hashable, flight: asyncio.Task):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Mark the exception retrieved in case every caller was cancelled
+        if not flight.cancelled():
+            flight.exception()
+
+    def get_stats(self) -> dict:
+        """Return in-flight keys and leader/coalesced counters since start."""
+        calls = self.leaders + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._flights),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_rate": round(self.coalesced / calls, 4) if calls else 0.0,
+        }
+
+
+search_flights = SingleFlight("search", enabled=SEARCH_COALESCING)
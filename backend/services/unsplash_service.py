@@ -2,19 +2,166 @@
 Purpose:
     - Provide utility functions to fetch animal images from Unsplash
     - Download images and return as PIL.Image objects
+    - Reuse pooled HTTP connections and pace API calls using Unsplash rate-limit headers
     - Centralized service for other scripts to use Unsplash without duplicating code
+    - Streaming ingestion (stream_photo_images): metadata is fetched page by page
+      into a bounded download queue served by a pooled HTTP/2 client, and images
+      are decoded at reduced size (JPEG draft mode) close to the model
+      resolution, so memory stays flat whatever the photo count or animal list
 
 Usage:
     from services.unsplash_service import get_unsplash_photos, download_image
+
+    async with create_async_http_client() as client:
+        async for photo, image in stream_photo_images(ANIMALS, 100, client=client):
+            if isinstance(image, Exception):
+                continue  # download or decode failed for this photo only
+
+Notes:
+    UNSPLASH_API_URL points the API calls elsewhere, e.g. a local fake server
+    (see benchmarks/fake_unsplash.py); an injected client with an ASGI
+    transport serves both metadata and image URLs without a network.
 """
 
+import asyncio
+import importlib.util
 import os
+import threading
+import time
+from typing import AsyncIterator, Callable, Sequence
 import requests
+from requests.adapters import HTTPAdapter
 import io
 from PIL import Image
 from utils.exceptions import UnsplashServiceError
+from utils.logger import logger
 
 UNSPLASH_API_KEY = os.getenv("UNSPLASH_API_KEY")
+UNSPLASH_API_URL = os.getenv("UNSPLASH_API_URL", "https://api.unsplash.com")
+# Unsplash API max per_page
+UNSPLASH_PAGE_SIZE = 30
+
+#! Rate limiting
+# Unsplash reports the remaining hourly quota in X-Ratelimit-Remaining on every
+# API response. Instead of sleeping after every call we only pause once the
+# quota runs low. Image downloads hit the CDN and do not count against it.
+UNSPLASH_MIN_REMAINING = int(os.getenv("UNSPLASH_MIN_REMAINING", "1"))
+UNSPLASH_RATE_LIMIT_WAIT_SECONDS = float(
+    os.getenv("UNSPLASH_RATE_LIMIT_WAIT_SECONDS", "60")
+)
+UNSPLASH_MAX_RETRIES = 5
+HTTP_POOL_SIZE = int(os.getenv("UNSPLASH_HTTP_POOL_SIZE", "16"))
+
+#! Streaming ingestion
+# Photos waiting for a download worker, and decoded images waiting for the
+# consumer; together with the worker count these bound the memory in flight
+UNSPLASH_DOWNLOAD_WORKERS = int(os.getenv("UNSPLASH_DOWNLOAD_WORKERS", "8"))
+UNSPLASH_QUEUE_SIZE = int(os.getenv("UNSPLASH_QUEUE_SIZE", "64"))
+# Smallest side requested from the JPEG decoder (the CLIP input is 224x224)
+UNSPLASH_DECODE_SIZE = int(os.getenv("UNSPLASH_DECODE_SIZE", "224"))
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+_rate_limit_lock = threading.Lock()
+_rate_limit_remaining: int | None = None
+
+
+def get_http_session() -> requests.Session:
+    """
+    Return a shared requests.Session with a keep-alive connection pool.
+
+    Safe to use from multiple download threads.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE
+            )
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def _update_rate_limit(resp: requests.Response):
+    global _rate_limit_remaining
+    remaining = resp.headers.get("X-Ratelimit-Remaining")
+    if remaining is not None and remaining.isdigit():
+        with _rate_limit_lock:
+            _rate_limit_remaining = int(remaining)
+
+
+def _rate_limit_pause() -> float:
+    """Seconds to pause before the next API call (0 while quota remains)."""
+    global _rate_limit_remaining
+    with _rate_limit_lock:
+        exhausted = (
+            _rate_limit_remaining is not None
+            and _rate_limit_remaining < UNSPLASH_MIN_REMAINING
+        )
+        if exhausted:
+            # Forget the stale value; the next response reports the fresh quota
+            _rate_limit_remaining = None
+    if not exhausted:
+        return 0.0
+    logger.warning(
+        f"Unsplash quota nearly exhausted, pausing {UNSPLASH_RATE_LIMIT_WAIT_SECONDS:.0f}s"
+    )
+    return UNSPLASH_RATE_LIMIT_WAIT_SECONDS
+
+
+def _wait_for_rate_limit():
+    """Block while the last known API quota is below UNSPLASH_MIN_REMAINING."""
+    pause = _rate_limit_pause()
+    if pause:
+        time.sleep(pause)
+
+
+def _retry_wait(resp) -> float | None:
+    """Seconds to wait before retrying a rate-limited response, else None."""
+    rate_limited = resp.status_code == 429 or (
+        resp.status_code == 403 and resp.headers.get("X-Ratelimit-Remaining") == "0"
+    )
+    if not rate_limited:
+        return None
+    retry_after = resp.headers.get("Retry-After", "")
+    wait = (
+        float(retry_after)
+        if retry_after.isdigit()
+        else UNSPLASH_RATE_LIMIT_WAIT_SECONDS
+    )
+    logger.warning(f"Unsplash rate limit hit, retrying in {wait:.0f}s")
+    return wait
+
+
+def _api_get(url: str, params: dict) -> requests.Response:
+    """GET an Unsplash API endpoint, backing off when the rate limit is hit."""
+    session = get_http_session()
+    for _ in range(UNSPLASH_MAX_RETRIES):
+        _wait_for_rate_limit()
+        resp = session.get(url, params=params, timeout=10)
+        _update_rate_limit(resp)
+
+        wait = _retry_wait(resp)
+        if wait is None:
+            resp.raise_for_status()
+            return resp
+        time.sleep(wait)
+
+    raise UnsplashServiceError(
+        f"Unsplash rate limit still exceeded after {UNSPLASH_MAX_RETRIES} attempts"
+    )
+
+
+def _photo_record(photo: dict, animal: str) -> dict:
+    """Metadata kept for one Unsplash search result."""
+    return {
+        "id": photo["id"],
+        "url": photo["urls"]["small"],
+        "animal_type": animal,
+        "photographer": photo["user"]["name"],
+    }
 
 
 def get_unsplash_photos(animal: str, count: int = 100) -> list[dict]:
@@ -37,35 +184,26 @@ def get_unsplash_photos(animal: str, count: int = 100) -> list[dict]:
     if not UNSPLASH_API_KEY:
         raise UnsplashServiceError("Unsplash API key not set in environment variables.")
 
-    url = "https://api.unsplash.com/search/photos"
+    url = f"{UNSPLASH_API_URL}/search/photos"
     photos = []
     page = 1
-    per_page = 30  # Unsplash API max per_page
+    per_page = UNSPLASH_PAGE_SIZE
     try:
         while len(photos) < count:
             params = {
                 "query": f"{animal} animal",
-                "per_page": min(per_page, count - len(photos)),
+                # A constant page size keeps page offsets aligned; a smaller
+                # last page would repeat results of the previous one
+                "per_page": per_page,
                 "page": page,
                 "client_id": UNSPLASH_API_KEY,
             }
-            resp = requests.get(url, params=params, timeout=10)
-            resp.raise_for_status()
+            resp = _api_get(url, params)
             data = resp.json()
             results = data.get("results", [])
             if not results:
                 break
-            photos.extend(
-                [
-                    {
-                        "id": photo["id"],
-                        "url": photo["urls"]["small"],
-                        "animal_type": animal,
-                        "photographer": photo["user"]["name"],
-                    }
-                    for photo in results
-                ]
-            )
+            photos.extend([_photo_record(photo, animal) for photo in results])
             page += 1
         return photos[:count]
     except Exception as e:
@@ -74,7 +212,9 @@ def get_unsplash_photos(animal: str, count: int = 100) -> list[dict]:
 
 def download_image(url: str) -> Image.Image | None:
     """
-    Download an image from a URL and return a PIL Image.
+    Download an image from a URL and return a fully decoded PIL Image.
+
+    Uses the shared pooled session, so it can be called from many threads.
 
     Args:
         url: Direct URL to the image
@@ -83,8 +223,206 @@ def download_image(url: str) -> Image.Image | None:
         PIL.Image.Image object or None if download failed
     """
     try:
-        resp = requests.get(url, timeout=10)
+        resp = get_http_session().get(url, timeout=10)
         resp.raise_for_status()
-        return Image.open(io.BytesIO(resp.content))
+        image = Image.open(io.BytesIO(resp.content))
+        image.load()
+        return image
     except Exception as e:
         raise UnsplashServiceError(f"Error downloading image from {url}: {e}")
+
+
+def create_async_http_client():
+    """
+    Pooled httpx.AsyncClient for streaming ingestion.
+
+    Speaks HTTP/2 when the h2 package is available (one multiplexed connection
+    per host instead of a connection per concurrent download), else HTTP/1.1
+    keep-alive.
+    """
+    import httpx
+
+    return httpx.AsyncClient(
+        http2=importlib.util.find_spec("h2") is not None,
+        timeout=10,
+        follow_redirects=True,
+        limits=httpx.Limits(
+            max_connections=HTTP_POOL_SIZE,
+            max_keepalive_connections=HTTP_POOL_SIZE,
+        ),
+    )
+
+
+async def _api_get_async(client, url: str, params: dict):
+    """Async _api_get: same quota pacing and rate-limit retries."""
+    for _ in range(UNSPLASH_MAX_RETRIES):
+        pause = _rate_limit_pause()
+        if pause:
+            await asyncio.sleep(pause)
+        resp = await client.get(url, params=params)
+        _update_rate_limit(resp)
+
+        wait = _retry_wait(resp)
+        if wait is None:
+            resp.raise_for_status()
+            return resp
+        await asyncio.sleep(wait)
+
+    raise UnsplashServiceError(
+        f"Unsplash rate limit still exceeded after {UNSPLASH_MAX_RETRIES} attempts"
+    )
+
+
+async def iter_unsplash_photos(client, animal: str, count: int = 100):
+    """
+    Async get_unsplash_photos that yields one page of metadata at a time.
+
+    Yields:
+        Lists of photo metadata dicts (same shape as get_unsplash_photos)
+    """
+    if not UNSPLASH_API_KEY:
+        raise UnsplashServiceError("Unsplash API key not set in environment variables.")
+
+    url = f"{UNSPLASH_API_URL}/search/photos"
+    fetched = 0
+    page = 1
+    try:
+        while fetched < count:
+            params = {
+                "query": f"{animal} animal",
+                "per_page": UNSPLASH_PAGE_SIZE,
+                "page": page,
+                "client_id": UNSPLASH_API_KEY,
+            }
+            resp = await _api_get_async(client, url, params)
+            results = resp.json().get("results", [])[: count - fetched]
+            if not results:
+                return
+            fetched += len(results)
+            page += 1
+            yield [_photo_record(photo, animal) for photo in results]
+    except UnsplashServiceError:
+        raise
+    except Exception as e:
+        raise UnsplashServiceError(f"Error fetching photos from Unsplash: {e}")
+
+
+def decode_reduced(data: bytes, size: int = UNSPLASH_DECODE_SIZE) -> Image.Image:
+    """
+    Decode image bytes at the smallest scale still covering size x size.
+
+    JPEG draft mode makes libjpeg decode at 1/2, 1/4 or 1/8 scale directly
+    from the DCT coefficients, so a 400px "small" photo is not fully decoded
+    only to be resized to 224 afterwards. Other formats decode normally.
+    """
+    image = Image.open(io.BytesIO(data))
+    image.draft("RGB", (size, size))
+    image.load()
+    return image
+
+
+async def _download_reduced(client, url: str, size: int) -> Image.Image:
+    try:
+        resp = await client.get(url)
+        resp.raise_for_status()
+        # Decoding is CPU-bound; keep the event loop free for other downloads
+        return await asyncio.to_thread(decode_reduced, resp.content, size)
+    except Exception as e:
+        raise UnsplashServiceError(f"Error downloading image from {url}: {e}")
+
+
+async def stream_photo_images(
+    animals: Sequence[str],
+    count: int,
+    client=None,
+    select: Callable[[list[dict]], list[dict]] | None = None,
+    download_workers: int = UNSPLASH_DOWNLOAD_WORKERS,
+    queue_size: int = UNSPLASH_QUEUE_SIZE,
+    decode_size: int = UNSPLASH_DECODE_SIZE,
+) -> AsyncIterator[tuple[dict, Image.Image | Exception]]:
+    """
+    Stream (photo, image) pairs for `count` photos of every animal.
+
+    Pipeline:
+        metadata pages (one animal after another)
+        -> select(page) (optional, run in a thread; e.g. skip stored photos)
+        -> bounded download queue -> download_workers concurrent downloads
+        -> reduced-size decode -> bounded result queue -> caller
+
+    Both queues hold at most queue_size items, so a slow consumer pauses the
+    downloads, which in turn pause metadata paging: memory does not grow with
+    count or len(animals). Pairs arrive in completion order.
+
+    Args:
+        client: httpx.AsyncClient to use (created and closed here when None)
+        select: Filter applied to every metadata page before download
+
+    Yields:
+        (photo metadata, decoded PIL image), or (photo metadata, UnsplashServiceError)
+        when that photo failed to download or decode. An animal whose metadata
+        cannot be fetched is logged and skipped.
+    """
+    owns_client = client is None
+    if owns_client:
+        client = create_async_http_client()
+
+    done = object()
+    photo_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    result_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    async def produce():
+        for animal in animals:
+            try:
+                async for page in iter_unsplash_photos(client, animal, count):
+                    if select is not None:
+                        page = await asyncio.to_thread(select, page)
+                    for photo in page:
+                        await photo_queue.put(photo)
+            except UnsplashServiceError as e:
+                logger.error(f"Could not fetch photos for {animal}: {e}")
+        for _ in range(download_workers):
+            await photo_queue.put(done)
+
+    async def download():
+        while (photo := await photo_queue.get()) is not done:
+            try:
+                image = await _download_reduced(client, photo["url"], decode_size)
+            except UnsplashServiceError as e:
+                image = e
+            await result_queue.put((photo, image))
+
+    async def run():
+        tasks = [asyncio.create_task(produce())] + [
+            asyncio.create_task(download()) for _ in range(download_workers)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    runner = asyncio.create_task(run())
+    get = None
+    try:
+        while True:
+            get = asyncio.ensure_future(result_queue.get())
+            await asyncio.wait({get, runner}, return_when=asyncio.FIRST_COMPLETED)
+            if get.done():
+                yield get.result()
+                continue
+            # Every worker has finished: hand over what is left, then surface
+            # any unexpected error
+            get.cancel()
+            while not result_queue.empty():
+                yield result_queue.get_nowait()
+            await runner
+            return
+    finally:
+        # Consumer stopped early or failed: stop fetching
+        if get is not None:
+            get.cancel()
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+        if owns_client:
+            await client.aclose()
@@ -0,0 +1,159 @@
+import asyncio
+import time
+import pytest
+from services.admission import AdmissionController
+from utils.exceptions import AdmissionRejectedError
+
+
+def _controller(limit: int = 1, queue_limit: int = 4) -> AdmissionController:
+    return AdmissionController(
+        initial_limit=limit,
+        min_limit=1,
+        max_limit=limit,
+        queue_limit=queue_limit,
+        tolerance=2.0,
+    )
+
+
+def test_cancel_after_expiry_does_not_release_a_slot():
+    async def scenario():
+        controller = _controller(limit=1)
+        controller.service_time = controller.baseline = 0.05
+        await controller._acquire(time.monotonic() + 10)
+
+        waiter = asyncio.create_task(controller._acquire(time.monotonic() + 0.5))
+        await asyncio.sleep(0)
+        assert len(controller._waiters) == 1
+
+        # The slot frees up too late: _dispatch expires the waiter, which is
+        # then cancelled (client gone) before it gets to run
+        controller.service_time = 1.0
+        controller._release(None)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert controller.in_flight == 0
+        assert controller.rejected["expired"] == 1
+        # The cap still holds: one slot, the second caller has to queue
+        assert await controller._acquire(time.monotonic() + 10) is False
+        assert controller.in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_limit_grows_while_fast_and_shrinks_when_slow():
+    controller = AdmissionController(
+        initial_limit=8, min_limit=2, max_limit=64, queue_limit=4, tolerance=2.0
+    )
+    controller.in_flight = 8
+    for _ in range(20):
+        controller._update(0.01)
+    grown = controller.limit
+    assert grown > 8
+
+    # Service time far past tolerance x baseline: contention, back off
+    for _ in range(50):
+        controller._update(0.1)
+    assert controller.limit < grown
+    assert controller.limit >= controller.min_limit
+
+
+def test_waiters_are_served_earliest_deadline_first():
+    async def scenario():
+        controller = _controller(limit=1)
+        await controller._acquire(time.monotonic() + 10)
+        served = []
+
+        async def wait(name: str, timeout: float):
+            await controller._acquire(time.monotonic() + timeout)
+            served.append(name)
+            controller._release(None)
+
+        waiters = [
+            asyncio.create_task(wait(name, timeout))
+            for name, timeout in (("late", 9), ("early", 3), ("middle", 6))
+        ]
+        await asyncio.sleep(0)
+        controller._release(None)
+        await asyncio.gather(*waiters)
+        return served
+
+    assert asyncio.run(scenario()) == ["early", "middle", "late"]
+
+
+def test_full_queue_is_rejected_with_429():
+    async def scenario():
+        controller = _controller(limit=1, queue_limit=1)
+        await controller._acquire(time.monotonic() + 10)
+        waiter = asyncio.create_task(controller._acquire(time.monotonic() + 10))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejectedError) as rejection:
+            await controller._acquire(time.monotonic() + 10)
+        waiter.cancel()
+        return controller, rejection.value
+
+    controller, rejection = asyncio.run(scenario())
+    assert (rejection.reason, rejection.status_code) == ("queue_full", 429)
+    assert rejection.retry_after >= 1
+    assert controller.rejected["queue_full"] == 1
+
+
+def test_unreachable_deadline_is_rejected_on_arrival_with_503():
+    async def scenario():
+        controller = _controller(limit=1)
+        controller.service_time = controller.baseline = 1.0
+        await controller._acquire(time.monotonic() + 10)
+        with pytest.raises(AdmissionRejectedError) as rejection:
+            await controller._acquire(time.monotonic() + 0.5)
+        return controller, rejection.value
+
+    controller, rejection = asyncio.run(scenario())
+    assert (rejection.reason, rejection.status_code) == ("deadline", 503)
+    assert controller.rejected["deadline"] == 1
+    assert not controller._waiters
+
+
+def test_waiter_is_dropped_with_503_when_its_deadline_expires():
+    async def scenario():
+        controller = _controller(limit=1)
+        controller.service_time = controller.baseline = 0.01
+        await controller._acquire(time.monotonic() + 10)
+        with pytest.raises(AdmissionRejectedError) as rejection:
+            await controller._acquire(time.monotonic() + 0.05)
+        return controller, rejection.value
+
+    controller, rejection = asyncio.run(scenario())
+    assert (rejection.reason, rejection.status_code) == ("expired", 503)
+    assert controller.rejected["expired"] == 1
+    assert not controller._waiters
+    assert controller.in_flight == 1
+
+
+def test_limit_holds_when_cache_hits_mix_with_searches():
+    async def scenario():
+        controller = AdmissionController(
+            initial_limit=16, min_limit=2, max_limit=64, queue_limit=4, tolerance=2.0
+        )
+        for i in range(60):
+            async with controller.admit(time.monotonic() + 10) as ticket:
+                if i % 3:
+                    # Full pipeline: inference and a vector search
+                    await asyncio.sleep(0.005)
+                    ticket.measured = True
+        return controller
+
+    controller = asyncio.run(scenario())
+    assert controller.limit >= 15
+    assert controller.baseline >= 0.004
+
+
+def test_one_fast_sample_does_not_pin_the_baseline():
+    controller = _controller(limit=16)
+    for _ in range(50):
+        controller._update(0.05)
+    controller._update(0.0001)
+    for _ in range(50):
+        controller._update(0.05)
+    assert controller.baseline == pytest.approx(0.05)
+    assert controller.limit == 16
@@ -0,0 +1,30 @@
+import asyncio
+from services.cache_service import LRUCache
+
+
+def _cache(disk_dir) -> LRUCache:
+    return LRUCache(
+        "test", max_entries=8, max_bytes=1 << 20, ttl_seconds=60, disk_dir=disk_dir
+    )
+
+
+def test_disk_tier_is_shared_through_aget_and_aput(tmp_path):
+    async def scenario():
+        await _cache(tmp_path).aput("key", [1, 2, 3])
+        # A fresh cache (another worker, a restart) finds the entry on disk
+        other = _cache(tmp_path)
+        return other, await other.aget("key"), await other.aget("missing")
+
+    other, value, missing = asyncio.run(scenario())
+    assert value == [1, 2, 3]
+    assert missing is None
+    assert (other.disk_hits, other.misses) == (1, 1)
+
+
+def test_clear_reaches_other_workers(tmp_path):
+    first, second = _cache(tmp_path), _cache(tmp_path)
+    first.put("key", "value")
+    assert second.get("key") == "value"
+    first.clear()
+    assert second.get("key") is None
+    assert not list((tmp_path / "test").glob("*.pkl"))
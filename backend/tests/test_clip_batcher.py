@@ -0,0 +1,64 @@
+import asyncio
+import numpy as np
+import pytest
+from services import clip_service
+from services.clip_service import EmbeddingBatcher
+
+
+@pytest.fixture
+def batches(monkeypatch) -> list[list]:
+    """Run batches inline, embedding image i as [i], and record each batch."""
+    seen = []
+
+    async def run_inline(fn, images):
+        seen.append(list(images))
+        embeddings = np.array([[image] for image in images], dtype=np.float32)
+        return embeddings, {"preprocess": 1, "inference": 1}
+
+    monkeypatch.setattr(clip_service, "run_in_inference_executor", run_inline)
+    return seen
+
+
+def test_full_batch_is_sent_without_waiting(batches):
+    async def scenario():
+        batcher = EmbeddingBatcher(max_batch_size=4, max_wait_ms=10_000)
+        embeddings = await asyncio.wait_for(
+            asyncio.gather(*(batcher.embed(i) for i in range(4))), timeout=1
+        )
+        return batcher, embeddings
+
+    batcher, embeddings = asyncio.run(scenario())
+    assert batches == [[0, 1, 2, 3]]
+    assert [embedding[0] for embedding in embeddings] == [0, 1, 2, 3]
+    assert batcher.total_batches == 1
+    assert batcher.last_batch_size == 4
+
+
+def test_partial_batch_is_flushed_after_max_wait(batches):
+    async def scenario():
+        batcher = EmbeddingBatcher(max_batch_size=8, max_wait_ms=20)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        embeddings = await asyncio.gather(*(batcher.embed(i) for i in range(3)))
+        return embeddings, loop.time() - start
+
+    embeddings, elapsed = asyncio.run(scenario())
+    assert batches == [[0, 1, 2]]
+    assert [embedding[0] for embedding in embeddings] == [0, 1, 2]
+    assert 0.015 <= elapsed < 1
+
+
+def test_batch_failure_reaches_every_caller(monkeypatch):
+    async def fail(fn, images):
+        raise RuntimeError("inference failed")
+
+    monkeypatch.setattr(clip_service, "run_in_inference_executor", fail)
+
+    async def scenario():
+        batcher = EmbeddingBatcher(max_batch_size=2, max_wait_ms=10)
+        return await asyncio.gather(
+            *(batcher.embed(i) for i in range(2)), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+    assert [str(result) for result in results] == ["inference failed"] * 2
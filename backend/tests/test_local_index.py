@@ -0,0 +1,21 @@
+import numpy as np
+from services.local_index import LocalVectorIndex
+
+
+def test_snapshot_round_trips_through_the_exact_path(tmp_path):
+    index = LocalVectorIndex()
+    vectors = np.eye(3, 512, dtype=np.float32)
+    payloads = [
+        {"photo_url": f"{i}.jpg", "animal_type": "cats", "photographer": "someone"}
+        for i in range(3)
+    ]
+    index.build(["a", "b", "c"], vectors, payloads)
+
+    path = tmp_path / "index.snap"
+    index.save_snapshot(path)
+    assert [p.name for p in tmp_path.iterdir()] == ["index.snap"]
+
+    restored = LocalVectorIndex()
+    restored.load_snapshot(path)
+    assert restored.ids == ["a", "b", "c"]
+    assert restored.search(vectors[1], limit=1)[0][0] == "1.jpg"
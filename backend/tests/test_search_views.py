@@ -0,0 +1,36 @@
+import asyncio
+import numpy as np
+from routes import search
+from schemas.search import SearchFilters
+
+# Every flat candidate is a cat: only grouped queries reach the other animals
+CATS = [(f"cat-{i}.jpg", 0.9 - i / 100, "cats", "someone") for i in range(40)]
+GROUPS = [
+    ("cat-0.jpg", 0.9, "cats", "someone"),
+    ("dog-0.jpg", 0.5, "dogs", "someone"),
+    ("fox-0.jpg", 0.4, "foxes", "someone"),
+]
+
+
+async def _search(embedding, limit=3, animal_types=None, grouped=False):
+    return GROUPS[:limit] if grouped else CATS[:limit]
+
+
+async def _search_batch(embeddings, limit=3, animal_types=None):
+    return [CATS[:limit] for _ in embeddings]
+
+
+def test_grouped_tta_finds_limit_groups_when_candidates_are_one_animal(
+    monkeypatch,
+):
+    monkeypatch.setattr(search, "search_similar_images_async", _search)
+    monkeypatch.setattr(search, "search_similar_images_batch_async", _search_batch)
+    filters = SearchFilters(grouped=True, limit=3, tta=True)
+
+    results = asyncio.run(search._search_views(np.ones((5, 4)), filters, None))
+
+    assert [animal_type for _, _, animal_type, _ in results] == [
+        "cats",
+        "dogs",
+        "foxes",
+    ]
@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from services.single_flight import SingleFlight
+
+
+def test_followers_share_the_leaders_result():
+    calls = 0
+
+    async def search():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def scenario():
+        flights = SingleFlight("test")
+        results = await asyncio.gather(*(flights.do("key", search) for _ in range(3)))
+        return flights, results
+
+    flights, results = asyncio.run(scenario())
+    assert calls == 1
+    assert results == [("result", False), ("result", True), ("result", True)]
+    assert (flights.leaders, flights.coalesced) == (1, 2)
+    assert flights.get_stats()["in_flight"] == 0
+
+
+def test_followers_share_the_leaders_exception():
+    async def search():
+        await asyncio.sleep(0.01)
+        raise ValueError("bad image")
+
+    async def scenario():
+        flights = SingleFlight("test")
+        return await asyncio.gather(
+            *(flights.do("key", search) for _ in range(2)), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+    assert [type(result) for result in results] == [ValueError, ValueError]
+
+
+def test_cancelling_the_leaders_caller_does_not_cancel_followers():
+    async def search():
+        await asyncio.sleep(0.02)
+        return "result"
+
+    async def scenario():
+        flights = SingleFlight("test")
+        leader = asyncio.create_task(flights.do("key", search))
+        follower = asyncio.create_task(flights.do("key", search))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == ("result", True)
+
+
+def test_follower_stops_waiting_at_its_timeout():
+    async def search():
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def scenario():
+        flights = SingleFlight("test")
+        leader = asyncio.create_task(flights.do("key", search, timeout=0.01))
+        await asyncio.sleep(0)
+        with pytest.raises(asyncio.TimeoutError):
+            await flights.do("key", search, timeout=0.01)
+        # The timeout only applies to joining callers
+        return await leader
+
+    assert asyncio.run(scenario()) == ("result", False)
+
+
+def test_disabled_runs_every_call():
+    calls = 0
+
+    async def search():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    async def scenario():
+        flights = SingleFlight("test", enabled=False)
+        return await asyncio.gather(*(flights.do("key", search) for _ in range(2)))
+
+    assert asyncio.run(scenario()) == [(1, False), (2, False)]
@@ -26,3 +26,19 @@ class SearchRequestError(DoodleMatcherException):
     """Exception raised for errors in the search request."""
 
     pass
+
+
+class InferenceQueueFullError(DoodleMatcherException):
+    """Exception raised when the inference executor queue is saturated."""
+
+    pass
+
+
+class AdmissionRejectedError(DoodleMatcherException):
+    """Exception raised when admission control sheds a search request."""
+
+    def __init__(self, message: str, reason: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
@@ -0,0 +1,96 @@
+"""
+Purpose:
+    - Decode client-submitted doodle images into fully loaded PIL Images
+    - Extract the image part of a multipart upload without copying the request body
+    - Centralized helpers so every entry point decodes images the same way
+
+Usage:
+    from utils.images import decode_base64_image, decode_image_bytes
+    image = decode_base64_image(request.image_data)
+    image = decode_image_bytes(await request.body())
+"""
+
+import base64
+import binascii
+import io
+from PIL import Image
+from utils.exceptions import SearchRequestError
+
+DATA_URL_PREFIX = "data:image/png;base64,"
+
+
+def decode_image_bytes(image_bytes: bytes | memoryview) -> Image.Image:
+    """
+    Open raw image bytes and force the pixel data to be decoded.
+
+    PIL opens images lazily, so load() is called here to make sure the
+    expensive decode happens in the calling thread instead of later on.
+    BytesIO shares the buffer of a bytes object instead of copying it.
+
+    Returns:
+        Loaded PIL.Image.Image
+    """
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        image.load()
+        return image
+    except Exception as e:
+        raise SearchRequestError("Failed to open image") from e
+
+
+def decode_base64_image(image_data: str) -> Image.Image:
+    """
+    Decode a base64 PNG string (optionally a data URL) into a PIL Image.
+
+    Returns:
+        Loaded PIL.Image.Image
+    """
+    if image_data.startswith(DATA_URL_PREFIX):
+        image_data = image_data[len(DATA_URL_PREFIX) :]
+
+    try:
+        image_bytes = base64.b64decode(image_data)
+    except binascii.Error as e:
+        raise SearchRequestError("Invalid base64 image data") from e
+
+    return decode_image_bytes(image_bytes)
+
+
+def extract_multipart_image(body: bytes, content_type: str) -> memoryview:
+    """
+    Locate the first file part of a multipart/form-data body.
+
+    Only part headers are inspected; the file content is returned as a
+    memoryview into the original body.
+
+    Returns:
+        memoryview over the image bytes of the first part with a filename
+        (or the first part named "image")
+    """
+    boundary = None
+    for param in content_type.split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "boundary":
+            boundary = value.strip('"')
+    if not boundary:
+        raise SearchRequestError("Multipart body is missing a boundary")
+
+    delimiter = b"--" + boundary.encode()
+    position = body.find(delimiter)
+    while position != -1:
+        headers_start = position + len(delimiter)
+        if body[headers_start : headers_start + 2] == b"--":
+            break  # closing delimiter
+        headers_end = body.find(b"\r\n\r\n", headers_start)
+        if headers_end == -1:
+            break
+        next_position = body.find(b"\r\n" + delimiter, headers_end)
+        if next_position == -1:
+            break
+
+        headers = body[headers_start:headers_end].lower()
+        if b"filename=" in headers or b'name="image"' in headers:
+            return memoryview(body)[headers_end + 4 : next_position]
+        position = next_position + 2
+
+    raise SearchRequestError("No image file found in multipart body")
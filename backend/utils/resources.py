@@ -0,0 +1,44 @@
+"""
+Purpose:
+    - Count the CPUs this process may actually use, honouring CPU affinity and
+      container CPU quotas (cgroup v2 cpu.max, cgroup v1 cfs quota), which
+      os.cpu_count() ignores
+
+Usage:
+    from utils.resources import available_cpus
+    threads = max(1, available_cpus() // workers)
+"""
+
+import math
+import os
+from pathlib import Path
+
+
+def _cgroup_cpu_limit() -> float | None:
+    """CPU quota of the current cgroup in cores, or None when unlimited."""
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us").read_text())
+        period = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read_text())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cpus() -> int:
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS / Windows
+        cpus = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, max(1, math.ceil(limit)))
+    return max(1, cpus)
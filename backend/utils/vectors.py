@@ -0,0 +1,69 @@
+"""
+Purpose:
+    - Compact encodings for L2-normalized float32 CLIP embeddings
+        float32  4 bytes/dim, exact
+        float16  2 bytes/dim, ~1e-3 relative error
+        int8     1 byte/dim plus one float32 scale per vector (symmetric, per-vector)
+    - Shared by the embedding cache and the local index so both use the same formats
+
+Usage:
+    from utils.vectors import encode_embedding, decode_embedding
+    compact = encode_embedding(embedding, "int8")
+    embedding = decode_embedding(compact)
+
+    from utils.vectors import quantize_int8
+    codes, scales = quantize_int8(matrix)   # matrix ~= codes * scales[:, None]
+"""
+
+from typing import Tuple, Union
+import numpy as np
+
+EMBEDDING_DTYPES = ("float32", "float16", "int8")
+
+# int8 encodings are stored as (codes, scale)
+CompactEmbedding = Union[np.ndarray, Tuple[np.ndarray, float]]
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric per-row int8 quantization.
+
+    Returns:
+        (codes of dtype int8, float32 scale per row), with
+        vectors ~= codes * scales[:, None]
+    """
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    max_abs = np.abs(vectors).max(axis=1) if vectors.size else np.zeros(len(vectors))
+    scales = (max_abs / 127.0).astype(np.float32)
+    safe = np.where(scales > 0, scales, 1.0)
+    codes = np.rint(vectors / safe[:, None]).astype(np.int8)
+    return codes, scales
+
+
+def dequantize_int8(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    return codes.astype(np.float32) * np.asarray(scales, dtype=np.float32)[..., None]
+
+
+def encode_embedding(embedding: np.ndarray, dtype: str = "float32") -> CompactEmbedding:
+    """
+    Encode one embedding in the given compact format.
+
+    Always returns new arrays: embeddings are often row views of a whole
+    inference batch, which a long-lived cache entry would otherwise keep alive.
+    """
+    if dtype == "float32":
+        return np.array(embedding, dtype=np.float32)
+    if dtype == "float16":
+        return np.asarray(embedding, dtype=np.float16)
+    if dtype == "int8":
+        codes, scales = quantize_int8(embedding)
+        return codes[0], float(scales[0])
+    raise ValueError(f"Unsupported embedding dtype: {dtype}")
+
+
+def decode_embedding(encoded: CompactEmbedding) -> np.ndarray:
+    """Decode any encode_embedding output back to a float32 vector."""
+    if isinstance(encoded, tuple):
+        codes, scale = encoded
+        return codes.astype(np.float32) * np.float32(scale)
+    return np.asarray(encoded, dtype=np.float32)